@@ -0,0 +1,589 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Union, get_args, get_origin
+
+from fastapi import HTTPException, status
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+    Timeout,
+)
+
+from .tracing import SPAN_KIND_CLIENT, span
+from .usage import AIBudgetExceeded, usage_recorder
+
+# Timeouts for OpenAI HTTP calls (seconds). Connect is short so that an unreachable
+# provider fails fast; read covers the model latency.
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Interactive answer verification has a tighter read timeout and its own concurrency budget
+AI_VERIFY_READ_TIMEOUT = float(os.getenv("AI_VERIFY_READ_TIMEOUT", "20"))
+AI_VERIFY_MAX_CONCURRENCY = int(os.getenv("AI_VERIFY_MAX_CONCURRENCY", "20"))
+AI_VERIFY_ACQUIRE_TIMEOUT = float(os.getenv("AI_VERIFY_ACQUIRE_TIMEOUT", "0.5"))
+
+# Shared scheduler for generation calls: global cap, per-model cap (e.g. "gpt-5-nano=6,gpt-5-mini=4"),
+# and exponential backoff with jitter for retryable errors
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_MODEL_MAX_CONCURRENCY = int(os.getenv("AI_MODEL_MAX_CONCURRENCY", "8"))
+AI_MODEL_CONCURRENCY = os.getenv("AI_MODEL_CONCURRENCY", "")
+AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", "4"))
+AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", "1.0"))
+AI_BACKOFF_MAX = float(os.getenv("AI_BACKOFF_MAX", "30"))
+# How many extra rounds a batched generation may spend on replacing failed/short batches
+AI_GENERATION_MAX_ROUNDS = int(os.getenv("AI_GENERATION_MAX_ROUNDS", "3"))
+
+DEFAULT_MODEL = "gpt-5-nano"
+# Alternative API endpoint, e.g. the local stand-in from scripts/fake_openai.py (http://localhost:8100/v1)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+_openai_client: OpenAI | None = None
+_async_openai_client: AsyncOpenAI | None = None
+
+
+def _get_api_key() -> str:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+    return api_key
+
+
+def _timeout(read: float = OPENAI_READ_TIMEOUT) -> Timeout:
+    return Timeout(read, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def get_openai_client() -> OpenAI:
+    """Return the shared synchronous OpenAI client."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(
+            api_key=_get_api_key(), base_url=OPENAI_BASE_URL, timeout=_timeout(), max_retries=OPENAI_MAX_RETRIES
+        )
+    return _openai_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Return the shared asynchronous OpenAI client."""
+    global _async_openai_client
+    if _async_openai_client is None:
+        _async_openai_client = AsyncOpenAI(
+            api_key=_get_api_key(), base_url=OPENAI_BASE_URL, timeout=_timeout(), max_retries=OPENAI_MAX_RETRIES
+        )
+    return _async_openai_client
+
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+def structured_items_format(item_model, name: str) -> dict:
+    """
+    Structured Outputs format (Responses API `text.format`) for {"items": [item_model, ...]}.
+    Strict mode requires every property to be listed as required, so optional fields are nullable.
+    """
+    properties = {}
+    for field_name, field in item_model.model_fields.items():
+        annotation = field.annotation
+        types = [annotation]
+        if get_origin(annotation) is Union:
+            types = [arg for arg in get_args(annotation) if arg is not type(None)]
+        json_type = _JSON_TYPES.get(types[0], "string")
+        properties[field_name] = {"type": json_type if field.is_required() else [json_type, "null"]}
+    item_schema = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "name": name,
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"items": {"type": "array", "items": item_schema}},
+            "required": ["items"],
+            "additionalProperties": False,
+        },
+    }
+
+
+_decoder = json.JSONDecoder()
+
+
+def parse_json_items(text: str) -> list[dict]:
+    """
+    Incremental parser for a JSON array of objects (bare or wrapped as {"items": [...]}).
+    Every complete object is kept: stray text around the array, markdown fences, a broken
+    element or output cut off mid-object only lose the affected element, not the batch.
+    """
+    start = text.find("[")
+    position = start + 1 if start != -1 else 0
+    items: list[dict] = []
+    while True:
+        position = text.find("{", position)
+        if position == -1:
+            break
+        try:
+            value, end = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position += 1
+            continue
+        if isinstance(value, dict):
+            items.append(value)
+        position = end
+        # Skip to the next element; a closing "]" ends the array
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position < len(text) and text[position] == "]":
+            break
+    return items
+
+
+def _usage_tokens(response) -> tuple[int, int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "input_tokens", 0) or 0, getattr(usage, "output_tokens", 0) or 0
+
+
+def _call_outcome(error: Exception) -> str:
+    return "timeout" if isinstance(error, APITimeoutError) else "error"
+
+
+def _response_kwargs(model: str, prompt: str, text_format: dict | None) -> dict:
+    kwargs = {"model": model, "input": prompt}
+    if text_format is not None:
+        kwargs["text"] = {"format": text_format}
+    return kwargs
+
+
+def create_response(prompt: str, feature: str, model: str = DEFAULT_MODEL, text_format: dict | None = None, **options) -> str:
+    """
+    The one way to call the Responses API synchronously: checks the daily budget and records
+    tokens, cost, latency and outcome under `feature`. `text_format` requests structured output
+    (see structured_items_format); `options` go to client.with_options().
+    """
+    try:
+        usage_recorder.check_budget(feature)
+    except AIBudgetExceeded:
+        usage_recorder.record(feature, model, outcome="rejected")
+        raise
+    client = get_openai_client()
+    if options:
+        client = client.with_options(**options)
+    start = time.perf_counter()
+    try:
+        with span("openai.responses.create", SPAN_KIND_CLIENT, feature=feature, model=model):
+            response = client.responses.create(**_response_kwargs(model, prompt, text_format))
+    except Exception as e:
+        usage_recorder.record(feature, model, latency=time.perf_counter() - start, outcome=_call_outcome(e))
+        raise
+    usage_recorder.record(feature, model, *_usage_tokens(response), latency=time.perf_counter() - start)
+    return response.output_text
+
+
+async def acreate_response(prompt: str, feature: str, model: str = DEFAULT_MODEL, text_format: dict | None = None, **options) -> str:
+    """Async counterpart of create_response."""
+    try:
+        usage_recorder.check_budget(feature)
+    except AIBudgetExceeded:
+        usage_recorder.record(feature, model, outcome="rejected")
+        raise
+    client = get_async_openai_client()
+    if options:
+        client = client.with_options(**options)
+    start = time.perf_counter()
+    try:
+        with span("openai.responses.create", SPAN_KIND_CLIENT, feature=feature, model=model):
+            response = await client.responses.create(**_response_kwargs(model, prompt, text_format))
+    except Exception as e:
+        usage_recorder.record(feature, model, latency=time.perf_counter() - start, outcome=_call_outcome(e))
+        raise
+    usage_recorder.record(feature, model, *_usage_tokens(response), latency=time.perf_counter() - start)
+    return response.output_text
+
+
+class LatencyTracker:
+    """Keeps the last N call durations and outcomes and reports percentiles."""
+
+    def __init__(self, name: str, window: int = 1000):
+        self.name = name
+        self._samples: deque[float] = deque(maxlen=window)
+        self.total_calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def record(self, duration: float, outcome: str = "ok") -> None:
+        self._samples.append(duration)
+        self.total_calls += 1
+        if outcome == "error":
+            self.errors += 1
+        elif outcome == "timeout":
+            self.timeouts += 1
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        def ms(value: float | None) -> float | None:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "name": self.name,
+            "total_calls": self.total_calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "window": len(self._samples),
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(max(self._samples)) if self._samples else None,
+        }
+
+
+class ConcurrencyBudget:
+    """
+    Caps the number of in-flight calls of one kind.
+    When no slot frees up within `acquire_timeout` the caller gets a 503 instead of queueing.
+    """
+
+    def __init__(self, name: str, limit: int, acquire_timeout: float, tracker: LatencyTracker | None = None):
+        self.name = name
+        self.limit = limit
+        self.acquire_timeout = acquire_timeout
+        self.tracker = tracker
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            if self.tracker:
+                self.tracker.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{self.name}: too many concurrent requests, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+verify_latency = LatencyTracker("ai_verify")
+verify_budget = ConcurrencyBudget("AI verification", AI_VERIFY_MAX_CONCURRENCY, AI_VERIFY_ACQUIRE_TIMEOUT, verify_latency)
+
+
+async def call_verify_model(prompt: str, model: str = DEFAULT_MODEL) -> str:
+    """
+    Runs a verification prompt on the async client within the verification budget.
+    Raises 503 when the budget is exhausted and 504 when the model does not answer in time.
+    """
+    async with verify_budget.slot():
+        start = time.perf_counter()
+        try:
+            output_text = await acreate_response(
+                prompt, "verify", model, timeout=_timeout(AI_VERIFY_READ_TIMEOUT), max_retries=0
+            )
+        except AIBudgetExceeded:
+            raise
+        except APITimeoutError:
+            verify_latency.record(time.perf_counter() - start, "timeout")
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="AI verification timed out")
+        except Exception:
+            verify_latency.record(time.perf_counter() - start, "error")
+            raise
+        verify_latency.record(time.perf_counter() - start)
+        return output_text
+
+
+def _parse_model_limits(spec: str) -> dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx from the provider
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Reads Retry-After / retry-after-ms from a rate limit response, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class AIScheduler:
+    """
+    Single entry point for generation calls to OpenAI.
+    Limits concurrency globally and per model, retries retryable errors with exponential
+    backoff and full jitter, and pauses every caller of a model after a 429.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = AI_MAX_CONCURRENCY,
+        model_limit: int = AI_MODEL_MAX_CONCURRENCY,
+        model_overrides: dict[str, int] | None = None,
+        max_attempts: int = AI_MAX_ATTEMPTS,
+    ):
+        self.global_limit = global_limit
+        self.model_limit = model_limit
+        self.model_overrides = model_overrides or {}
+        self.max_attempts = max_attempts
+        self._global = asyncio.Semaphore(global_limit)
+        self._models: dict[str, asyncio.Semaphore] = {}
+        self._paused_until: dict[str, float] = {}
+        self.in_flight = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.latency = LatencyTracker("ai_generate")
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._models:
+            self._models[model] = asyncio.Semaphore(self.model_overrides.get(model, self.model_limit))
+        return self._models[model]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * (2 ** attempt)))
+
+    async def _wait_for_pause(self, model: str) -> None:
+        delay = self._paused_until.get(model, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def run(
+        self, prompt: str, model: str = DEFAULT_MODEL, feature: str = "generate", text_format: dict | None = None
+    ) -> str:
+        """Runs one prompt and returns the output text. Raises after the last failed attempt."""
+        model_semaphore = self._model_semaphore(model)
+
+        for attempt in range(self.max_attempts):
+            await self._wait_for_pause(model)
+            # Per-model slot first: waiters of a saturated model must not hold global slots other models need
+            async with model_semaphore, self._global:
+                self.in_flight += 1
+                start = time.perf_counter()
+                try:
+                    output_text = await acreate_response(prompt, feature, model, text_format, max_retries=0)
+                    self.latency.record(time.perf_counter() - start)
+                    return output_text.strip()
+                except RETRYABLE_ERRORS as e:
+                    outcome = "timeout" if isinstance(e, APITimeoutError) else "error"
+                    self.latency.record(time.perf_counter() - start, outcome)
+                    if attempt == self.max_attempts - 1:
+                        raise
+                    delay = self._backoff(attempt)
+                    if isinstance(e, RateLimitError):
+                        self.rate_limited += 1
+                        delay = max(delay, _retry_after(e) or 0)
+                        self._paused_until[model] = max(self._paused_until.get(model, 0), time.monotonic() + delay)
+                    print(f"AI call failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                except AIBudgetExceeded:
+                    raise
+                except Exception:
+                    self.latency.record(time.perf_counter() - start, "error")
+                    raise
+                finally:
+                    self.in_flight -= 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+        raise RuntimeError("unreachable")
+
+    def snapshot(self) -> dict:
+        return {
+            **self.latency.snapshot(),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.global_limit,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class AdaptiveBatchSizer:
+    """
+    Additive-increase / multiplicative-decrease batch size per prompt family.
+    A round with batches that failed to parse or came back short (usually truncated output)
+    halves the size; a clean round grows it by one up to the requested size.
+    """
+
+    def __init__(self, minimum: int = 2):
+        self.minimum = minimum
+        self._sizes: dict[str, int] = {}
+
+    def size_for(self, kind: str, requested: int) -> int:
+        return max(1, min(requested, self._sizes.get(kind, requested)))
+
+    def record(self, kind: str, requested: int, truncated: bool) -> None:
+        current = self.size_for(kind, requested)
+        if truncated:
+            self._sizes[kind] = max(self.minimum, current // 2)
+        else:
+            self._sizes[kind] = min(requested, current + 1)
+
+    def snapshot(self) -> dict:
+        return dict(self._sizes)
+
+
+scheduler = AIScheduler(model_overrides=_parse_model_limits(AI_MODEL_CONCURRENCY))
+batch_sizer = AdaptiveBatchSizer()
+
+
+def _split_batches(total: int, batch_size: int) -> list[int]:
+    num_batches = (total + batch_size - 1) // batch_size
+    base, extra = divmod(total, num_batches)
+    return [base + (1 if i < extra else 0) for i in range(num_batches)]
+
+
+async def _run_batch(
+    kind: str,
+    asked: int,
+    prompt: str,
+    parse: Callable[[str], list[dict]],
+    is_valid: Callable[[dict], bool],
+    model: str,
+    text_format: dict | None = None,
+) -> tuple[int, list[dict], bool]:
+    """Runs one batch; returns (asked, valid items, looked_truncated). Raises only AIBudgetExceeded."""
+    try:
+        output_text = await scheduler.run(prompt, model, f"generate_{kind}", text_format)
+    except AIBudgetExceeded:
+        # Every further batch would be rejected too - stop the whole generation
+        raise
+    except Exception as e:
+        # Provider errors were already retried by the scheduler; they say nothing about batch size
+        print(f"[{kind}] Batch call error: {e}")
+        return asked, [], False
+    items: list[dict] = []
+    try:
+        items = [item for item in parse(output_text) if isinstance(item, dict) and is_valid(item)]
+    except (ValueError, TypeError) as e:
+        print(f"[{kind}] Batch parse error: {e}")
+    return asked, items[:asked], len(items) < asked * 0.8
+
+
+async def stream_in_batches(
+    kind: str,
+    total_count: int,
+    batch_size: int,
+    build_prompt: Callable[[int], str],
+    parse: Callable[[str], list[dict]],
+    is_valid: Callable[[dict], bool],
+    model: str = DEFAULT_MODEL,
+    max_rounds: int = AI_GENERATION_MAX_ROUNDS,
+    dedupe=None,
+    text_format: dict | None = None,
+) -> AsyncIterator[list[dict]]:
+    """
+    Generates `total_count` items through the scheduler in batches of at most `batch_size`
+    and yields each batch's items as soon as its call resolves (as_completed order).
+    Only the shortfall left by failed, unparseable or short batches is requested again
+    in the next round, so the full count is delivered unless the provider keeps failing.
+
+    `dedupe` (an app.dedupe.DedupeIndex) drops duplicates of existing and already generated
+    items; they count as shortfall, and the replacement prompts list what was rejected.
+    `text_format` asks the model for schema-constrained output (structured_items_format).
+    """
+    if dedupe is not None:
+        await dedupe.ensure_loaded()
+    delivered = 0
+    for round_no in range(1 + max_rounds):
+        missing = total_count - delivered
+        if missing <= 0:
+            break
+        size = batch_sizer.size_for(kind, batch_size)
+        counts = _split_batches(missing, size)
+        if round_no:
+            print(f"[{kind}] Retrying {missing} missing items in {len(counts)} batches (batch size {size})")
+
+        hint = dedupe.avoid_hint() if dedupe is not None and round_no else ""
+        tasks = [
+            asyncio.ensure_future(_run_batch(kind, n, build_prompt(n) + hint, parse, is_valid, model, text_format))
+            for n in counts
+        ]
+        truncated = False
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                _, items, batch_truncated = await next_done
+                truncated = truncated or batch_truncated
+                if dedupe is not None:
+                    items = dedupe.filter(items)
+                items = items[: total_count - delivered]
+                if items:
+                    delivered += len(items)
+                    yield items
+        finally:
+            # The consumer may stop early (e.g. a closed SSE connection) - don't leave calls running
+            for task in tasks:
+                task.cancel()
+        batch_sizer.record(kind, batch_size, truncated)
+
+    if delivered < total_count:
+        print(f"[{kind}] Generated {delivered}/{total_count} items after {max_rounds} retry rounds")
+
+
+async def generate_in_batches(
+    kind: str,
+    total_count: int,
+    batch_size: int,
+    build_prompt: Callable[[int], str],
+    parse: Callable[[str], list[dict]],
+    is_valid: Callable[[dict], bool],
+    model: str = DEFAULT_MODEL,
+    max_rounds: int = AI_GENERATION_MAX_ROUNDS,
+    dedupe=None,
+    text_format: dict | None = None,
+) -> list[dict]:
+    """Collects everything `stream_in_batches` produces into one list."""
+    collected: list[dict] = []
+    async for items in stream_in_batches(
+        kind, total_count, batch_size, build_prompt, parse, is_valid, model, max_rounds, dedupe, text_format
+    ):
+        collected.extend(items)
+    return collected
+
+
+def get_ai_stats() -> dict:
+    """Snapshot of AI call latency and concurrency for the admin panel."""
+    return {
+        "verify": {
+            **verify_latency.snapshot(),
+            "in_flight": verify_budget.in_flight,
+            "max_concurrency": verify_budget.limit,
+        },
+        "generate": scheduler.snapshot(),
+        "batch_sizes": batch_sizer.snapshot(),
+    }
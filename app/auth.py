@@ -10,6 +10,7 @@ from sqlmodel import Session, select
 
 from .database import get_session
 from .models import Token, User
+from .tracing import traced
 
 # Configure secret key and algorithm from environment variables
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-only-insecure-key-change-in-production")
@@ -39,6 +40,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+@traced("auth.get_current_user")
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
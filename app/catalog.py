@@ -0,0 +1,419 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy import DDL, func, inspect, update
+from sqlmodel import Session, SQLModel, select
+
+from .database import engine
+from .etags import collection_version
+from .exports import EXPORT_SOURCES
+from .models import (
+    CatalogVersion,
+    FillBlankGroupRead,
+    FillBlankRead,
+    FiszkaRead,
+    FiszkiGroupRead,
+    GroupStudyRead,
+    GuessObjectGroupRead,
+    GuessObjectRead,
+    TargetLanguage,
+    TranslatePlToTargetGroupRead,
+    TranslatePlToTargetRead,
+    TranslateTargetToPlGroupRead,
+    TranslateTargetToPlRead,
+    User,
+)
+
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "2000"))
+CATALOG_CACHE_MAX_BYTES = int(os.getenv("CATALOG_CACHE_MAX_MB", "64")) * 1024 * 1024
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+# Changes made through this process are invalidated on commit. Commits of other processes (a standalone
+# job worker, other web workers) bump the shared catalog_version row, which is read at most this often;
+# when it moved, the whole cache is dropped
+CATALOG_CACHE_SYNC_SECONDS = float(os.getenv("CATALOG_CACHE_SYNC_SECONDS", "1"))
+
+# Content mode -> (item read model, group read model); modes and tables as in EXPORT_SOURCES
+CATALOG_READ_MODELS: dict[str, tuple[type[SQLModel], type[SQLModel]]] = {
+    "fiszki": (FiszkaRead, FiszkiGroupRead),
+    "translate_pl_fr": (TranslatePlToTargetRead, TranslatePlToTargetGroupRead),
+    "translate_fr_pl": (TranslateTargetToPlRead, TranslateTargetToPlGroupRead),
+    "guess_object": (GuessObjectRead, GuessObjectGroupRead),
+    "fill_blank": (FillBlankRead, FillBlankGroupRead),
+}
+CATALOG_MODELS = [model for source in EXPORT_SOURCES.values() for model in (source.item_model, source.group_model)]
+_ITEM_TABLES = {source.item_model.__tablename__: mode for mode, source in EXPORT_SOURCES.items()}
+_GROUP_TABLES = {source.group_model.__tablename__: mode for mode, source in EXPORT_SOURCES.items()}
+
+# Key argument matching every entry of a kind and mode in invalidations
+ALL = "*"
+_PENDING = "catalog_changes"
+_COMMITTED_VERSION = "catalog_version"
+
+# The catalog_version row, created with the table (app/main.py)
+CATALOG_VERSION_ROW = DDL("INSERT INTO catalog_version (id, version) VALUES (1, 0)")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    version: str  # collection version the rows were loaded at (used for ETags)
+    rows: tuple
+    size: int  # approximate bytes
+    expires_at: float
+
+
+def approx_size(rows: tuple) -> int:
+    """Approximate memory held by a tuple of flat models, tuples or scalars (the rows and their values)."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        values = row.__dict__.values() if hasattr(row, "__dict__") else row if isinstance(row, tuple) else ()
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+    return size
+
+
+class CatalogCache:
+    """
+    LRU cache of immutable catalog snapshots (group lists, item lists), bounded by entry count and
+    approximate bytes. Fills race-free with invalidations: a snapshot loaded while an invalidation
+    was applied is not stored. With `read_version`, the shared catalog version is compared every
+    `sync_interval` seconds and the cache is cleared when another process changed the catalog.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        read_version: Optional[Callable[[], Optional[int]]] = None,
+        sync_interval: float = CATALOG_CACHE_SYNC_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.read_version = read_version
+        self.sync_interval = sync_interval
+        self._entries: OrderedDict[Hashable, CatalogEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._sync_due = 0.0
+        self.version: Optional[int] = None  # last shared catalog version seen
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    def _clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self.bytes = 0
+
+    def sync(self, now: float) -> None:
+        """Clears the cache when the shared version moved since it was last seen."""
+        if self.read_version is None or now < self._sync_due:
+            return
+        self._sync_due = now + self.sync_interval
+        try:
+            version = self.read_version()
+        except Exception as e:
+            print(f"Catalog version check failed: {e}")
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self._clear()
+                self.remote_invalidations += 1
+            self.version = version
+
+    def get(self, key: Hashable) -> Optional[CatalogEntry]:
+        now = time.monotonic()
+        self.sync(now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def load(self, key: Hashable, loader: Callable[[], tuple[str, tuple]]) -> CatalogEntry:
+        """Cached entry for `key`, or the result of `loader()` -> (version, rows), stored for later requests."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        generation = self._generation
+        version, rows = loader()
+        entry = CatalogEntry(version, rows, approx_size(rows), time.monotonic() + self.ttl)
+        with self._lock:
+            if generation != self._generation or entry.size > self.max_bytes:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, changes: set[tuple], version: Optional[int] = None) -> None:
+        """
+        Drops entries matching any (kind, mode, arg) in `changes`; arg ALL matches every entry of the kind.
+        `version` is the shared version the commit bumped to: when it directly follows the last one seen,
+        no other process committed in between and the next sync has nothing to clear.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if _matches(key, changes)]:
+                self._remove(key)
+                self.invalidations += 1
+            if version is not None and self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "approx_bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "rows": sum(len(entry.rows) for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "remote_invalidations": self.remote_invalidations,
+                "version": self.version,
+                "ttl_seconds": self.ttl,
+                "sync_seconds": self.sync_interval,
+            }
+
+
+def _matches(key: tuple, changes: set[tuple]) -> bool:
+    kind, mode, _ = key
+    return key in changes or (kind, mode, ALL) in changes
+
+
+def read_catalog_version() -> Optional[int]:
+    with engine.connect() as connection:
+        return connection.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+
+
+catalog_cache = CatalogCache(CATALOG_CACHE_MAX_ENTRIES, CATALOG_CACHE_MAX_BYTES, CATALOG_CACHE_TTL, read_catalog_version)
+
+
+# ---- Reads ----
+
+def catalog_items(session: Session, mode: str, group_id: Optional[uuid.UUID] = None) -> CatalogEntry:
+    """Items of a group (or of the whole mode when group_id is None) as read models."""
+    item_model = EXPORT_SOURCES[mode].item_model
+    read_model = CATALOG_READ_MODELS[mode][0]
+    criteria = [item_model.group_id == group_id] if group_id else []
+
+    def load() -> tuple[str, tuple]:
+        version = collection_version(session, item_model, *criteria)
+        rows = session.exec(select(item_model).where(*criteria)).all()
+        return version, tuple(read_model.model_validate(row) for row in rows)
+
+    return catalog_cache.load(("items", mode, group_id), load)
+
+
+def catalog_items_of_groups(session: Session, mode: str, group_ids: list[uuid.UUID]) -> list:
+    """Items of several groups (study sessions), each group served from its own entry."""
+    rows = []
+    for group_id in dict.fromkeys(group_ids):
+        rows.extend(catalog_items(session, mode, group_id).rows)
+    return rows
+
+
+def catalog_item_totals(session: Session, mode: str) -> dict[Optional[uuid.UUID], int]:
+    """Item count per group id (None: items without a group); invalidated with the group lists."""
+    item_model = EXPORT_SOURCES[mode].item_model
+
+    def load() -> tuple[str, tuple]:
+        totals = session.exec(select(item_model.group_id, func.count(item_model.id)).group_by(item_model.group_id)).all()
+        return "", tuple(tuple(row) for row in totals)
+
+    return dict(catalog_cache.load(("groups", mode, "totals"), load).rows)
+
+
+def with_totals(session: Session, mode: str, groups) -> list:
+    """Group rows as read models with total_items taken from the cached counters."""
+    read_model = CATALOG_READ_MODELS[mode][1]
+    totals = catalog_item_totals(session, mode)
+    rows = []
+    for group in groups:
+        row = read_model.model_validate(group)
+        row.total_items = totals.get(group.id, 0)
+        rows.append(row)
+    return rows
+
+
+def catalog_groups(session: Session, mode: str, language: Optional[TargetLanguage] = None) -> CatalogEntry:
+    """Groups of a mode (optionally of one language) as read models with total_items filled in."""
+    source = EXPORT_SOURCES[mode]
+    group_model, item_model = source.group_model, source.item_model
+    criteria = [group_model.language == language] if language else []
+
+    def load() -> tuple[str, tuple]:
+        version = f"{collection_version(session, group_model, *criteria)}|{collection_version(session, item_model)}"
+        groups = session.exec(select(group_model).where(*criteria)).all()
+        return version, tuple(with_totals(session, mode, groups))
+
+    return catalog_cache.load(("groups", mode, language), load)
+
+
+def catalog_item_count(session: Session, mode: str, group_id: Optional[uuid.UUID] = None) -> int:
+    """Number of items in a group, or in the whole mode, from the cached counters."""
+    totals = catalog_item_totals(session, mode)
+    return totals.get(group_id, 0) if group_id else sum(totals.values())
+
+
+def catalog_group_count(session: Session, mode: str, language: Optional[TargetLanguage] = None) -> int:
+    return len(catalog_groups(session, mode, language).rows)
+
+
+def catalog_user_count(session: Session) -> int:
+    """Number of users; invalidated by user inserts and deletes only."""
+
+    def load() -> tuple[str, tuple]:
+        return "", (session.exec(select(func.count(User.id))).one(),)
+
+    return catalog_cache.load(("count", "users", None), load).rows[0]
+
+
+def catalog_study_groups(session: Session, mode: str, language: TargetLanguage, user_id: uuid.UUID) -> list[GroupStudyRead]:
+    """Cached groups of a language with the user's learned counts (one grouped query)."""
+    source = EXPORT_SOURCES[mode]
+    item_model, progress_model = source.item_model, source.progress_model
+    learned = dict(
+        session.exec(
+            select(item_model.group_id, func.count(source.progress_item_column))
+            .join(item_model, item_model.id == source.progress_item_column)
+            .where(progress_model.user_id == user_id)
+            .where(progress_model.learned == True)  # noqa: E712
+            .group_by(item_model.group_id)
+        ).all()
+    )
+    return [
+        GroupStudyRead(
+            id=group.id,
+            name=group.name,
+            description=group.description,
+            language=group.language,
+            total_items=group.total_items,
+            learned_items=learned.get(group.id, 0),
+            updated_at=group.updated_at,
+        )
+        for group in catalog_groups(session, mode, language).rows
+    ]
+
+
+# ---- Invalidation (SQLAlchemy event listeners, registered in app/main.py) ----
+
+def _pending(session) -> set[tuple]:
+    return session.info.setdefault(_PENDING, set())
+
+
+def _item_changes(mode: str, group_ids, counts_changed: bool) -> set[tuple]:
+    changes = {("items", mode, group_id) for group_id in group_ids}
+    changes.add(("items", mode, None))
+    if counts_changed:
+        changes.add(("groups", mode, ALL))
+    return changes
+
+
+def _record(target, counts_changed: bool, group_ids=()) -> None:
+    session = inspect(target).session
+    if session is None:
+        return
+    table = target.__tablename__
+    if table in _GROUP_TABLES:
+        mode = _GROUP_TABLES[table]
+        _pending(session).update({("groups", mode, ALL), ("items", mode, target.id), ("items", mode, None)})
+    elif table in _ITEM_TABLES:
+        _pending(session).update(_item_changes(_ITEM_TABLES[table], {target.group_id, *group_ids}, counts_changed))
+    elif table == User.__tablename__:
+        _pending(session).add(("count", "users", ALL))
+
+
+def record_catalog_insert(mapper, connection, target) -> None:
+    """after_insert on item, group and user models; like the others, remembered until the session commits."""
+    _record(target, counts_changed=True)
+
+
+def record_catalog_update(mapper, connection, target) -> None:
+    """after_update: an item moved to another group changes the totals of both groups."""
+    previous_groups = inspect(target).attrs.group_id.history.deleted if target.__tablename__ in _ITEM_TABLES else ()
+    _record(target, counts_changed=bool(previous_groups), group_ids=previous_groups)
+
+
+def record_catalog_delete(mapper, connection, target) -> None:
+    _record(target, counts_changed=True)
+
+
+def record_catalog_statement(orm_execute_state) -> None:
+    """do_orm_execute: Core INSERT / UPDATE / DELETE issued through a session (bulk inserts, imports)."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name in _GROUP_TABLES:
+        mode = _GROUP_TABLES[name]
+        _pending(orm_execute_state.session).update({("groups", mode, ALL), ("items", mode, ALL)})
+    elif name in _ITEM_TABLES:
+        mode = _ITEM_TABLES[name]
+        parameters = orm_execute_state.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters or {}]
+        if orm_execute_state.is_insert and rows and all("group_id" in row for row in rows):
+            changes = _item_changes(mode, {row["group_id"] for row in rows}, True)
+        else:
+            changes = {("items", mode, ALL), ("groups", mode, ALL)}
+        _pending(orm_execute_state.session).update(changes)
+
+
+def bump_catalog_version(session) -> None:
+    """
+    before_commit: a transaction that changed groups or items also bumps the shared version, for other
+    processes. Other cached values (the user count) stay process-local and expire with the TTL.
+    """
+    session.flush()
+    if not any(kind in ("groups", "items") for kind, _, _ in session.info.get(_PENDING, ())):
+        return
+    session.info[_COMMITTED_VERSION] = session.execute(
+        update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1).returning(CatalogVersion.version)
+    ).scalar()
+
+
+def apply_catalog_changes(session) -> None:
+    """after_commit: drops the entries the committed transaction changed."""
+    changes = session.info.pop(_PENDING, None)
+    version = session.info.pop(_COMMITTED_VERSION, None)
+    if changes:
+        catalog_cache.invalidate(changes, version)
+
+
+def discard_catalog_changes(session) -> None:
+    """after_rollback: nothing was written."""
+    session.info.pop(_PENDING, None)
+    session.info.pop(_COMMITTED_VERSION, None)
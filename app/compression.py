@@ -0,0 +1,201 @@
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional: pip install ".[brotli]"
+    brotli = None
+
+# Bodies smaller than this are sent as they are: the framing overhead outweighs the savings
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli quality 0-11; above ~6 the CPU cost grows much faster than the savings
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Content types (prefixes) never compressed: already compressed, or streamed event by event
+COMPRESSION_SKIP_TYPES = tuple(
+    value.strip().lower()
+    for value in os.getenv(
+        "COMPRESSION_SKIP_TYPES",
+        "text/event-stream,application/gzip,application/x-gzip,application/zip,image/,audio/,video/,font/woff",
+    ).split(",")
+    if value.strip()
+)
+# Path prefixes never compressed
+COMPRESSION_SKIP_PATHS = tuple(
+    value.strip() for value in os.getenv("COMPRESSION_SKIP_PATHS", "").split(",") if value.strip()
+)
+
+
+def supported_encodings() -> tuple[str, ...]:
+    """Content codings this process can produce, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding the client accepts (q > 0), or None for identity."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        if not coding:
+            continue
+        q = next((param[2:] for param in params if param.startswith("q=")), "1")
+        try:
+            accepted[coding.lower()] = float(q)
+        except ValueError:
+            accepted[coding.lower()] = 1.0
+    for coding in supported_encodings():
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli encoder; every chunk is flushed so streamed bodies are not held back."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+        else:
+            level = COMPRESSION_GZIP_LEVEL if level is None else level
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Whole-body compression."""
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> bytes:
+    return next((value for key, value in headers if key.lower() == name), b"")
+
+
+def _compressible(headers: list[tuple[bytes, bytes]]) -> bool:
+    if _header(headers, b"content-encoding"):
+        return False
+    content_type = _header(headers, b"content-type").decode("latin-1").lower()
+    return not content_type.startswith(COMPRESSION_SKIP_TYPES)
+
+
+def _etag_with_coding(etag: bytes, encoding: str) -> bytes:
+    """A compressed body is a different representation: strong ETags get the coding appended."""
+    if etag.startswith(b'"') and etag.endswith(b'"'):
+        return etag[:-1] + b"-" + encoding.encode() + b'"'
+    return etag
+
+
+def _strip_codings(if_none_match: bytes) -> tuple[bytes, Optional[str]]:
+    """If-None-Match with the coding suffixes removed, so endpoints compare against their own ETags."""
+    for encoding in ("br", "gzip"):
+        suffix = b"-" + encoding.encode() + b'"'
+        if suffix in if_none_match:
+            return if_none_match.replace(suffix, b'"'), encoding
+    return if_none_match, None
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli (when the brotli package is installed) by Accept-Encoding.
+    Bodies under COMPRESSION_MIN_SIZE, already encoded bodies, skipped content types and paths
+    pass through untouched; streamed bodies are compressed chunk by chunk once they pass the threshold.
+    ETags of compressed bodies get a -gzip / -br suffix, which is removed again from If-None-Match.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(COMPRESSION_SKIP_PATHS):
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope["headers"], b"accept-encoding").decode("latin-1")
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        etag_coding = None
+        if if_none_match:
+            if_none_match, etag_coding = _strip_codings(if_none_match)
+            headers = [(name, value) for name, value in scope["headers"] if name != b"if-none-match"]
+            scope = {**scope, "headers": headers + [(b"if-none-match", if_none_match)]}
+
+        start_message = None
+        pending: list[bytes] = []
+        compressor: Optional[StreamCompressor] = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    headers = message["headers"]
+                    if etag_coding:
+                        # The client's copy is the compressed representation
+                        headers = [
+                            (name, _etag_with_coding(value, etag_coding) if name.lower() == b"etag" else value)
+                            for name, value in headers
+                        ]
+                    # A 304 carries the Vary of the 200 it stands for (RFC 9110)
+                    message = {**message, "headers": [*headers, (b"vary", b"Accept-Encoding")]}
+                elif message["status"] not in (204, 304) and _compressible(message["headers"]):
+                    start_message = message
+                    return
+            elif message["type"] == "http.response.body" and start_message is not None:
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if compressor is not None:
+                    data = compressor.compress(body) if body else b""
+                    if not more_body:
+                        data += compressor.finish()
+                    if data or not more_body:
+                        await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                    return
+
+                pending.append(body)
+                size = sum(len(chunk) for chunk in pending)
+                headers = [(name, value) for name, value in start_message["headers"] if name.lower() != b"content-length"]
+                headers.append((b"vary", b"Accept-Encoding"))
+                if size < self.minimum_size:
+                    if more_body:
+                        return
+                    # Complete body under the threshold: send it as it is
+                    headers.append((b"content-length", str(size).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": b"".join(pending)})
+                    return
+
+                headers = [
+                    (name, _etag_with_coding(value, encoding) if name.lower() == b"etag" else value)
+                    for name, value in headers
+                ]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    payload = compress(b"".join(pending), encoding)
+                    headers.append((b"content-length", str(len(payload)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": payload})
+                    return
+                compressor = StreamCompressor(encoding)
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": compressor.compress(b"".join(pending)), "more_body": True})
+                pending.clear()
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,6 +3,8 @@ import os
 from sqlmodel import Session, SQLModel, create_engine
 from sqlalchemy import text
 
+from .tracing import span
+
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/postgres")
 
 # Disable SQL echo in production for performance and security
@@ -16,5 +18,6 @@ def init_db():
 
 
 def get_session():
-    with Session(engine) as session:
+    # Not the parent of other spans: FastAPI opens and closes the session in different worker threads
+    with span("db.session", activate=False), Session(engine) as session:
         yield session
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine
+from .models import (
+    ContentFingerprint,
+    FillBlank,
+    FillBlankGroup,
+    GuessObject,
+    GuessObjectGroup,
+    TargetLanguage,
+    TranslatePlToTarget,
+    TranslatePlToTargetGroup,
+    TranslateTargetToPl,
+    TranslateTargetToPlGroup,
+)
+
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "true").lower() in ("true", "1", "yes")
+# Estimated Jaccard similarity of character shingles above which a generated item counts as a near duplicate
+DEDUPE_NEAR_THRESHOLD = float(os.getenv("DEDUPE_NEAR_THRESHOLD", "0.7"))
+# How many rejected texts are quoted back to the model when asking for replacements
+DEDUPE_AVOID_HINT_ITEMS = int(os.getenv("DEDUPE_AVOID_HINT_ITEMS", "15"))
+
+SHINGLE_SIZE = 4
+MINHASH_PERMUTATIONS = 64
+# 16 bands x 4 rows: pairs above ~0.5 similarity almost always share a bucket
+LSH_BANDS = 16
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+# Fixed (derived, not random) so signatures stored in the database stay comparable across processes
+_PERMUTATIONS = [
+    (_hash64(f"a{i}") % (_MERSENNE_PRIME - 1) + 1, _hash64(f"b{i}") % _MERSENNE_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+
+def content_hash(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def minhash_signature(normalized: str) -> list[int]:
+    """MinHash over character shingles of the normalized text."""
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    hashes = [_hash64(shingle) for shingle in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(left: list[int], right: list[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(left, right) if x == y) / MINHASH_PERMUTATIONS
+
+
+def lsh_bands(signature: list[int]):
+    """LSH bucket keys of a signature; similar signatures share at least one key."""
+    for band in range(LSH_BANDS):
+        yield (band, *signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND])
+
+
+@dataclass(frozen=True)
+class DedupeSource:
+    item_model: type
+    group_model: type
+    fields: tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        return self.item_model.__tablename__
+
+
+# Generation kind -> catalog tables its output is compared with.
+# Both translation directions share sentences, so generated pairs are checked against both.
+DEDUPE_SOURCES: dict[str, tuple[DedupeSource, ...]] = {
+    "translate": (
+        DedupeSource(TranslatePlToTarget, TranslatePlToTargetGroup, ("text_target",)),
+        DedupeSource(TranslateTargetToPl, TranslateTargetToPlGroup, ("text_target",)),
+    ),
+    "guess_object": (DedupeSource(GuessObject, GuessObjectGroup, ("description_target",)),),
+    "fill_blank": (DedupeSource(FillBlank, FillBlankGroup, ("sentence_with_blank", "answer")),),
+}
+
+# Counters per kind since startup, shown in /api/admin/ai/stats
+dedupe_stats: dict[str, dict[str, int]] = {}
+
+
+def _item_text(values) -> str:
+    return " ".join(str(value or "") for value in values)
+
+
+def _sync_source(session: Session, source: DedupeSource, language: TargetLanguage) -> list[tuple[str, list[int]]]:
+    """
+    Returns (hash, signature) for every item of `source` in `language`, computing and storing
+    fingerprints only for items that are new or whose text changed since the last run.
+    """
+    Item, Group = source.item_model, source.group_model
+    columns = [getattr(Item, field) for field in source.fields]
+    rows = session.exec(
+        select(Item.id, ContentFingerprint, *columns)
+        .join(Group, Item.group_id == Group.id)
+        .outerjoin(
+            ContentFingerprint,
+            (ContentFingerprint.item_id == Item.id) & (ContentFingerprint.source == source.name),
+        )
+        .where(Group.language == language)
+    ).all()
+
+    fingerprints = []
+    changed = 0
+    seen = set()
+    for item_id, fingerprint, *values in rows:
+        if item_id in seen:
+            # Duplicate row from before the (source, item_id) constraint existed
+            session.delete(fingerprint)
+            changed += 1
+            continue
+        seen.add(item_id)
+        normalized = normalize_text(_item_text(values))
+        digest = content_hash(normalized)
+        if fingerprint is None:
+            fingerprint = ContentFingerprint(source=source.name, item_id=item_id, content_hash=digest)
+        if fingerprint.content_hash != digest or len(fingerprint.signature or []) != MINHASH_PERMUTATIONS:
+            fingerprint.content_hash = digest
+            fingerprint.signature = minhash_signature(normalized)
+        if fingerprint not in session or fingerprint in session.dirty:
+            session.add(fingerprint)
+            changed += 1
+        fingerprints.append((fingerprint.content_hash, list(fingerprint.signature)))
+
+    if changed:
+        # Fingerprints of deleted items are dropped at the same time
+        session.exec(
+            delete(ContentFingerprint)
+            .where(ContentFingerprint.source == source.name)
+            .where(ContentFingerprint.item_id.not_in(select(Item.id)))
+        )
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another process indexed the same items first; its rows are equivalent, the rest is redone next time
+            session.rollback()
+            return fingerprints
+        print(f"Dedupe [{source.name}/{language.value}]: indexed {changed} items")
+    return fingerprints
+
+
+def _load_fingerprints(kind: str, language: TargetLanguage) -> list[tuple[str, list[int]]]:
+    with Session(engine) as session:
+        fingerprints = []
+        for source in DEDUPE_SOURCES.get(kind, ()):
+            fingerprints.extend(_sync_source(session, source, language))
+        return fingerprints
+
+
+class DedupeIndex:
+    """
+    Exact (normalized hash) and near-duplicate (MinHash + LSH) index of one generation kind
+    in one language. Loaded from the persistent content_fingerprint table on first use;
+    items accepted during the run are added so batches of the same run are deduplicated too.
+    """
+
+    def __init__(self, kind: str, language: TargetLanguage, threshold: float = DEDUPE_NEAR_THRESHOLD):
+        self.kind = kind
+        self.language = language
+        self.threshold = threshold
+        self.fields = DEDUPE_SOURCES[kind][0].fields
+        self.rejected: list[str] = []
+        self._hashes: set[str] = set()
+        self._signatures: list[list[int]] = []
+        self._buckets: dict[tuple, list[int]] = {}
+        self._loaded = False
+
+    async def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        for digest, signature in await run_in_threadpool(_load_fingerprints, self.kind, self.language):
+            self._add(digest, signature)
+
+    def _add(self, digest: str, signature: list[int]) -> None:
+        self._hashes.add(digest)
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in lsh_bands(signature):
+            self._buckets.setdefault(key, []).append(position)
+
+    def _match(self, digest: str, signature: list[int]) -> str | None:
+        if digest in self._hashes:
+            return "exact"
+        candidates = {position for key in lsh_bands(signature) for position in self._buckets.get(key, ())}
+        if any(similarity(signature, self._signatures[position]) >= self.threshold for position in candidates):
+            return "near"
+        return None
+
+    def seed(self, items: list[dict]) -> None:
+        """Adds items that were already accepted (e.g. restored from a job checkpoint)."""
+        for item in items:
+            normalized = normalize_text(_item_text(item.get(field) for field in self.fields))
+            self._add(content_hash(normalized), minhash_signature(normalized))
+
+    def filter(self, items: list[dict]) -> list[dict]:
+        """Returns the items that are neither exact nor near duplicates and adds them to the index."""
+        stats = dedupe_stats.setdefault(self.kind, {"accepted": 0, "exact": 0, "near": 0})
+        accepted = []
+        for item in items:
+            text = _item_text(item.get(field) for field in self.fields)
+            normalized = normalize_text(text)
+            digest = content_hash(normalized)
+            signature = minhash_signature(normalized)
+            reason = self._match(digest, signature)
+            if reason:
+                stats[reason] += 1
+                self.rejected.append(text)
+                continue
+            self._add(digest, signature)
+            stats["accepted"] += 1
+            accepted.append(item)
+        if len(accepted) < len(items):
+            print(f"[{self.kind}] Dedupe rejected {len(items) - len(accepted)}/{len(items)} items")
+        return accepted
+
+    def avoid_hint(self) -> str:
+        """Prompt suffix listing recently rejected items, used when asking for replacements."""
+        if not self.rejected:
+            return ""
+        listed = "\n".join(f"- {text}" for text in self.rejected[-DEDUPE_AVOID_HINT_ITEMS:])
+        return f"\n\nTe treści już istnieją - NIE powtarzaj ich ani ich wariantów, wygeneruj inne:\n{listed}"
+
+
+def dedupe_index(kind: str, language: TargetLanguage) -> DedupeIndex | None:
+    """A fresh index for one generation run, or None when deduplication is disabled."""
+    if not DEDUPE_ENABLED or kind not in DEDUPE_SOURCES:
+        return None
+    return DedupeIndex(kind, language)
+
+
+def get_dedupe_stats() -> dict:
+    return {kind: dict(counts) for kind, counts in dedupe_stats.items()}
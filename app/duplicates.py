@@ -0,0 +1,271 @@
+import os
+import uuid
+from typing import Optional
+
+from sqlalchemy import DDL, delete, text, update
+from sqlmodel import Session, select
+
+from .dedupe import lsh_bands, minhash_signature, normalize_text, similarity
+from .exports import EXPORT_SOURCES, ExportSource
+from .models import ContentFingerprint, DuplicateCluster, DuplicateItem, DuplicateResolution, TargetLanguage
+
+# pg_trgm similarity (shared trigrams / all trigrams) above which two items are listed as near duplicates
+DUPLICATES_THRESHOLD = float(os.getenv("DUPLICATES_THRESHOLD", "0.6"))
+DUPLICATES_MAX_CLUSTERS = int(os.getenv("DUPLICATES_MAX_CLUSTERS", "500"))
+DUPLICATE_ACTIONS = ("merge", "delete")
+
+# Content mode (as in EXPORT_SOURCES) -> text columns with a trigram index; the first is compared by default
+DUPLICATE_FIELDS: dict[str, tuple[str, ...]] = {
+    "fiszki": ("text_target", "text_pl"),
+    "translate_pl_fr": ("text_target", "text_pl"),
+    "translate_fr_pl": ("text_target", "text_pl"),
+    "guess_object": ("description_target",),
+    "fill_blank": ("sentence_with_blank",),
+}
+
+
+# ---- Schema (PostgreSQL only; registered on table creation in app/main.py) ----
+
+# pg_trgm is a trusted extension (PostgreSQL 13+), so the database owner can create it.
+# Without it the indexes are skipped and the endpoint falls back to the in-process comparison.
+TRIGRAM_SETUP_DDL = DDL(
+    "DO $$\nBEGIN\n"
+    "    CREATE EXTENSION IF NOT EXISTS pg_trgm;\n"
+    "EXCEPTION WHEN insufficient_privilege OR undefined_file THEN\n"
+    "    RAISE NOTICE 'pg_trgm is not available, duplicate detection will not use trigram indexes';\n"
+    "END $$"
+)
+
+
+def trigram_index_name(table: str, field: str) -> str:
+    return f"ix_{table}_{field}_trgm"
+
+
+def trigram_table_ddl(mode: str) -> DDL:
+    """GIN trigram indexes on the compared columns of one mode, when pg_trgm is installed."""
+    table = EXPORT_SOURCES[mode].item_model.__tablename__
+    statements = "".join(
+        f"\n        CREATE INDEX IF NOT EXISTS {trigram_index_name(table, field)} ON {table} USING GIN ({field} gin_trgm_ops);"
+        for field in DUPLICATE_FIELDS[mode]
+    )
+    return DDL(
+        "DO $$\nBEGIN\n"
+        "    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN"
+        + statements
+        + "\n    END IF;\nEND $$"
+    )
+
+
+TRIGRAM_TABLE_DDL = {EXPORT_SOURCES[mode].item_model.__table__: trigram_table_ddl(mode) for mode in DUPLICATE_FIELDS}
+
+
+# ---- Detection ----
+
+def trigram_available(session: Session) -> bool:
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    return session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+def _trigram_pairs(
+    session: Session, source: ExportSource, field: str, language: Optional[TargetLanguage], threshold: float
+) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+    """
+    Similar pairs within a language from a self-join on the `%` operator: every row probes the
+    trigram index for its neighbours instead of being compared with every other row.
+    """
+    item_table = source.item_model.__tablename__
+    group_table = source.group_model.__tablename__
+    # `%` compares against this setting; set_config(..., true) keeps it to the current transaction
+    session.execute(text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"), {"threshold": str(threshold)})
+    language_filter = "WHERE ga.language = :language" if language else ""
+    rows = session.execute(
+        text(
+            f"SELECT a.id, b.id, similarity(a.{field}, b.{field})"
+            f" FROM {item_table} a JOIN {group_table} ga ON ga.id = a.group_id"
+            f" JOIN {item_table} b ON b.{field} % a.{field} AND b.id > a.id"
+            f" JOIN {group_table} gb ON gb.id = b.group_id AND gb.language = ga.language"
+            f" {language_filter}"
+        ),
+        {"language": language.name} if language else {},
+    )
+    return [(left, right, score) for left, right, score in rows]
+
+
+def _minhash_pairs(
+    session: Session, source: ExportSource, field: str, language: Optional[TargetLanguage], threshold: float
+) -> list[tuple[uuid.UUID, uuid.UUID, float]]:
+    """
+    Fallback without pg_trgm (SQLite in development): MinHash signatures bucketed with LSH as in
+    app/dedupe.py, so only items sharing a bucket are compared. Scores are shingle Jaccard
+    estimates, close to but not the same as trigram similarity.
+    """
+    Item, Group = source.item_model, source.group_model
+    query = select(Item.id, getattr(Item, field), Group.language).join(Group, Group.id == Item.group_id)
+    if language:
+        query = query.where(Group.language == language)
+    signatures = {}
+    buckets: dict[tuple, list[uuid.UUID]] = {}
+    for item_id, value, item_language in session.exec(query):
+        signature = minhash_signature(normalize_text(value))
+        signatures[item_id] = signature
+        for key in lsh_bands(signature):
+            buckets.setdefault((item_language, *key), []).append(item_id)
+
+    candidates = {
+        (left, right) if left < right else (right, left)
+        for ids in buckets.values() if len(ids) > 1
+        for i, left in enumerate(ids) for right in ids[i + 1:]
+    }
+    pairs = []
+    for left, right in candidates:
+        score = similarity(signatures[left], signatures[right])
+        if score >= threshold:
+            pairs.append((left, right, score))
+    return pairs
+
+
+def _clusters(pairs: list[tuple[uuid.UUID, uuid.UUID, float]]) -> list[tuple[set[uuid.UUID], float]]:
+    """Connected components of the similarity graph with their highest pair score, largest first."""
+    parent: dict[uuid.UUID, uuid.UUID] = {}
+
+    def find(node: uuid.UUID) -> uuid.UUID:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for left, right, _ in pairs:
+        parent[find(left)] = find(right)
+
+    members: dict[uuid.UUID, set[uuid.UUID]] = {}
+    scores: dict[uuid.UUID, float] = {}
+    for left, right, score in pairs:
+        root = find(left)
+        members.setdefault(root, set()).update((left, right))
+        scores[root] = max(scores.get(root, 0.0), score)
+    return sorted(((members[root], scores[root]) for root in members), key=lambda c: (-len(c[0]), -c[1]))
+
+
+def find_duplicate_clusters(
+    session: Session,
+    mode: str,
+    field: str,
+    language: Optional[TargetLanguage] = None,
+    threshold: float = DUPLICATES_THRESHOLD,
+    limit: int = DUPLICATES_MAX_CLUSTERS,
+) -> list[DuplicateCluster]:
+    """Groups of near-identical items of one mode (within a language), largest clusters first."""
+    source = EXPORT_SOURCES[mode]
+    find_pairs = _trigram_pairs if trigram_available(session) else _minhash_pairs
+    clusters = _clusters(find_pairs(session, source, field, language, threshold))[:limit]
+    if not clusters:
+        return []
+
+    Item, Group = source.item_model, source.group_model
+    ids = [item_id for members, _ in clusters for item_id in members]
+    rows = {
+        row.id: row
+        for row in session.exec(
+            select(Item.id, Item.group_id, Group.name, Group.language, getattr(Item, field).label("text"), Item.created_at)
+            .join(Group, Group.id == Item.group_id)
+            .where(Item.id.in_(ids))
+        )
+    }
+    result = []
+    for members, score in clusters:
+        items = sorted((rows[item_id] for item_id in members if item_id in rows), key=lambda row: (row.created_at, row.id))
+        if len(items) < 2:
+            continue
+        result.append(
+            DuplicateCluster(
+                mode=mode,
+                field=field,
+                language=items[0].language,
+                similarity=round(score, 3),
+                items=[
+                    DuplicateItem(id=row.id, group_id=row.group_id, group_name=row.name, text=row.text, created_at=row.created_at)
+                    for row in items
+                ],
+            )
+        )
+    return result
+
+
+# ---- Resolution ----
+
+def missing_items(session: Session, mode: str, item_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+    Item = EXPORT_SOURCES[mode].item_model
+    found = set(session.exec(select(Item.id).where(Item.id.in_(item_ids))).all())
+    return [item_id for item_id in dict.fromkeys(item_ids) if item_id not in found]
+
+
+def overlapping_items(clusters: list[DuplicateResolution]) -> list[uuid.UUID]:
+    """
+    Ids used more than once across the clusters (a kept item removed by another cluster, an id
+    removed twice). Merged progress could otherwise be deleted with an item kept earlier.
+    """
+    seen, overlapping = set(), []
+    for cluster in clusters:
+        for item_id in (cluster.keep_id, *(item_id for item_id in cluster.remove_ids if item_id != cluster.keep_id)):
+            if item_id in seen and item_id not in overlapping:
+                overlapping.append(item_id)
+            seen.add(item_id)
+    return overlapping
+
+
+def _progress_rank(progress) -> tuple:
+    return progress.learned, progress.half_learned, progress.last_reviewed
+
+
+def _merge_progress(session: Session, source: ExportSource, keep_id: uuid.UUID, remove_ids: list[uuid.UUID]) -> int:
+    """
+    Keeps, per user, the most advanced progress row of the cluster (learned, then half learned,
+    then most recently reviewed) and points it at the kept item; returns how many rows moved.
+    """
+    Progress, column = source.progress_model, source.progress_item_column
+    best = {}
+    for progress in session.exec(select(Progress).where(column.in_([keep_id, *remove_ids]))).all():
+        current = best.get(progress.user_id)
+        if current is None or _progress_rank(progress) > _progress_rank(current):
+            best[progress.user_id] = progress
+
+    moved = 0
+    for user_id, progress in best.items():
+        if getattr(progress, source.progress_item_field) == keep_id:
+            continue
+        session.exec(delete(Progress).where(Progress.user_id == user_id).where(column == keep_id))
+        session.exec(
+            update(Progress).where(Progress.id == progress.id).values({source.progress_item_field: keep_id}),
+            execution_options={"synchronize_session": False},
+        )
+        moved += 1
+    return moved
+
+
+def resolve_duplicates(session: Session, mode: str, action: str, clusters: list[DuplicateResolution]) -> tuple[int, int]:
+    """
+    Deletes the `remove_ids` of every cluster in one transaction. With "merge" the users' progress
+    on them is moved to `keep_id` first; with "delete" it is deleted with the items.
+    Returns (items removed, progress rows moved).
+    """
+    source = EXPORT_SOURCES[mode]
+    Item, Progress = source.item_model, source.progress_model
+    removed = moved = 0
+    for cluster in clusters:
+        remove_ids = [item_id for item_id in dict.fromkeys(cluster.remove_ids) if item_id != cluster.keep_id]
+        if not remove_ids:
+            continue
+        if action == "merge":
+            moved += _merge_progress(session, source, cluster.keep_id, remove_ids)
+        session.exec(delete(Progress).where(source.progress_item_column.in_(remove_ids)), execution_options={"synchronize_session": False})
+        session.exec(
+            delete(ContentFingerprint)
+            .where(ContentFingerprint.source == Item.__tablename__)
+            .where(ContentFingerprint.item_id.in_(remove_ids))
+        )
+        # Bulk DELETE: the catalog cache of the mode is invalidated by record_catalog_statement
+        removed += session.exec(delete(Item).where(Item.id.in_(remove_ids)), execution_options={"synchronize_session": False}).rowcount
+    session.commit()
+    return removed, moved
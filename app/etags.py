@@ -0,0 +1,49 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from .serialization import msgpack, wants_msgpack
+
+# Clients keep their copy but revalidate it on every use
+ETAG_CACHE_CONTROL = "no-cache"
+
+
+def collection_version(session: Session, model, *criteria) -> str:
+    """
+    Version of the rows of `model` matching `criteria`: row count + max(updated_at).
+    updated_at is bumped by the before_update listeners and set on insert; deletes change the count.
+    """
+    count, latest = session.exec(select(func.count(model.id), func.max(model.updated_at)).where(*criteria)).one()
+    return f"{model.__tablename__}:{count}:{latest.isoformat() if latest else '-'}"
+
+
+def make_etag(request: Request, *versions: str) -> str:
+    """Strong ETag for the versions of the collections a response is built from, per URL and representation."""
+    representation = "msgpack" if msgpack is not None and wants_msgpack(request.headers.get("accept", "")) else "json"
+    key = "|".join((request.url.path, str(request.query_params), representation, *versions))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Sets the ETag on `response`; returns a 304 Not Modified response when the client's copy
+    is current, in which case the endpoint returns it instead of loading the rows.
+    """
+    headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
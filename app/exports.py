@@ -0,0 +1,165 @@
+import csv
+import datetime
+import enum
+import io
+import json
+import os
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from .database import engine
+from .models import (
+    FillBlank,
+    FillBlankGroup,
+    FillBlankProgress,
+    Fiszka,
+    FiszkaProgress,
+    FiszkiGroup,
+    GuessObject,
+    GuessObjectGroup,
+    GuessObjectProgress,
+    TargetLanguage,
+    TranslatePlToTarget,
+    TranslatePlToTargetGroup,
+    TranslatePlToTargetProgress,
+    TranslateTargetToPl,
+    TranslateTargetToPlGroup,
+    TranslateTargetToPlProgress,
+)
+from .serialization import dumps
+
+# Rows fetched per round trip from the server-side cursor, and per chunk written to the response
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_KINDS = ("groups", "items", "progress")
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    item_model: type
+    group_model: type
+    progress_model: type
+    progress_item_field: str
+
+    @property
+    def progress_item_column(self):
+        return getattr(self.progress_model, self.progress_item_field)
+
+
+# Content mode -> tables; mode names as in /user/dashboard/stats
+EXPORT_SOURCES: dict[str, ExportSource] = {
+    "fiszki": ExportSource(Fiszka, FiszkiGroup, FiszkaProgress, "fiszka_id"),
+    "translate_pl_fr": ExportSource(TranslatePlToTarget, TranslatePlToTargetGroup, TranslatePlToTargetProgress, "item_id"),
+    "translate_fr_pl": ExportSource(TranslateTargetToPl, TranslateTargetToPlGroup, TranslateTargetToPlProgress, "item_id"),
+    "guess_object": ExportSource(GuessObject, GuessObjectGroup, GuessObjectProgress, "item_id"),
+    "fill_blank": ExportSource(FillBlank, FillBlankGroup, FillBlankProgress, "item_id"),
+}
+
+
+def export_query(
+    mode: str,
+    kind: str,
+    language: Optional[TargetLanguage] = None,
+    group_id: Optional[uuid.UUID] = None,
+    user_id: Optional[uuid.UUID] = None,
+) -> Select:
+    """SELECT over the table of `kind` in `mode`, ordered by primary key so exports are stable."""
+    source = EXPORT_SOURCES[mode]
+    Item, Group = source.item_model, source.group_model
+    if kind == "groups":
+        query = select(Group.__table__).order_by(Group.id)
+        if language:
+            query = query.where(Group.language == language)
+        return query
+
+    if kind == "items":
+        query = select(Item.__table__).order_by(Item.id)
+        if group_id:
+            query = query.where(Item.group_id == group_id)
+    else:
+        Progress = source.progress_model
+        query = select(Progress.__table__).order_by(Progress.user_id, source.progress_item_column)
+        if user_id:
+            query = query.where(Progress.user_id == user_id)
+        if group_id or language:
+            query = query.join(Item, Item.id == source.progress_item_column)
+        if group_id:
+            query = query.where(Item.group_id == group_id)
+    if language:
+        query = query.join(Group, Group.id == Item.group_id).where(Group.language == language)
+    return query
+
+
+def _plain(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _csv_value(value):
+    value = _plain(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+def _stream_rows(query: Select) -> Iterator[tuple[list[str], list]]:
+    """Yields (column names, chunk of rows) from a server-side cursor; holds one chunk at a time."""
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(query)
+        columns = list(result.keys())
+        for chunk in result.partitions():
+            yield columns, chunk
+
+
+def _encode(query: Select, fmt: str) -> Iterator[bytes]:
+    header_written = False
+    for columns, chunk in _stream_rows(query):
+        if fmt == "jsonl":
+            yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in chunk)
+            continue
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows([_csv_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+    if fmt == "csv" and not header_written:
+        # Empty export: still a valid CSV with the column names
+        yield (",".join(column.name for column in query.selected_columns) + "\r\n").encode("utf-8")
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(query: Select, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Body of an export response: CSV (with header row) or JSON Lines, optionally gzip-compressed."""
+    chunks = _encode(query, fmt)
+    return _gzip(chunks) if gzip else chunks
+
+
+def export_filename(mode: str, kind: str, fmt: str, gzip: bool) -> str:
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d")
+    return f"{mode}_{kind}_{stamp}.{fmt}" + (".gz" if gzip else "")
+
+
+def export_media_type(fmt: str, gzip: bool) -> str:
+    if gzip:
+        return "application/gzip"
+    return "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson"
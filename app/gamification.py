@@ -1,8 +1,9 @@
 import os
 import random
-from openai import OpenAI
 from enum import Enum
 
+from .ai import acreate_response
+
 
 # Import TargetLanguage from models (or define inline for standalone use)
 class TargetLanguage(str, Enum):
@@ -111,54 +112,60 @@ WORDLE_FALLBACK_WORDS = {
     ]
 }
 
-# Language-specific prompts for Wordle
+# Language-specific prompts for Wordle (a batch of words per call, for the word pool)
 WORDLE_PROMPTS = {
-    TargetLanguage.FR: """Podaj JEDNO łatwe, popularne francuskie słowo składające się DOKŁADNIE z 5 liter.
-Słowo powinno być:
-- Rzeczownikiem lub przymiotnikiem
-- Powszechnie znanym (poziom A1-A2)
+    TargetLanguage.FR: """Podaj {count} RÓŻNYCH, popularnych francuskich słów składających się DOKŁADNIE z 5 liter.
+Słowa powinny być:
+- Rzeczownikami lub przymiotnikami
+- Powszechnie znane (poziom {level})
 - BEZ akcentów (np. ECOLE zamiast ÉCOLE)
 
-Odpowiedz TYLKO samym słowem, wielkimi literami, bez żadnych dodatkowych znaków czy wyjaśnień.
-Przykłady poprawnych odpowiedzi: POMME, LIVRE, CHIEN""",
-
-    TargetLanguage.EN: """Podaj JEDNO łatwe, popularne angielskie słowo składające się DOKŁADNIE z 5 liter.
-Słowo powinno być:
-- Rzeczownikiem lub przymiotnikiem
-- Powszechnie znanym (poziom A1-A2)
-
-Odpowiedz TYLKO samym słowem, wielkimi literami, bez żadnych dodatkowych znaków czy wyjaśnień.
-Przykłady poprawnych odpowiedzi: APPLE, HOUSE, WATER"""
+Odpowiedz TYLKO słowami, wielkimi literami, po jednym w linii, bez numeracji i wyjaśnień.
+Przykład odpowiedzi:
+POMME
+LIVRE
+CHIEN""",
+
+    TargetLanguage.EN: """Podaj {count} RÓŻNYCH, popularnych angielskich słów składających się DOKŁADNIE z 5 liter.
+Słowa powinny być:
+- Rzeczownikami lub przymiotnikami
+- Powszechnie znane (poziom {level})
+
+Odpowiedz TYLKO słowami, wielkimi literami, po jednym w linii, bez numeracji i wyjaśnień.
+Przykład odpowiedzi:
+APPLE
+HOUSE
+WATER"""
 }
 
 
-def generate_wordle_word(level: str | None = None, language: TargetLanguage = TargetLanguage.FR) -> str:
-    """Generates a 5-letter word using AI, with fallback to static list. Supports multiple languages."""
-    fallback_words = WORDLE_FALLBACK_WORDS.get(language, WORDLE_FALLBACK_WORDS[TargetLanguage.FR])
+def is_valid_wordle_word(word: str) -> bool:
+    return len(word) == 5 and word.isascii() and word.isalpha()
 
-    try:
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            print(f"Wordle [{language.value}]: No API key, using fallback")
-            return random.choice(fallback_words).upper()
-
-        client = OpenAI(api_key=api_key)
-        prompt = WORDLE_PROMPTS.get(language, WORDLE_PROMPTS[TargetLanguage.FR])
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-        word = response.output_text.strip().upper()
+def random_fallback_word(language: TargetLanguage = TargetLanguage.FR) -> str:
+    fallback_words = WORDLE_FALLBACK_WORDS.get(language, WORDLE_FALLBACK_WORDS[TargetLanguage.FR])
+    return random.choice([w for w in fallback_words if is_valid_wordle_word(w)]).upper()
 
-        # Validate: exactly 5 letters, only A-Z
-        if len(word) == 5 and word.isalpha():
-            print(f"Wordle [{language.value}]: AI generated word: {word}")
-            return word
-        else:
-            print(f"Wordle [{language.value}]: AI returned invalid word '{word}', using fallback")
-            return random.choice(fallback_words).upper()
 
+async def generate_wordle_words(count: int, level: str, language: TargetLanguage = TargetLanguage.FR) -> list[str]:
+    """Generates up to `count` distinct, validated 5-letter words with one AI call. Empty list on failure."""
+    if not os.environ.get("OPENAI_API_KEY"):
+        return []
+    try:
+        prompt = WORDLE_PROMPTS.get(language, WORDLE_PROMPTS[TargetLanguage.FR]).format(count=count, level=level)
+        output_text = await acreate_response(prompt, "wordle")
     except Exception as e:
-        print(f"Wordle [{language.value}]: AI error ({e}), using fallback")
-        return random.choice(fallback_words).upper()
+        print(f"Wordle [{language.value}]: AI error ({e})")
+        return []
+
+    words = []
+    for line in output_text.split():
+        word = line.strip(" ,.;-*").upper()
+        if is_valid_wordle_word(word) and word not in words:
+            words.append(word)
+    print(f"Wordle [{language.value}/{level}]: AI generated {len(words)} valid words")
+    return words[:count]
 
 
 def check_wordle_guess(target: str, guess: str) -> list[str]:
@@ -188,3 +195,14 @@ def check_wordle_guess(target: str, guess: str) -> list[str]:
                 target_letters_count[char] -= 1
 
     return result
+
+
+def apply_wordle_guess(game, guess: str) -> list[str]:
+    """Scores `guess` against the game's target and records it; updates is_solved / game_over."""
+    guess = guess.upper()
+    result = check_wordle_guess(game.target_word, guess)
+    game.attempts.append(guess)
+    game.results.append(result)
+    game.is_solved = all(status == "correct" for status in result)
+    game.game_over = game.is_solved or len(game.attempts) >= game.max_attempts
+    return result
@@ -0,0 +1,188 @@
+import csv
+import io
+import os
+from typing import Callable, Iterator, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from .models import ImportReport, ImportRowError
+
+# Rows are inserted with one executemany per batch
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Only the first errors are listed in the report; the rest are just counted
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+
+class CsvImportError(Exception):
+    """The file as a whole cannot be imported (bad headers, not UTF-8)."""
+
+
+class RowError(Exception):
+    """One row cannot be imported; reported and skipped."""
+
+
+def _column_values(table, item: SQLModel) -> dict:
+    return {column.name: getattr(item, column.name) for column in table.columns}
+
+
+def bulk_insert_returning(session: Session, items: list[SQLModel]) -> list[dict]:
+    """
+    Inserts model instances of one table with a single multi-row INSERT ... RETURNING
+    and returns the stored rows as dicts, in the order of `items`. Does not commit.
+    """
+    if not items:
+        return []
+    table = type(items[0]).__table__
+    result = session.execute(
+        insert(table).returning(*table.columns, sort_by_parameter_order=True),
+        [_column_values(table, item) for item in items],
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+class BatchInserter:
+    """Buffers validated model instances and writes them with bulk INSERTs of `batch_size` rows."""
+
+    def __init__(self, session: Session, model: type[SQLModel], batch_size: int = IMPORT_BATCH_SIZE):
+        self.session = session
+        self.table = model.__table__
+        self.batch_size = batch_size
+        self.count = 0
+        self._rows: list[dict] = []
+
+    def add(self, item: SQLModel) -> None:
+        self._rows.append(_column_values(self.table, item))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            self.session.execute(insert(self.table), self._rows)
+            self.count += len(self._rows)
+            self._rows = []
+
+
+class _Report:
+    def __init__(self):
+        self.skipped = 0
+        self.errors: list[ImportRowError] = []
+
+    def error(self, row: int, message: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(row=row, error=message))
+
+
+def _csv_rows(
+    upload: UploadFile,
+    reader_factory: Callable,
+    report: _Report,
+    check_reader: Optional[Callable] = None,
+) -> Iterator[tuple[int, list | dict]]:
+    """
+    Yields (line number, row) while decoding the spooled upload incrementally;
+    rows the csv module cannot parse are reported and skipped.
+    """
+    upload.file.seek(0)
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        reader = reader_factory(text)
+        if check_reader:
+            check_reader(reader)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                report.error(reader.line_num, str(e))
+                continue
+            yield reader.line_num, row
+    except UnicodeDecodeError:
+        raise CsvImportError("File must be UTF-8 encoded")
+    finally:
+        # The upload is closed by the framework, not by the wrapper
+        text.detach()
+
+
+def _finish(session: Session, inserter: BatchInserter, report: _Report, noun: str) -> ImportReport:
+    inserter.flush()
+    session.commit()
+    message = f"Successfully imported {inserter.count} {noun}"
+    if report.skipped:
+        message += f", skipped {report.skipped} invalid rows"
+    return ImportReport(message=message, imported=inserter.count, skipped=report.skipped, errors=report.errors)
+
+
+def import_csv_dicts(
+    session: Session,
+    upload: UploadFile,
+    model: type[SQLModel],
+    header_sets: list[set[str]],
+    build: Callable[[dict], SQLModel],
+    noun: str = "items",
+) -> ImportReport:
+    """
+    Imports a CSV with a header row. The header must contain one of `header_sets`;
+    `build` turns a row dict into a model instance or raises RowError.
+    """
+    def check_headers(reader: csv.DictReader) -> None:
+        fieldnames = set(reader.fieldnames or ())
+        if not any(headers <= fieldnames for headers in header_sets):
+            raise CsvImportError(f"CSV must contain headers: {', '.join(sorted(header_sets[0]))}")
+
+    report = _Report()
+    inserter = BatchInserter(session, model)
+    try:
+        for line, row in _csv_rows(upload, csv.DictReader, report, check_headers):
+            try:
+                inserter.add(build(row))
+            except RowError as e:
+                report.error(line, str(e))
+    except Exception:
+        session.rollback()
+        raise
+    return _finish(session, inserter, report, noun)
+
+
+def import_csv_first_column(
+    session: Session,
+    upload: UploadFile,
+    model: type[SQLModel],
+    build: Callable[[str], SQLModel],
+    header: str = "text_pl",
+    noun: str = "items",
+) -> ImportReport:
+    """Imports the first column of every row; a first row containing `header` is skipped."""
+    report = _Report()
+    inserter = BatchInserter(session, model)
+    try:
+        for line, row in _csv_rows(upload, csv.reader, report):
+            value = row[0].strip() if row else ""
+            if line == 1 and header in value.lower():
+                continue
+            if not value:
+                continue
+            try:
+                inserter.add(build(value))
+            except RowError as e:
+                report.error(line, str(e))
+    except Exception:
+        session.rollback()
+        raise
+    return _finish(session, inserter, report, noun)
+
+
+def required(row: dict, *names: str) -> str:
+    """First non-empty value among `names` (current and legacy column names), else RowError."""
+    for name in names:
+        value = (row.get(name) or "").strip()
+        if value:
+            return value
+    raise RowError(f"Missing value for {names[0]}")
+
+
+def optional(row: dict, name: str) -> Optional[str]:
+    return (row.get(name) or "").strip() or None
@@ -0,0 +1,267 @@
+import asyncio
+import datetime
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine
+from .models import GenerationJob, JobStatus
+from .usage import set_ai_user
+
+# Number of in-process workers. Set to 0 when jobs are executed by scripts/job_worker.py instead.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# A running job whose heartbeat is older than this is considered abandoned and put back in the queue
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "300"))
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a job handler: parameters, the last checkpoint and a way to report progress."""
+
+    def __init__(self, job_id: uuid.UUID, kind: str, params: dict, state: dict, user_id: uuid.UUID | None):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.state = state
+        self.user_id = user_id
+
+    async def checkpoint(self, progress: int | None = None, total: int | None = None) -> None:
+        """Persists progress and `state`, refreshes the heartbeat and raises JobCancelled if requested."""
+        await run_in_threadpool(self._checkpoint, progress, total)
+
+    def _checkpoint(self, progress: int | None, total: int | None) -> None:
+        with Session(engine) as session:
+            job = session.get(GenerationJob, self.job_id)
+            if job is None or job.cancel_requested:
+                raise JobCancelled()
+            if progress is not None:
+                job.progress = progress
+            if total is not None:
+                job.total = total
+            job.state = dict(self.state)
+            job.heartbeat_at = _now()
+            session.add(job)
+            session.commit()
+
+
+JobHandler = Callable[[JobContext], Awaitable[dict]]
+
+
+class JobRunner:
+    """
+    Executes GenerationJob rows. The database is the queue: workers claim pending jobs
+    with SELECT ... FOR UPDATE SKIP LOCKED, so the same code runs in the web process
+    and in a separate worker, and unfinished jobs are picked up again after a restart.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: dict[str, JobHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._running: dict[uuid.UUID, asyncio.Task] = {}
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> list[str]:
+        return list(self._handlers)
+
+    def submit(self, session: Session, kind: str, params: dict, user_id: uuid.UUID | None, language) -> GenerationJob:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = GenerationJob(kind=kind, params=params, user_id=user_id, language=language)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        self._call_soon(self._wakeup.set)
+        return job
+
+    def cancel(self, session: Session, job: GenerationJob) -> GenerationJob:
+        if job.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED):
+            return job
+        job.cancel_requested = True
+        if job.status == JobStatus.PENDING:
+            job.status = JobStatus.CANCELLED
+            job.finished_at = _now()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        task = self._running.get(job.id)
+        if task:
+            self._call_soon(task.cancel)
+        return job
+
+    def _call_soon(self, callback) -> None:
+        """submit / cancel are called from sync endpoints in worker threads; asyncio objects belong to the loop."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(callback)
+
+    def _requeue_stale(self) -> int:
+        cutoff = _now() - datetime.timedelta(seconds=JOB_STALE_AFTER)
+        with Session(engine) as session:
+            result = session.exec(
+                update(GenerationJob)
+                .where(GenerationJob.status == JobStatus.RUNNING)
+                .where((GenerationJob.heartbeat_at == None) | (GenerationJob.heartbeat_at < cutoff))  # noqa: E711
+                .values(status=JobStatus.PENDING, worker_id=None)
+            )
+            session.commit()
+            return result.rowcount or 0
+
+    def _claim_next(self) -> GenerationJob | None:
+        with Session(engine) as session:
+            job = session.exec(
+                select(GenerationJob)
+                .where(GenerationJob.status == JobStatus.PENDING)
+                .where(GenerationJob.kind.in_(self.kinds))
+                .order_by(GenerationJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if job is None:
+                return None
+            job.status = JobStatus.RUNNING
+            job.worker_id = self.worker_id
+            job.started_at = job.started_at or _now()
+            job.heartbeat_at = _now()
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+            return job
+
+    def _heartbeat(self, job_id: uuid.UUID) -> bool:
+        """Refreshes the heartbeat of a job this runner holds; False when the job is no longer ours."""
+        with Session(engine) as session:
+            result = session.exec(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id)
+                .where(GenerationJob.status == JobStatus.RUNNING)
+                .where(GenerationJob.worker_id == self.worker_id)
+                .values(heartbeat_at=_now())
+            )
+            session.commit()
+            return bool(result.rowcount)
+
+    async def _keep_alive(self, job_id: uuid.UUID, task: asyncio.Task) -> None:
+        """
+        Heartbeats every JOB_STALE_AFTER / 3 while the handler runs, so a long step between two
+        checkpoints is not mistaken for an abandoned job. Cancels the handler if the job was taken over.
+        """
+        while not task.done():
+            await asyncio.sleep(JOB_STALE_AFTER / 3)
+            try:
+                owned = await run_in_threadpool(self._heartbeat, job_id)
+            except Exception as e:
+                print(f"Job {job_id} heartbeat error: {e}")
+                continue
+            if not owned and not task.done():
+                print(f"Job {job_id} is no longer held by {self.worker_id}, stopping it")
+                task.cancel()
+                return
+
+    def _finish(self, job_id: uuid.UUID, status: JobStatus, result: dict | None = None, error: str | None = None) -> None:
+        with Session(engine) as session:
+            job = session.get(GenerationJob, job_id)
+            # Requeued as stale and claimed elsewhere: the other worker finishes it
+            if job is None or job.worker_id != self.worker_id:
+                return
+            job.status = status
+            job.finished_at = _now()
+            job.heartbeat_at = job.finished_at
+            if result is not None:
+                job.result = result
+            if error is not None:
+                job.error = error[:2000]
+            session.add(job)
+            session.commit()
+
+    def _release(self, job_id: uuid.UUID) -> None:
+        """Puts a job interrupted by shutdown back in the queue; its checkpoint is kept."""
+        with Session(engine) as session:
+            job = session.get(GenerationJob, job_id)
+            if job is None or job.status != JobStatus.RUNNING or job.worker_id != self.worker_id:
+                return
+            job.status = JobStatus.PENDING
+            job.worker_id = None
+            session.add(job)
+            session.commit()
+
+    async def _execute(self, job: GenerationJob) -> None:
+        context = JobContext(job.id, job.kind, job.params or {}, dict(job.state or {}), job.user_id)
+        print(f"Job {job.id} ({job.kind}) started on {self.worker_id}")
+        # AI usage of the job is attributed to the user who submitted it
+        set_ai_user(job.user_id)
+        task = asyncio.create_task(self._handlers[job.kind](context))
+        self._running[job.id] = task
+        heartbeat = asyncio.create_task(self._keep_alive(job.id, task))
+        try:
+            result = await task
+            await run_in_threadpool(self._finish, job.id, JobStatus.COMPLETED, result)
+            print(f"Job {job.id} ({job.kind}) completed")
+        except (JobCancelled, asyncio.CancelledError):
+            if self._stopping:
+                await run_in_threadpool(self._release, job.id)
+                print(f"Job {job.id} ({job.kind}) interrupted by shutdown, will resume")
+                raise
+            await run_in_threadpool(self._finish, job.id, JobStatus.CANCELLED)
+            print(f"Job {job.id} ({job.kind}) cancelled")
+        except Exception as e:
+            await run_in_threadpool(self._finish, job.id, JobStatus.FAILED, None, f"{type(e).__name__}: {e}")
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job.id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self._requeue_stale)
+                job = await run_in_threadpool(self._claim_next)
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                job = None
+            if job is not None:
+                await self._execute(job)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for _ in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+        if self.workers:
+            print(f"Job runner started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        tasks = self._worker_tasks + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+
+
+job_runner = JobRunner()
@@ -1,6 +1,5 @@
 import datetime
-import csv
-import io
+import hmac
 import os
 import re
 import uuid
@@ -9,15 +8,26 @@ from contextlib import asynccontextmanager
 from typing import Annotated, Optional
 from pydantic import BaseModel
 
-from fastapi import Depends, FastAPI, HTTPException, status, Query, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, status, Query, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import event, func
-from sqlmodel import Session, select
-from openai import OpenAI, AsyncOpenAI
+from sqlmodel import Session, SQLModel, select
+from starlette.concurrency import run_in_threadpool
 import asyncio
 import json
 
+from .ai import (
+    call_verify_model,
+    create_response,
+    generate_in_batches,
+    get_ai_stats,
+    parse_json_items,
+    scheduler,
+    stream_in_batches,
+    structured_items_format,
+)
 from .auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
@@ -26,7 +36,94 @@ from .auth import (
     get_password_hash,
     verify_password,
 )
+from .catalog import (
+    CATALOG_MODELS,
+    CATALOG_VERSION_ROW,
+    apply_catalog_changes,
+    bump_catalog_version,
+    catalog_cache,
+    catalog_groups,
+    catalog_items,
+    catalog_group_count,
+    catalog_item_count,
+    catalog_items_of_groups,
+    catalog_study_groups,
+    catalog_user_count,
+    discard_catalog_changes,
+    record_catalog_delete,
+    record_catalog_insert,
+    record_catalog_statement,
+    record_catalog_update,
+    with_totals,
+)
+from .compression import CompressionMiddleware
 from .database import engine, get_session, init_db
+from .dedupe import DedupeIndex, dedupe_index, get_dedupe_stats
+from .duplicates import (
+    DUPLICATE_ACTIONS,
+    DUPLICATE_FIELDS,
+    DUPLICATES_MAX_CLUSTERS,
+    DUPLICATES_THRESHOLD,
+    TRIGRAM_SETUP_DDL,
+    TRIGRAM_TABLE_DDL,
+    find_duplicate_clusters,
+    missing_items,
+    overlapping_items,
+    resolve_duplicates,
+)
+from .etags import conditional_response, make_etag
+from .metrics import (
+    METRICS_CONTENT_TYPE,
+    METRICS_ENABLED,
+    METRICS_TOKEN,
+    MetricsMiddleware,
+    register_cache,
+    register_engine,
+    register_routes,
+    render as render_metrics,
+)
+from .pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, PageParams, keyset_page
+from .profiling import PROFILE_FORMATS, PROFILER_INTERVAL_MS, ProfiledRoute, ProfilerMiddleware, request_profiler
+from .queries import QueryStatsMiddleware, after_query, before_query, discard_query_start, slow_query_log
+from .search import (
+    SEARCH_LIMIT_MAX,
+    SEARCH_SETUP_DDL,
+    SEARCH_SOURCES,
+    SEARCH_TABLE_DDL,
+    decode_search_cursor,
+    encode_search_cursor,
+    search_content,
+)
+from .serialization import MsgpackMiddleware, dumps_str
+from .tracing import TRACE_ID_HEADER, TracingMiddleware, traced
+from .usage import USAGE_GROUPINGS, AIBudgetExceeded, set_ai_user, usage_aggregates, usage_recorder
+from .exports import (
+    EXPORT_FORMATS,
+    EXPORT_KINDS,
+    EXPORT_SOURCES,
+    export_filename,
+    export_media_type,
+    export_query,
+    export_stream,
+)
+from .imports import (
+    CsvImportError,
+    bulk_insert_returning,
+    import_csv_dicts,
+    import_csv_first_column,
+    optional,
+    required,
+)
+from .jobs import JobContext, job_runner
+from .wordle import (
+    WordleGuessError,
+    play_guess,
+    remaining_words,
+    start_game,
+    wordle_dictionaries,
+    wordle_games,
+    wordle_pool,
+)
 from .models import (
     TargetLanguage,
     User,
@@ -96,40 +193,29 @@ from .models import (
     # AI Verification
     AIVerifyRequest,
     AIVerifyResponse,
-    WordleGame,
+    WordleStartResponse,
+    WordleCheckResponse,
+    # Background jobs
+    GenerationJob,
+    GenerationJobRead,
+    JobStatus,
+    AIBudgetStatus,
+    AIUsageAggregate,
+    JobSubmitResponse,
+    ImportReport,
+    SearchHit,
+    DuplicateCluster,
+    DuplicateResolveReport,
+    DuplicateResolveRequest,
+    CatalogVersion,
 )
-from .gamification import calculate_score, generate_wordle_word, check_wordle_guess
+from .gamification import calculate_score
 
 
 # ===========================================
-# OpenAI Client Singleton & Helper Functions
+# OpenAI Helper Functions
 # ===========================================
 
-_openai_client: OpenAI | None = None
-_async_openai_client: AsyncOpenAI | None = None
-
-
-def get_openai_client() -> OpenAI:
-    """Zwraca singleton klienta OpenAI (unika tworzenia nowego przy każdym wywołaniu)."""
-    global _openai_client
-    if _openai_client is None:
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
-        _openai_client = OpenAI(api_key=api_key)
-    return _openai_client
-
-
-def get_async_openai_client() -> AsyncOpenAI:
-    """Zwraca singleton async klienta OpenAI dla równoległych zapytań."""
-    global _async_openai_client
-    if _async_openai_client is None:
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
-        _async_openai_client = AsyncOpenAI(api_key=api_key)
-    return _async_openai_client
-
 
 def clean_json_response(output_text: str) -> str:
     """Czyści odpowiedź AI z markdown code blocks."""
@@ -143,18 +229,22 @@ def clean_json_response(output_text: str) -> str:
     return text.strip()
 
 
-async def call_openai_async(prompt: str, model: str = "gpt-5-nano") -> str:
-    """Asynchroniczne wywołanie OpenAI API."""
-    client = get_async_openai_client()
-    response = await client.responses.create(model=model, input=prompt)
-    return response.output_text.strip()
+# Structured output: model odpowiada {"items": [...]} zgodnie ze schematem elementów
+GENERATED_ITEM_FORMAT = structured_items_format(GeneratedItem, "generated_items")
+GENERATED_GUESS_OBJECT_FORMAT = structured_items_format(GeneratedGuessObjectItem, "generated_guess_objects")
+GENERATED_FILL_BLANK_FORMAT = structured_items_format(GeneratedFillBlankItem, "generated_fill_blanks")
+
 
+@traced("openai.call_openai_async")
+async def call_openai_async(prompt: str, model: str = "gpt-5-nano", text_format: Optional[dict] = None) -> str:
+    """Asynchroniczne wywołanie OpenAI API (przez wspólny scheduler z limitem i retry)."""
+    return await scheduler.run(prompt, model, text_format=text_format)
 
+
+@traced("openai.call_openai_batch_async")
 async def call_openai_batch_async(prompts: list[str], model: str = "gpt-5-nano") -> list[str]:
-    """Równoległe wywołanie wielu promptów - znacznie szybsze dla batch operations."""
-    client = get_async_openai_client()
-    tasks = [client.responses.create(model=model, input=p) for p in prompts]
-    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    """Równoległe wywołanie wielu promptów - scheduler pilnuje limitu współbieżności."""
+    responses = await asyncio.gather(*(scheduler.run(p, model) for p in prompts), return_exceptions=True)
 
     results = []
     for r in responses:
@@ -162,10 +252,36 @@ async def call_openai_batch_async(prompts: list[str], model: str = "gpt-5-nano")
             print(f"Batch call error: {r}")
             results.append("")
         else:
-            results.append(r.output_text.strip())
+            results.append(r)
     return results
 
 
+def _sse_event(event: str, data) -> str:
+    """Formatuje jedno zdarzenie Server-Sent Events."""
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    # X-Accel-Buffering: no - proxy (nginx/Railway) nie może buforować strumienia
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_generated_items(batches, map_items, total: int):
+    """Zamienia strumień batchy z AI na zdarzenia SSE: 'items' po każdym batchu, na końcu 'done'."""
+    count = 0
+    try:
+        async for batch in batches:
+            items = map_items(batch)
+            count += len(items)
+            yield _sse_event("items", {"items": [item.model_dump() for item in items], "count": count, "total": total})
+        yield _sse_event("done", {"count": count, "total": total})
+    except Exception as e:
+        print(f"Streaming generation error: {e}")
+        yield _sse_event("error", {"detail": str(e), "count": count, "total": total})
+
+
 def get_seed_users() -> list[dict]:
     """Get seed users from environment variables for production safety."""
     users = []
@@ -269,7 +385,7 @@ async def _seed_content_type_parallel(
                         db_item = TranslatePlToTarget(
                             text_pl=item["text_pl"],
                             text_target=item["text_target"],
-                            category=item.get("category", "mixed"),
+                            category=item.get("category") or "mixed",
                             group_id=group.id
                         )
                         session.add(db_item)
@@ -279,7 +395,7 @@ async def _seed_content_type_parallel(
                         db_item = TranslateTargetToPl(
                             text_target=item["text_target"],
                             text_pl=item["text_pl"],
-                            category=item.get("category", "mixed"),
+                            category=item.get("category") or "mixed",
                             group_id=group.id
                         )
                         session.add(db_item)
@@ -416,8 +532,20 @@ async def lifespan(app: FastAPI):
     else:
         print("No seed users configured in environment variables.")
 
+    # AI usage accounting (buffered writes, daily budgets)
+    await usage_recorder.start()
+    # Background generation jobs (unfinished jobs from before a restart are resumed)
+    job_runner.start()
+    # Pre-generated Wordle words (refilled in the background)
+    await wordle_pool.start()
+    # Label sets of every route, so /metrics lists them before their first request
+    register_routes(app)
+
     yield
     print("Shutting down...")
+    await wordle_pool.stop()
+    await job_runner.stop()
+    await usage_recorder.stop()
 
 
 # Event Listeners for Updated At
@@ -476,6 +604,39 @@ def update_fillblank_timestamp(mapper, connection, target):
     target.updated_at = datetime.datetime.now(datetime.timezone.utc)
 
 
+# Catalog cache invalidation: item and group changes are collected per session and applied on commit
+for _model in CATALOG_MODELS:
+    event.listen(_model, "after_insert", record_catalog_insert)
+    event.listen(_model, "after_update", record_catalog_update)
+    event.listen(_model, "after_delete", record_catalog_delete)
+# Core INSERT / UPDATE / DELETE through a session (bulk inserts, CSV imports)
+# New and deleted users change the cached user count (X-Total-Count of /users/)
+event.listen(User, "after_insert", record_catalog_insert)
+event.listen(User, "after_delete", record_catalog_delete)
+event.listen(Session, "do_orm_execute", record_catalog_statement)
+# Commits that change the catalog bump catalog_version, so other processes drop their cache too
+event.listen(Session, "before_commit", bump_catalog_version)
+event.listen(CatalogVersion.__table__, "after_create", CATALOG_VERSION_ROW)
+event.listen(Session, "after_commit", apply_catalog_changes)
+event.listen(Session, "after_rollback", discard_catalog_changes)
+
+# SQL statements per request (app/queries.py)
+event.listen(engine, "before_cursor_execute", before_query)
+event.listen(engine, "after_cursor_execute", after_query)
+event.listen(engine, "handle_error", discard_query_start)
+
+# Full-text search configurations, generated tsvector columns and GIN indexes (PostgreSQL only),
+# created together with the tables; existing databases: python -m scripts.setup_search
+event.listen(SQLModel.metadata, "before_create", SEARCH_SETUP_DDL.execute_if(dialect="postgresql"))
+for _table, _ddl in SEARCH_TABLE_DDL.items():
+    event.listen(_table, "after_create", _ddl.execute_if(dialect="postgresql"))
+# Trigram indexes for near-duplicate detection (PostgreSQL with pg_trgm);
+# existing databases: python -m scripts.setup_duplicates
+event.listen(SQLModel.metadata, "before_create", TRIGRAM_SETUP_DDL.execute_if(dialect="postgresql"))
+for _table, _ddl in TRIGRAM_TABLE_DDL.items():
+    event.listen(_table, "after_create", _ddl.execute_if(dialect="postgresql"))
+
+
 # Production configuration from environment
 DEBUG_MODE = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes")
 
@@ -498,6 +659,16 @@ def parse_cors_origins(origins_str: str) -> list[str]:
 CORS_ORIGINS = parse_cors_origins(os.getenv("CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173"))
 
 app = FastAPI(debug=DEBUG_MODE, lifespan=lifespan)
+# Handler spans for sampled requests (TRACE_SAMPLE_RATE / TRACE_SLOW_MS) and worker threads for the
+# request profiler; set before the routes are declared
+app.router.route_class = ProfiledRoute
+
+# Per-route request metrics for /metrics; added first (innermost) so it sees the matched route
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# SQL statement count and time per request: Server-Timing header, metrics, over-budget report
+app.add_middleware(QueryStatsMiddleware)
 
 # Configure CORS for frontend communication
 app.add_middleware(
@@ -506,8 +677,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination and trace id headers readable by the frontend
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TRACE_ID_HEADER],
 )
 
+# MessagePack for clients that send Accept: application/msgpack (needs the optional msgpack package)
+app.add_middleware(MsgpackMiddleware)
+
+# gzip / brotli by Accept-Encoding; added after MessagePack so it also compresses MessagePack bodies
+app.add_middleware(CompressionMiddleware)
+
+# Sampling profiler for the requests armed through /api/admin/profiler
+app.add_middleware(ProfilerMiddleware)
+
+# Request spans exported to TRACE_FILE; outermost, so compression is inside the request span
+app.add_middleware(TracingMiddleware)
+
+
+@app.exception_handler(AIBudgetExceeded)
+async def ai_budget_exceeded_handler(request: Request, exc: AIBudgetExceeded):
+    """Wyczerpany dzienny budżet AI -> 429 (do następnego dnia UTC)."""
+    return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS, content={"detail": str(exc)})
+
 
 # Language Configuration
 LANGUAGE_CONFIG = {
@@ -537,10 +728,10 @@ LANGUAGE_CONFIG = {
 
 
 # Helper for OpenAI Translation
+@traced("openai.get_translation")
 def get_translation(text: str, target_lang: str = "francuski", language: TargetLanguage = TargetLanguage.FR) -> str:
     """Tłumaczy tekst używając OpenAI (z singleton klientem)."""
     try:
-        client = get_openai_client()
         lang_config = LANGUAGE_CONFIG[language]
         lang_name = lang_config["name"]
 
@@ -550,8 +741,7 @@ def get_translation(text: str, target_lang: str = "francuski", language: TargetL
         else:
             prompt = f"{lang_config['code']}→PL: {text}"
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-        return response.output_text.strip()
+        return create_response(prompt, "translate").strip()
     except Exception as e:
         print(f"Translation Error: {e}")
         return f"[MOCK TRANSLATION] {text}"
@@ -604,17 +794,10 @@ def _normalize_content_keys(items: list[dict], lang_code: str) -> list[dict]:
 def generate_ai_content(level: str, count: int, category: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR) -> list[dict]:
     """Generuje pary zdań z opcjonalną kategorią (synchronicznie)."""
     try:
-        client = get_openai_client()
         lang_code = LANGUAGE_CONFIG[language]["code"]
         prompt, _ = _build_generate_prompt(level, count, category, language)
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-
-        usage_info = getattr(response, "usage", "N/A")
-        print(f"Token usage: {usage_info}")
-
-        output_text = clean_json_response(response.output_text)
-        items = json.loads(output_text)
+        items = parse_json_items(create_response(prompt, "generate_translate", text_format=GENERATED_ITEM_FORMAT))
         return _normalize_content_keys(items, lang_code)
     except Exception as e:
         print(f"Generation Error: {e}")
@@ -627,69 +810,55 @@ async def generate_ai_content_async(level: str, count: int, category: Optional[s
         lang_code = LANGUAGE_CONFIG[language]["code"]
         prompt, _ = _build_generate_prompt(level, count, category, language)
 
-        output_text = await call_openai_async(prompt)
-        output_text = clean_json_response(output_text)
-        items = json.loads(output_text)
-        return _normalize_content_keys(items, lang_code)
+        output_text = await call_openai_async(prompt, text_format=GENERATED_ITEM_FORMAT)
+        return _normalize_content_keys(parse_json_items(output_text), lang_code)
     except Exception as e:
         print(f"Async Generation Error: {e}")
         return []
 
 
-async def generate_ai_content_parallel(level: str, total_count: int, category: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10) -> list[dict]:
-    """
-    Generuje pary zdań równolegle w mniejszych batchach.
-    Dla total_count=20 i batch_size=10 wykonuje 2 równoległe zapytania po 10.
-    """
-    if total_count <= batch_size:
-        return await generate_ai_content_async(level, total_count, category, language)
-
+def _content_pipeline(level: str, category: Optional[str], language: TargetLanguage, dedupe: Optional[DedupeIndex] = None) -> dict:
+    """Prompt, parser, walidacja i deduplikacja batchy par zdań (dla generate_in_batches / stream_in_batches)."""
     lang_code = LANGUAGE_CONFIG[language]["code"]
-    num_batches = (total_count + batch_size - 1) // batch_size
-    items_per_batch = total_count // num_batches
-
-    prompts = []
-    for i in range(num_batches):
-        batch_count = items_per_batch if i < num_batches - 1 else total_count - (items_per_batch * (num_batches - 1))
-        prompt, _ = _build_generate_prompt(level, batch_count, category, language)
-        prompts.append(prompt)
-
-    print(f"Generating {total_count} items in {num_batches} parallel batches...")
-    responses = await call_openai_batch_async(prompts)
+    return dict(
+        kind="translate",
+        dedupe=dedupe or dedupe_index("translate", language),
+        build_prompt=lambda n: _build_generate_prompt(level, n, category, language)[0],
+        parse=lambda text: _normalize_content_keys(parse_json_items(text), lang_code),
+        text_format=GENERATED_ITEM_FORMAT,
+        is_valid=lambda item: bool(item.get("text_pl") and item.get("text_target")),
+    )
 
-    all_items = []
-    for output_text in responses:
-        if output_text:
-            try:
-                cleaned = clean_json_response(output_text)
-                batch_items = json.loads(cleaned)
-                all_items.extend(_normalize_content_keys(batch_items, lang_code))
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error in batch: {e}")
 
-    return all_items
+async def generate_ai_content_parallel(level: str, total_count: int, category: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10, dedupe: Optional[DedupeIndex] = None) -> list[dict]:
+    """
+    Generuje pary zdań równolegle w mniejszych batchach.
+    Nieudane lub niepełne batche są ponawiane, aż zbierze się total_count elementów.
+    """
+    print(f"Generating {total_count} items in batches of {batch_size}...")
+    return await generate_in_batches(
+        total_count=total_count, batch_size=batch_size, **_content_pipeline(level, category, language, dedupe)
+    )
 
 
 @app.post("/api/ai/generate", response_model=list[GeneratedItem])
 async def generate_sentences_endpoint(request: GenerateRequest, current_user: User = Depends(get_current_superuser)):
     """
     Generuje pary zdań do tłumaczeń.
-    Dla count > 10 używa równoległego przetwarzania (szybsze).
+    Batche po 10 idą równolegle przez scheduler; brakujące elementy są dogenerowywane.
     """
     if request.count > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 sentences at once")
 
-    # Użyj równoległego przetwarzania dla większych requestów
-    if request.count > 10:
-        generated_data = await generate_ai_content_parallel(
-            request.level, request.count, request.category, current_user.active_language, batch_size=10
-        )
-    else:
-        generated_data = await generate_ai_content_async(
-            request.level, request.count, request.category, current_user.active_language
-        )
+    set_ai_user(current_user.id)
+    generated_data = await generate_ai_content_parallel(
+        request.level, request.count, request.category, current_user.active_language, batch_size=10
+    )
+    return _map_generated_items(generated_data, request.category)
+
 
-    # Map to GeneratedItem
+def _map_generated_items(generated_data: list[dict], category: Optional[str]) -> list[GeneratedItem]:
+    """Mapuje surowe dane z AI na GeneratedItem."""
     items = []
     for item in generated_data:
         t_target = item.get("text_target")
@@ -697,30 +866,47 @@ async def generate_sentences_endpoint(request: GenerateRequest, current_user: Us
             items.append(GeneratedItem(
                 text_pl=item.get("text_pl"),
                 text_target=t_target,
-                category=item.get("category", request.category)
+                category=item.get("category") or category
             ))
-
     return items
 
 
+@app.post("/api/ai/generate/stream")
+async def generate_sentences_stream_endpoint(request: GenerateRequest, current_user: User = Depends(get_current_superuser)):
+    """
+    Strumieniowa wersja /api/ai/generate (Server-Sent Events).
+    Zdarzenie 'items' po każdym zakończonym batchu, 'done' na końcu.
+    """
+    if request.count > 50:
+        raise HTTPException(status_code=400, detail="Maximum 50 sentences at once")
+
+    set_ai_user(current_user.id)
+    batches = stream_in_batches(
+        total_count=request.count,
+        batch_size=10,
+        **_content_pipeline(request.level, request.category, current_user.active_language),
+    )
+    return _sse_response(
+        _stream_generated_items(batches, lambda batch: _map_generated_items(batch, request.category), request.count)
+    )
+
+
 # Helper for AI Answer Verification
-def verify_answer_with_ai(question: str, expected_answer: str, user_answer: str, task_type: str, language: TargetLanguage = TargetLanguage.FR) -> dict:
-    """Weryfikuje odpowiedź użytkownika używając AI (z singleton klientem)."""
-    try:
-        client = get_openai_client()
-        lang_config = LANGUAGE_CONFIG[language]
-        lang_name = lang_config["name"]
+def _build_verify_prompt(question: str, expected_answer: str, user_answer: str, task_type: str, language: TargetLanguage) -> str:
+    """Buduje prompt do weryfikacji odpowiedzi użytkownika."""
+    lang_config = LANGUAGE_CONFIG[language]
+    lang_name = lang_config["name"]
 
-        task_descriptions = {
-            "translate_pl_to_target": f"tłumaczenie z polskiego na {lang_name}",
-            "translate_target_to_pl": f"tłumaczenie z {lang_name}ego na polski",
-            "translate_pl_fr": f"tłumaczenie z polskiego na {lang_name}",
-            "translate_fr_pl": f"tłumaczenie z {lang_name}ego na polski",
-            "fill_blank": f"uzupełnienie luki w zdaniu {lang_name}im"
-        }
-        task_desc = task_descriptions.get(task_type, "zadanie językowe")
+    task_descriptions = {
+        "translate_pl_to_target": f"tłumaczenie z polskiego na {lang_name}",
+        "translate_target_to_pl": f"tłumaczenie z {lang_name}ego na polski",
+        "translate_pl_fr": f"tłumaczenie z polskiego na {lang_name}",
+        "translate_fr_pl": f"tłumaczenie z {lang_name}ego na polski",
+        "fill_blank": f"uzupełnienie luki w zdaniu {lang_name}im"
+    }
+    task_desc = task_descriptions.get(task_type, "zadanie językowe")
 
-        prompt = f"""Jesteś {lang_config['expert']}. Sprawdź czy odpowiedź użytkownika jest poprawna.
+    return f"""Jesteś {lang_config['expert']}. Sprawdź czy odpowiedź użytkownika jest poprawna.
 
 Typ zadania: {task_desc}
 Pytanie/Zdanie: {question}
@@ -736,91 +922,110 @@ Zasady oceny:
 - Dla tłumaczeń akceptuj różne poprawne warianty zdania
 - Bądź wyrozumiały ale sprawiedliwy"""
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-        output_text = clean_json_response(response.output_text)
-        return json.loads(output_text)
+
+@traced("openai.verify_answer_with_ai")
+async def verify_answer_with_ai(question: str, expected_answer: str, user_answer: str, task_type: str, language: TargetLanguage = TargetLanguage.FR) -> dict:
+    """Weryfikuje odpowiedź użytkownika używając AI (async klient z limitem współbieżności i timeoutami)."""
+    try:
+        prompt = _build_verify_prompt(question, expected_answer, user_answer, task_type, language)
+        output_text = await call_verify_model(prompt)
+        return json.loads(clean_json_response(output_text))
+    except (HTTPException, AIBudgetExceeded):
+        raise
     except Exception as e:
         print(f"AI Verification Error: {e}")
         raise HTTPException(status_code=500, detail=f"Błąd weryfikacji AI: {str(e)}")
 
 
+def _apply_verified_answer(session: Session, current_user: User, request: AIVerifyRequest) -> bool:
+    """Dodaje poprawną odpowiedź jako alternatywę i oznacza element jako nauczony. Zwraca answer_added."""
+    answer_added = False
+    item = None
+    progress_model = None
+
+    if request.task_type == "translate_pl_fr" or request.task_type == "translate_pl_to_target":
+        item = session.get(TranslatePlToTarget, request.item_id)
+        progress_model = TranslatePlToTargetProgress
+    elif request.task_type == "translate_fr_pl" or request.task_type == "translate_target_to_pl":
+        item = session.get(TranslateTargetToPl, request.item_id)
+        progress_model = TranslateTargetToPlProgress
+    elif request.task_type == "fill_blank":
+        item = session.get(FillBlank, request.item_id)
+        progress_model = FillBlankProgress
+
+    if item:
+        # Add to alternative_answers if not already there
+        current_alternatives = item.alternative_answers or []
+        normalized_user_answer = request.user_answer.strip().lower()
+        normalized_alternatives = [a.strip().lower() for a in current_alternatives]
+
+        if normalized_user_answer not in normalized_alternatives:
+            current_alternatives.append(request.user_answer.strip())
+            item.alternative_answers = current_alternatives
+            session.add(item)
+            answer_added = True
+
+        # Update progress to learned
+        if progress_model:
+            progress = session.exec(
+                select(progress_model).where(
+                    progress_model.user_id == current_user.id,
+                    progress_model.item_id == request.item_id
+                )
+            ).first()
+
+            if progress:
+                progress.learned = True
+                session.add(progress)
+            else:
+                # Create new progress entry
+                new_progress = progress_model(
+                    user_id=current_user.id,
+                    item_id=request.item_id,
+                    learned=True
+                )
+                session.add(new_progress)
+
+        session.commit()
+
+    return answer_added
+
+
 @app.post("/api/ai/verify-answer", response_model=AIVerifyResponse)
-def verify_answer_endpoint(
+async def verify_answer_endpoint(
     request: AIVerifyRequest,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Weryfikuje odpowiedź użytkownika przez AI i ewentualnie dodaje jako alternatywę."""
-    
+    """
+    Weryfikuje odpowiedź użytkownika przez AI i ewentualnie dodaje jako alternatywę.
+    Wywołanie AI nie blokuje puli wątków; zapis do bazy idzie przez run_in_threadpool.
+    """
+
     # Verify task_type
     # Map old types to new types if necessary
     valid_types = ["translate_pl_to_target", "translate_target_to_pl", "translate_pl_fr", "translate_fr_pl", "fill_blank"]
     if request.task_type not in valid_types:
         raise HTTPException(status_code=400, detail=f"Invalid task_type. Must be one of: {valid_types}")
-    
+
     # Call AI verification
-    ai_result = verify_answer_with_ai(
+    set_ai_user(current_user.id)
+    ai_result = await verify_answer_with_ai(
         question=request.question,
         expected_answer=request.expected_answer,
         user_answer=request.user_answer,
         task_type=request.task_type,
         language=current_user.active_language
     )
-    
+
     is_correct = ai_result.get("is_correct", False)
     explanation = ai_result.get("explanation", "Brak wyjaśnienia")
     answer_added = False
-    
+
     if is_correct:
         # Add user's answer as alternative and update progress
-        item = None
-        progress_model = None
-        
-        if request.task_type == "translate_pl_fr" or request.task_type == "translate_pl_to_target":
-            item = session.get(TranslatePlToTarget, request.item_id)
-            progress_model = TranslatePlToTargetProgress
-        elif request.task_type == "translate_fr_pl" or request.task_type == "translate_target_to_pl":
-            item = session.get(TranslateTargetToPl, request.item_id)
-            progress_model = TranslateTargetToPlProgress
-        elif request.task_type == "fill_blank":
-            item = session.get(FillBlank, request.item_id)
-            progress_model = FillBlankProgress
-        
-        if item:
-            # Add to alternative_answers if not already there
-            current_alternatives = item.alternative_answers or []
-            normalized_user_answer = request.user_answer.strip().lower()
-            normalized_alternatives = [a.strip().lower() for a in current_alternatives]
-            
-            if normalized_user_answer not in normalized_alternatives:
-                current_alternatives.append(request.user_answer.strip())
-                item.alternative_answers = current_alternatives
-                session.add(item)
-                answer_added = True
-            
-            # Update progress to learned
-            if progress_model:
-                progress = session.exec(
-                    select(progress_model).where(
-                        progress_model.user_id == current_user.id,
-                        progress_model.item_id == request.item_id
-                    )
-                ).first()
-                
-                if progress:
-                    progress.learned = True
-                    session.add(progress)
-                else:
-                    # Create new progress entry
-                    new_progress = progress_model(
-                        user_id=current_user.id,
-                        item_id=request.item_id,
-                        learned=True
-                    )
-                    session.add(new_progress)
-            
-            session.commit()
-    
+        answer_added = await run_in_threadpool(_apply_verified_answer, session, current_user, request)
+
     return AIVerifyResponse(
         is_correct=is_correct,
         explanation=explanation,
@@ -828,6 +1033,144 @@ def verify_answer_endpoint(
     )
 
 
+@app.get("/api/admin/ai/stats")
+def get_ai_stats_endpoint(current_user: User = Depends(get_current_superuser)):
+    """Statystyki wywołań AI (percentyle opóźnień, odrzucenia, timeouty, odrzucone duplikaty)."""
+    return {
+        **get_ai_stats(),
+        "dedupe": get_dedupe_stats(),
+        "wordle_pool": wordle_pool.snapshot(),
+        "wordle_games": {"active": len(wordle_games), "evicted": wordle_games.evicted, "dictionaries": wordle_dictionaries.snapshot()},
+    }
+
+
+@app.get("/api/admin/cache")
+def get_catalog_cache_stats(current_user: User = Depends(get_current_superuser)):
+    """Statystyki cache katalogu (trafienia, pamięć, unieważnienia)."""
+    return catalog_cache.snapshot()
+
+
+@app.delete("/api/admin/cache")
+def clear_catalog_cache(current_user: User = Depends(get_current_superuser)):
+    """Czyści cache katalogu (np. po ręcznych zmianach w bazie)."""
+    catalog_cache.clear()
+    return {"message": "Catalog cache cleared"}
+
+
+@app.get("/api/admin/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Log wolnych zapytań SQL (powyżej SLOW_QUERY_MS): trasa, czas, kształt parametrów i - dla próbki
+    zapytań SELECT - plan z EXPLAIN (ANALYZE, BUFFERS). Najnowsze najpierw, plus podsumowanie wg wzorca zapytania.
+    """
+    return {
+        **slow_query_log.snapshot(),
+        "by_fingerprint": slow_query_log.summary(),
+        "entries": slow_query_log.entries(limit),
+    }
+
+
+@app.delete("/api/admin/slow-queries")
+def clear_slow_queries(current_user: User = Depends(get_current_superuser)):
+    """Czyści log wolnych zapytań."""
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
+
+@app.get("/api/admin/profiler")
+def get_profiler_state(current_user: User = Depends(get_current_superuser)):
+    """Stan profilera (uzbrojony / ile żądań zostało) i lista zapisanych profili."""
+    return request_profiler.snapshot()
+
+
+@app.post("/api/admin/profiler")
+def arm_profiler(
+    path: str = Query(..., min_length=1, description="Prefiks ścieżki, np. /study/ lub /user/dashboard/stats"),
+    count: int = Query(1, ge=1, le=100),
+    method: Optional[str] = None,
+    interval_ms: float = Query(PROFILER_INTERVAL_MS, ge=1, le=100),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Profiluje kolejne `count` żądań pasujących do `path` (i `method`) profilerem próbkującym."""
+    request_profiler.arm(path, count, method, interval_ms)
+    return request_profiler.snapshot()
+
+
+@app.delete("/api/admin/profiler")
+def reset_profiler(current_user: User = Depends(get_current_superuser)):
+    """Rozbraja profiler i usuwa zapisane profile."""
+    request_profiler.disarm()
+    request_profiler.clear()
+    return {"message": "Profiler disarmed and profiles cleared"}
+
+
+@app.get("/api/admin/profiler/{profile_id}")
+def download_profile(
+    profile_id: str,
+    format: str = "speedscope",
+    current_user: User = Depends(get_current_superuser),
+):
+    """Pobranie profilu: speedscope (JSON dla speedscope.app) lub pstats (python -m pstats, snakeviz)."""
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(PROFILE_FORMATS)}")
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not profile.samples:
+        # Shorter than the sampling interval; pstats cannot load an empty stats file
+        raise HTTPException(status_code=409, detail="Profile has no samples, arm again with a lower interval_ms")
+    if format == "pstats":
+        content, media_type, extension = profile.pstats(), "application/octet-stream", "prof"
+    else:
+        content, media_type, extension = profile.speedscope(), "application/json", "speedscope.json"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.{extension}"'},
+    )
+
+
+@app.get("/api/admin/ai/usage", response_model=list[AIUsageAggregate])
+def get_ai_usage_endpoint(
+    group_by: str = Query("feature", description="feature | day | user | model"),
+    days: int = Query(7, ge=1, le=365),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Zużycie AI (wywołania, błędy, tokeny, koszt, średnie opóźnienie) zgrupowane po funkcji, dniu, użytkowniku lub modelu."""
+    if group_by not in USAGE_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(USAGE_GROUPINGS)}")
+    usage_recorder.flush()
+    return usage_aggregates(session, group_by, days)
+
+
+@app.get("/api/admin/ai/budget", response_model=AIBudgetStatus)
+def get_ai_budget_endpoint(current_user: User = Depends(get_current_superuser)):
+    """Dzisiejsze wydatki na AI względem dziennych budżetów."""
+    return usage_recorder.budget_status()
+
+
+# Prometheus metrics: request metrics come from MetricsMiddleware, the rest is read at scrape time
+register_engine(engine)
+register_cache("catalog_cache", catalog_cache.snapshot)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Metryki w formacie Prometheus; wymagany nagłówek Authorization: Bearer <METRICS_TOKEN>."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    # Latencies, AI usage and pool internals are not public: without a token the endpoint is closed
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Set METRICS_TOKEN to enable /metrics")
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -933,9 +1276,13 @@ def create_user(user: UserCreate, session: Session = Depends(get_session)):
 
 @app.get("/users/", response_model=list[UserRead])
 def get_users(
+    response: Response,
+    page: PageParams = Depends(),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
+    if page.requested:
+        return keyset_page(session, response, page, User, total=lambda: catalog_user_count(session))
     users = session.exec(select(User)).all()
     return users
 
@@ -947,15 +1294,23 @@ def get_users(
 
 @app.get("/fiszki/groups/", response_model=list[FiszkiGroupRead])
 def get_fiszki_groups(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     session: Session = Depends(get_session),
     language: Optional[TargetLanguage] = None,
 ):
     """Pobierz listę grup fiszek, opcjonalnie filtrowanych po języku"""
-    query = select(FiszkiGroup)
-    if language:
-        query = query.where(FiszkiGroup.language == language)
-    groups = session.exec(query).all()
-    return groups
+    if page.requested:
+        criteria = [FiszkiGroup.language == language] if language else []
+        groups = keyset_page(
+            session, response, page, FiszkiGroup, *criteria, total=lambda: catalog_group_count(session, "fiszki", language)
+        )
+        return with_totals(session, "fiszki", groups)
+    groups = catalog_groups(session, "fiszki", language)
+    if not_modified := conditional_response(request, response, make_etag(request, groups.version)):
+        return not_modified
+    return groups.rows
 
 
 @app.get("/fiszki/groups/{group_id}", response_model=FiszkiGroupRead)
@@ -1017,12 +1372,20 @@ def delete_fiszki_group(
 
 
 @app.get("/fiszki/", response_model=list[FiszkaRead])
-def get_fiszki(group_id: Optional[uuid.UUID] = None, session: Session = Depends(get_session)):
-    statement = select(Fiszka)
-    if group_id:
-        statement = statement.where(Fiszka.group_id == group_id)
-    fiszki = session.exec(statement).all()
-    return fiszki
+def get_fiszki(
+    request: Request,
+    response: Response,
+    group_id: Optional[uuid.UUID] = None,
+    page: PageParams = Depends(),
+    session: Session = Depends(get_session),
+):
+    if page.requested:
+        criteria = [Fiszka.group_id == group_id] if group_id else []
+        return keyset_page(session, response, page, Fiszka, *criteria, total=lambda: catalog_item_count(session, "fiszki", group_id))
+    fiszki = catalog_items(session, "fiszki", group_id)
+    if not_modified := conditional_response(request, response, make_etag(request, fiszki.version)):
+        return not_modified
+    return fiszki.rows
 
 
 @app.post("/fiszki/", response_model=FiszkaRead)
@@ -1073,8 +1436,8 @@ def delete_fiszka(
     return {"message": "Fiszka deleted successfully"}
 
 
-@app.post("/fiszki/import")
-async def import_fiszki(
+@app.post("/fiszki/import", response_model=ImportReport)
+def import_fiszki(
     group_id: uuid.UUID,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -1082,32 +1445,22 @@ async def import_fiszki(
 ):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
+    if not session.get(FiszkiGroup, group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
 
-    content = await file.read()
-    decoded_content = content.decode("utf-8")
-    csv_reader = csv.DictReader(io.StringIO(decoded_content))
-
-    expected_headers = {"text_pl", "text_target"}
-    if not csv_reader.fieldnames or not expected_headers.issubset(set(csv_reader.fieldnames)):
+    def build(row: dict) -> Fiszka:
         # Fallback for old CSVs with text_fr
-        if "text_fr" in csv_reader.fieldnames:
-             pass # Accept text_fr
-        else:
-             raise HTTPException(status_code=400, detail=f"CSV must contain headers: {', '.join(expected_headers)}")
-
-    count = 0
-    for row in csv_reader:
-        fiszka = Fiszka(
-            text_pl=row["text_pl"], 
-            text_target=row.get("text_target") or row.get("text_fr"), 
-            image_url=row.get("image_url"), 
-            group_id=group_id
+        return Fiszka(
+            text_pl=required(row, "text_pl"),
+            text_target=required(row, "text_target", "text_fr"),
+            image_url=optional(row, "image_url"),
+            group_id=group_id,
         )
-        session.add(fiszka)
-        count += 1
 
-    session.commit()
-    return {"message": f"Successfully imported {count} fiszki"}
+    try:
+        return import_csv_dicts(session, file, Fiszka, [{"text_pl", "text_target"}, {"text_pl", "text_fr"}], build, "fiszki")
+    except CsvImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # ==========================================
@@ -1121,18 +1474,7 @@ def get_pl_fr_groups(
     language: Optional[TargetLanguage] = None,
 ):
     """Pobierz listę grup tłumaczeń PL->Target, opcjonalnie filtrowanych po języku"""
-    query = select(TranslatePlToTargetGroup)
-    if language:
-        query = query.where(TranslatePlToTargetGroup.language == language)
-    groups = session.exec(query).all()
-    
-    result = []
-    for group in groups:
-        total = session.exec(select(func.count(TranslatePlToTarget.id)).where(TranslatePlToTarget.group_id == group.id)).one()
-        g_read = TranslatePlToTargetGroupRead.model_validate(group)
-        g_read.total_items = total
-        result.append(g_read)
-    return result
+    return catalog_groups(session, "translate_pl_fr", language).rows
 
 
 @app.post("/translate-pl-fr/groups/", response_model=TranslatePlToTargetGroupRead)
@@ -1148,8 +1490,8 @@ def create_pl_fr_group(
     return new_group
 
 
-@app.post("/translate-pl-fr/import")
-async def import_pl_fr(
+@app.post("/translate-pl-fr/import", response_model=ImportReport)
+def import_pl_fr(
     group_id: uuid.UUID,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -1157,54 +1499,41 @@ async def import_pl_fr(
 ):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
-
-    content = await file.read()
-    decoded_content = content.decode("utf-8")
-
-    csv_file = io.StringIO(decoded_content)
-    sentences = []
-
-    # Reset file pointer
-    csv_file.seek(0)
-    reader = csv.reader(csv_file)
-    rows = list(reader)
-
-    if not rows:
-        return {"message": "Empty file"}
-
-    start_idx = 0
-    # Simple heuristic: if first row has "text_pl", it's a header
-    if rows[0] and "text_pl" in rows[0][0].lower():
-        start_idx = 1
-
-    for i in range(start_idx, len(rows)):
-        row = rows[i]
-        if row and row[0].strip():
-            sentences.append(row[0].strip())
-
-    count = 0
     # Retrieve group to know language
     group = session.get(TranslatePlToTargetGroup, group_id)
-    language = group.language if group else TargetLanguage.FR
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
 
-    for text_pl in sentences:
-        if not text_pl.strip():
-            continue
+    set_ai_user(current_user.id)
 
+    def build(text_pl: str) -> TranslatePlToTarget:
         # Translate
-        text_target = get_translation(text_pl, target_lang="target", language=language)
-
-        item = TranslatePlToTarget(text_pl=text_pl, text_target=text_target, group_id=group_id)
-        session.add(item)
-        count += 1
+        text_target = get_translation(text_pl, target_lang="target", language=group.language)
+        return TranslatePlToTarget(text_pl=text_pl, text_target=text_target, group_id=group_id)
 
-    session.commit()
-    return {"message": f"Imported {count} items with translations"}
+    try:
+        return import_csv_first_column(session, file, TranslatePlToTarget, build, noun="items with translations")
+    except CsvImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/translate-pl-fr/items/", response_model=list[TranslatePlToTargetRead])
-def get_pl_fr_items(group_id: uuid.UUID, session: Session = Depends(get_session)):
-    return session.exec(select(TranslatePlToTarget).where(TranslatePlToTarget.group_id == group_id)).all()
+def get_pl_fr_items(
+    request: Request,
+    response: Response,
+    group_id: uuid.UUID,
+    page: PageParams = Depends(),
+    session: Session = Depends(get_session),
+):
+    if page.requested:
+        return keyset_page(
+            session, response, page, TranslatePlToTarget, TranslatePlToTarget.group_id == group_id,
+            total=lambda: catalog_item_count(session, "translate_pl_fr", group_id),
+        )
+    items = catalog_items(session, "translate_pl_fr", group_id)
+    if not_modified := conditional_response(request, response, make_etag(request, items.version)):
+        return not_modified
+    return items.rows
 
 
 @app.put("/translate-pl-fr/groups/{group_id}", response_model=TranslatePlToTargetGroupRead)
@@ -1307,13 +1636,12 @@ def batch_create_pl_fr_items(
             category=item_data.category,
             group_id=batch.group_id
         )
-        session.add(db_item)
         created_items.append(db_item)
 
+    # One INSERT ... RETURNING for the whole batch instead of a refresh per item
+    rows = bulk_insert_returning(session, created_items)
     session.commit()
-    for item in created_items:
-        session.refresh(item)
-    return created_items
+    return rows
 
 
 # ==========================================
@@ -1327,10 +1655,7 @@ def get_fr_pl_groups(
     language: Optional[TargetLanguage] = None,
 ):
     """Pobierz listę grup tłumaczeń FR->PL, opcjonalnie filtrowanych po języku"""
-    query = select(TranslateTargetToPlGroup)
-    if language:
-        query = query.where(TranslateTargetToPlGroup.language == language)
-    return session.exec(query).all()
+    return catalog_groups(session, "translate_fr_pl", language).rows
 
 
 @app.post("/translate-fr-pl/groups/", response_model=TranslateTargetToPlGroupRead)
@@ -1346,8 +1671,8 @@ def create_fr_pl_group(
     return new_group
 
 
-@app.post("/translate-fr-pl/import")
-async def import_fr_pl(
+@app.post("/translate-fr-pl/import", response_model=ImportReport)
+def import_fr_pl(
     group_id: uuid.UUID,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -1359,55 +1684,44 @@ async def import_fr_pl(
 
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
-
-    content = await file.read()
-    decoded_content = content.decode("utf-8")
-
-    csv_file = io.StringIO(decoded_content)
-    sentences = []
-
-    # Simple reader approach for robustness
-    reader = csv.reader(csv_file)
-    rows = list(reader)
-    if not rows:
-        return {"message": "Empty file"}
-
-    # Check if first row is header "text_pl"
-    start_idx = 0
-    if rows[0] and "text_pl" in rows[0][0].lower():
-        start_idx = 1
-
-    count = 0
-    
     # Retrieve group to know language
     group = session.get(TranslateTargetToPlGroup, group_id)
-    language = group.language if group else TargetLanguage.FR
-
-    for i in range(start_idx, len(rows)):
-        row = rows[i]
-        if not row:
-            continue
-        text_pl = row[0]
-        if not text_pl.strip():
-            continue
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
 
-        text_target = get_translation(text_pl, target_lang="target", language=language)
+    set_ai_user(current_user.id)
 
-        item = TranslateTargetToPl(
+    def build(text_pl: str) -> TranslateTargetToPl:
+        text_target = get_translation(text_pl, target_lang="target", language=group.language)
+        return TranslateTargetToPl(
             text_target=text_target,  # Question
             text_pl=text_pl,  # Answer
             group_id=group_id,
         )
-        session.add(item)
-        count += 1
 
-    session.commit()
-    return {"message": f"Imported {count} items with translations"}
+    try:
+        return import_csv_first_column(session, file, TranslateTargetToPl, build, noun="items with translations")
+    except CsvImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/translate-fr-pl/items/", response_model=list[TranslateTargetToPlRead])
-def get_fr_pl_items(group_id: uuid.UUID, session: Session = Depends(get_session)):
-    return session.exec(select(TranslateTargetToPl).where(TranslateTargetToPl.group_id == group_id)).all()
+def get_fr_pl_items(
+    request: Request,
+    response: Response,
+    group_id: uuid.UUID,
+    page: PageParams = Depends(),
+    session: Session = Depends(get_session),
+):
+    if page.requested:
+        return keyset_page(
+            session, response, page, TranslateTargetToPl, TranslateTargetToPl.group_id == group_id,
+            total=lambda: catalog_item_count(session, "translate_fr_pl", group_id),
+        )
+    items = catalog_items(session, "translate_fr_pl", group_id)
+    if not_modified := conditional_response(request, response, make_etag(request, items.version)):
+        return not_modified
+    return items.rows
 
 
 @app.put("/translate-fr-pl/groups/{group_id}", response_model=TranslateTargetToPlGroupRead)
@@ -1509,13 +1823,12 @@ def batch_create_fr_pl_items(
             category=item_data.category,
             group_id=batch.group_id
         )
-        session.add(db_item)
         created_items.append(db_item)
 
+    # One INSERT ... RETURNING for the whole batch instead of a refresh per item
+    rows = bulk_insert_returning(session, created_items)
     session.commit()
-    for item in created_items:
-        session.refresh(item)
-    return created_items
+    return rows
 
 
 # ==========================================
@@ -1535,24 +1848,7 @@ def get_study_fiszki_groups(
 ):
     # Filter by language - use user's active language if not specified
     active_lang = language or current_user.active_language
-    groups = session.exec(select(FiszkiGroup).where(FiszkiGroup.language == active_lang)).all()
-    study_groups = []
-    for group in groups:
-        total = session.exec(select(func.count(Fiszka.id)).where(Fiszka.group_id == group.id)).one()
-        learned = session.exec(
-            select(func.count(FiszkaProgress.fiszka_id))
-            .join(Fiszka)
-            .where(Fiszka.group_id == group.id)
-            .where(FiszkaProgress.user_id == current_user.id)
-            .where(FiszkaProgress.learned == True)
-        ).one()
-
-        study_groups.append(
-            GroupStudyRead(
-                id=group.id, name=group.name, description=group.description, language=group.language, total_items=total, learned_items=learned, updated_at=group.updated_at
-            )
-        )
-    return study_groups
+    return catalog_study_groups(session, "fiszki", active_lang, current_user.id)
 
 
 @app.post("/study/fiszki/session", response_model=list[FiszkaRead])
@@ -1563,8 +1859,7 @@ def get_study_fiszki_session(
 ):
     import random
 
-    statement = select(Fiszka).where(Fiszka.group_id.in_(request.group_ids))
-    fiszki = session.exec(statement).all()
+    fiszki = catalog_items_of_groups(session, "fiszki", request.group_ids)
 
     if not fiszki:
         return []
@@ -1623,24 +1918,7 @@ def get_study_pl_to_target_groups(
 ):
     # Filter by language - use user's active language if not specified
     active_lang = language or current_user.active_language
-    groups = session.exec(select(TranslatePlToTargetGroup).where(TranslatePlToTargetGroup.language == active_lang)).all()
-    study_groups = []
-    for group in groups:
-        total = session.exec(select(func.count(TranslatePlToTarget.id)).where(TranslatePlToTarget.group_id == group.id)).one()
-        learned = session.exec(
-            select(func.count(TranslatePlToTargetProgress.item_id))
-            .join(TranslatePlToTarget)
-            .where(TranslatePlToTarget.group_id == group.id)
-            .where(TranslatePlToTargetProgress.user_id == current_user.id)
-            .where(TranslatePlToTargetProgress.learned == True)
-        ).one()
-
-        study_groups.append(
-            GroupStudyRead(
-                id=group.id, name=group.name, description=group.description, language=group.language, total_items=total, learned_items=learned, updated_at=group.updated_at
-            )
-        )
-    return study_groups
+    return catalog_study_groups(session, "translate_pl_fr", active_lang, current_user.id)
 
 
 @app.post("/study/translate-pl-fr/session", response_model=list[TranslatePlToTargetRead])
@@ -1651,8 +1929,7 @@ def get_study_pl_to_target_session(
 ):
     import random
 
-    statement = select(TranslatePlToTarget).where(TranslatePlToTarget.group_id.in_(request.group_ids))
-    items = session.exec(statement).all()
+    items = catalog_items_of_groups(session, "translate_pl_fr", request.group_ids)
 
     if not items:
         return []
@@ -1710,24 +1987,7 @@ def get_study_target_to_pl_groups(
 ):
     # Filter by language - use user's active language if not specified
     active_lang = language or current_user.active_language
-    groups = session.exec(select(TranslateTargetToPlGroup).where(TranslateTargetToPlGroup.language == active_lang)).all()
-    study_groups = []
-    for group in groups:
-        total = session.exec(select(func.count(TranslateTargetToPl.id)).where(TranslateTargetToPl.group_id == group.id)).one()
-        learned = session.exec(
-            select(func.count(TranslateTargetToPlProgress.item_id))
-            .join(TranslateTargetToPl)
-            .where(TranslateTargetToPl.group_id == group.id)
-            .where(TranslateTargetToPlProgress.user_id == current_user.id)
-            .where(TranslateTargetToPlProgress.learned == True)
-        ).one()
-
-        study_groups.append(
-            GroupStudyRead(
-                id=group.id, name=group.name, description=group.description, language=group.language, total_items=total, learned_items=learned, updated_at=group.updated_at
-            )
-        )
-    return study_groups
+    return catalog_study_groups(session, "translate_fr_pl", active_lang, current_user.id)
 
 
 @app.post("/study/translate-fr-pl/session", response_model=list[TranslateTargetToPlRead])
@@ -1738,8 +1998,7 @@ def get_study_target_to_pl_session(
 ):
     import random
 
-    statement = select(TranslateTargetToPl).where(TranslateTargetToPl.group_id.in_(request.group_ids))
-    items = session.exec(statement).all()
+    items = catalog_items_of_groups(session, "translate_fr_pl", request.group_ids)
 
     if not items:
         return []
@@ -1799,18 +2058,7 @@ def get_guess_object_groups(
     language: Optional[TargetLanguage] = None,
 ):
     """Pobierz listę grup zgadnij przedmiot, opcjonalnie filtrowanych po języku"""
-    query = select(GuessObjectGroup)
-    if language:
-        query = query.where(GuessObjectGroup.language == language)
-    groups = session.exec(query).all()
-
-    result = []
-    for group in groups:
-        total = session.exec(select(func.count(GuessObject.id)).where(GuessObject.group_id == group.id)).one()
-        g_read = GuessObjectGroupRead.model_validate(group)
-        g_read.total_items = total
-        result.append(g_read)
-    return result
+    return catalog_groups(session, "guess_object", language).rows
 
 
 @app.post("/guess-object/groups/", response_model=GuessObjectGroupRead)
@@ -1864,8 +2112,22 @@ def delete_guess_object_group(
 
 
 @app.get("/guess-object/items/", response_model=list[GuessObjectRead])
-def get_guess_object_items(group_id: uuid.UUID, session: Session = Depends(get_session)):
-    return session.exec(select(GuessObject).where(GuessObject.group_id == group_id)).all()
+def get_guess_object_items(
+    request: Request,
+    response: Response,
+    group_id: uuid.UUID,
+    page: PageParams = Depends(),
+    session: Session = Depends(get_session),
+):
+    if page.requested:
+        return keyset_page(
+            session, response, page, GuessObject, GuessObject.group_id == group_id,
+            total=lambda: catalog_item_count(session, "guess_object", group_id),
+        )
+    items = catalog_items(session, "guess_object", group_id)
+    if not_modified := conditional_response(request, response, make_etag(request, items.version)):
+        return not_modified
+    return items.rows
 
 
 @app.post("/guess-object/items/", response_model=GuessObjectRead)
@@ -1933,17 +2195,16 @@ def batch_create_guess_object_items(
             hint=item_data.hint,
             group_id=batch.group_id,
         )
-        session.add(db_item)
         created_items.append(db_item)
 
+    # One INSERT ... RETURNING for the whole batch instead of a refresh per item
+    rows = bulk_insert_returning(session, created_items)
     session.commit()
-    for item in created_items:
-        session.refresh(item)
-    return created_items
+    return rows
 
 
-@app.post("/guess-object/import")
-async def import_guess_object(
+@app.post("/guess-object/import", response_model=ImportReport)
+def import_guess_object(
     group_id: uuid.UUID,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -1951,32 +2212,23 @@ async def import_guess_object(
 ):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
+    if not session.get(GuessObjectGroup, group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
 
-    content = await file.read()
-    decoded_content = content.decode("utf-8")
-    csv_reader = csv.DictReader(io.StringIO(decoded_content))
-
-    expected_headers = {"description_target", "answer_target"}
-    if not csv_reader.fieldnames or not expected_headers.issubset(set(csv_reader.fieldnames)):
-        # Fallback for old CSVs with description_fr
-        if "description_fr" in csv_reader.fieldnames and "answer_fr" in csv_reader.fieldnames:
-             pass 
-        else:
-            raise HTTPException(status_code=400, detail=f"CSV must contain headers: {', '.join(expected_headers)}")
-
-    count = 0
-    for row in csv_reader:
-        item = GuessObject(
-            description_target=row.get("description_target") or row.get("description_fr"), 
-            answer_target=row.get("answer_target") or row.get("answer_fr"), 
-            hint=row.get("hint"), 
-            group_id=group_id
+    def build(row: dict) -> GuessObject:
+        # Fallback for old CSVs with description_fr / answer_fr
+        return GuessObject(
+            description_target=required(row, "description_target", "description_fr"),
+            answer_target=required(row, "answer_target", "answer_fr"),
+            hint=optional(row, "hint"),
+            group_id=group_id,
         )
-        session.add(item)
-        count += 1
 
-    session.commit()
-    return {"message": f"Successfully imported {count} items"}
+    headers = [{"description_target", "answer_target"}, {"description_fr", "answer_fr"}]
+    try:
+        return import_csv_dicts(session, file, GuessObject, headers, build)
+    except CsvImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # AI Generation for Guess Object
@@ -2036,13 +2288,10 @@ def _normalize_guess_object_keys(items: list[dict], lang_code: str) -> list[dict
 def generate_guess_object_ai_content(level: str, count: int, language: TargetLanguage = TargetLanguage.FR) -> list[dict]:
     """Generuje zagadki słowne synchronicznie."""
     try:
-        client = get_openai_client()
         lang_code = LANGUAGE_CONFIG[language]["code"]
         prompt = _build_guess_object_prompt(level, count, language)
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-        output_text = clean_json_response(response.output_text)
-        items = json.loads(output_text)
+        items = parse_json_items(create_response(prompt, "generate_guess_object", text_format=GENERATED_GUESS_OBJECT_FORMAT))
         return _normalize_guess_object_keys(items, lang_code)
     except Exception as e:
         print(f"Guess Object Generation Error: {e}")
@@ -2055,43 +2304,32 @@ async def generate_guess_object_ai_content_async(level: str, count: int, languag
         lang_code = LANGUAGE_CONFIG[language]["code"]
         prompt = _build_guess_object_prompt(level, count, language)
 
-        output_text = await call_openai_async(prompt)
-        output_text = clean_json_response(output_text)
-        items = json.loads(output_text)
-        return _normalize_guess_object_keys(items, lang_code)
+        output_text = await call_openai_async(prompt, text_format=GENERATED_GUESS_OBJECT_FORMAT)
+        return _normalize_guess_object_keys(parse_json_items(output_text), lang_code)
     except Exception as e:
         print(f"Async Guess Object Generation Error: {e}")
         return []
 
 
-async def generate_guess_object_parallel(level: str, total_count: int, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10) -> list[dict]:
-    """Generuje zagadki równolegle w mniejszych batchach."""
-    if total_count <= batch_size:
-        return await generate_guess_object_ai_content_async(level, total_count, language)
-
+def _guess_object_pipeline(level: str, language: TargetLanguage, dedupe: Optional[DedupeIndex] = None) -> dict:
+    """Prompt, parser, walidacja i deduplikacja batchy zagadek (dla generate_in_batches / stream_in_batches)."""
     lang_code = LANGUAGE_CONFIG[language]["code"]
-    num_batches = (total_count + batch_size - 1) // batch_size
-    items_per_batch = total_count // num_batches
-
-    prompts = []
-    for i in range(num_batches):
-        batch_count = items_per_batch if i < num_batches - 1 else total_count - (items_per_batch * (num_batches - 1))
-        prompts.append(_build_guess_object_prompt(level, batch_count, language))
-
-    print(f"Generating {total_count} guess objects in {num_batches} parallel batches...")
-    responses = await call_openai_batch_async(prompts)
+    return dict(
+        kind="guess_object",
+        dedupe=dedupe or dedupe_index("guess_object", language),
+        build_prompt=lambda n: _build_guess_object_prompt(level, n, language),
+        parse=lambda text: _normalize_guess_object_keys(parse_json_items(text), lang_code),
+        text_format=GENERATED_GUESS_OBJECT_FORMAT,
+        is_valid=lambda item: bool(item.get("description_target") and item.get("answer_target")),
+    )
 
-    all_items = []
-    for output_text in responses:
-        if output_text:
-            try:
-                cleaned = clean_json_response(output_text)
-                batch_items = json.loads(cleaned)
-                all_items.extend(_normalize_guess_object_keys(batch_items, lang_code))
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error in guess object batch: {e}")
 
-    return all_items
+async def generate_guess_object_parallel(level: str, total_count: int, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10, dedupe: Optional[DedupeIndex] = None) -> list[dict]:
+    """Generuje zagadki równolegle w mniejszych batchach, ponawiając nieudane batche."""
+    print(f"Generating {total_count} guess objects in batches of {batch_size}...")
+    return await generate_in_batches(
+        total_count=total_count, batch_size=batch_size, **_guess_object_pipeline(level, language, dedupe)
+    )
 
 
 @app.post("/api/ai/generate-guess-object", response_model=list[GeneratedGuessObjectItem])
@@ -2100,21 +2338,20 @@ async def generate_guess_object_endpoint(
 ):
     """
     Generuje zagadki słowne (Guess Object).
-    Dla count > 10 używa równoległego przetwarzania (szybsze).
+    Batche po 10 idą równolegle przez scheduler; brakujące elementy są dogenerowywane.
     """
     if request.count > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 items at once")
 
-    # Użyj równoległego przetwarzania dla większych requestów
-    if request.count > 10:
-        generated_data = await generate_guess_object_parallel(
-            request.level, request.count, current_user.active_language, batch_size=10
-        )
-    else:
-        generated_data = await generate_guess_object_ai_content_async(
-            request.level, request.count, current_user.active_language
-        )
+    set_ai_user(current_user.id)
+    generated_data = await generate_guess_object_parallel(
+        request.level, request.count, current_user.active_language, batch_size=10
+    )
+    return _map_generated_guess_objects(generated_data)
 
+
+def _map_generated_guess_objects(generated_data: list[dict]) -> list[GeneratedGuessObjectItem]:
+    """Mapuje surowe dane z AI na GeneratedGuessObjectItem."""
     items = []
     for item in generated_data:
         d_target = item.get("description_target")
@@ -2134,6 +2371,23 @@ async def generate_guess_object_endpoint(
     return items
 
 
+@app.post("/api/ai/generate-guess-object/stream")
+async def generate_guess_object_stream_endpoint(
+    request: GenerateGuessObjectRequest, current_user: User = Depends(get_current_superuser)
+):
+    """Strumieniowa wersja /api/ai/generate-guess-object (Server-Sent Events)."""
+    if request.count > 50:
+        raise HTTPException(status_code=400, detail="Maximum 50 items at once")
+
+    set_ai_user(current_user.id)
+    batches = stream_in_batches(
+        total_count=request.count,
+        batch_size=10,
+        **_guess_object_pipeline(request.level, current_user.active_language),
+    )
+    return _sse_response(_stream_generated_items(batches, _map_generated_guess_objects, request.count))
+
+
 # Guess Object Study Endpoints
 @app.get("/study/guess-object/groups", response_model=list[GroupStudyRead])
 def get_study_guess_object_groups(
@@ -2143,24 +2397,7 @@ def get_study_guess_object_groups(
 ):
     # Filter by language - use user's active language if not specified
     active_lang = language or current_user.active_language
-    groups = session.exec(select(GuessObjectGroup).where(GuessObjectGroup.language == active_lang)).all()
-    study_groups = []
-    for group in groups:
-        total = session.exec(select(func.count(GuessObject.id)).where(GuessObject.group_id == group.id)).one()
-        learned = session.exec(
-            select(func.count(GuessObjectProgress.item_id))
-            .join(GuessObject)
-            .where(GuessObject.group_id == group.id)
-            .where(GuessObjectProgress.user_id == current_user.id)
-            .where(GuessObjectProgress.learned == True)
-        ).one()
-
-        study_groups.append(
-            GroupStudyRead(
-                id=group.id, name=group.name, description=group.description, language=group.language, total_items=total, learned_items=learned, updated_at=group.updated_at
-            )
-        )
-    return study_groups
+    return catalog_study_groups(session, "guess_object", active_lang, current_user.id)
 
 
 @app.post("/study/guess-object/session", response_model=list[GuessObjectRead])
@@ -2169,8 +2406,7 @@ def get_study_guess_object_session(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    statement = select(GuessObject).where(GuessObject.group_id.in_(request.group_ids))
-    items = session.exec(statement).all()
+    items = catalog_items_of_groups(session, "guess_object", request.group_ids)
 
     if not items:
         return []
@@ -2230,10 +2466,7 @@ def get_fill_blank_groups(
     language: Optional[TargetLanguage] = None,
 ):
     """Pobierz listę grup uzupełnij lukę, opcjonalnie filtrowanych po języku"""
-    query = select(FillBlankGroup)
-    if language:
-        query = query.where(FillBlankGroup.language == language)
-    return session.exec(query).all()
+    return catalog_groups(session, "fill_blank", language).rows
 
 
 @app.post("/fill-blank/groups/", response_model=FillBlankGroupRead)
@@ -2287,8 +2520,22 @@ def delete_fill_blank_group(
 
 
 @app.get("/fill-blank/items/", response_model=list[FillBlankRead])
-def get_fill_blank_items(group_id: uuid.UUID, session: Session = Depends(get_session)):
-    return session.exec(select(FillBlank).where(FillBlank.group_id == group_id)).all()
+def get_fill_blank_items(
+    request: Request,
+    response: Response,
+    group_id: uuid.UUID,
+    page: PageParams = Depends(),
+    session: Session = Depends(get_session),
+):
+    if page.requested:
+        return keyset_page(
+            session, response, page, FillBlank, FillBlank.group_id == group_id,
+            total=lambda: catalog_item_count(session, "fill_blank", group_id),
+        )
+    items = catalog_items(session, "fill_blank", group_id)
+    if not_modified := conditional_response(request, response, make_etag(request, items.version)):
+        return not_modified
+    return items.rows
 
 
 @app.post("/fill-blank/items/", response_model=FillBlankRead)
@@ -2356,17 +2603,16 @@ def batch_create_fill_blank_items(
             grammar_focus=item_data.grammar_focus,
             group_id=batch.group_id,
         )
-        session.add(db_item)
         created_items.append(db_item)
 
+    # One INSERT ... RETURNING for the whole batch instead of a refresh per item
+    rows = bulk_insert_returning(session, created_items)
     session.commit()
-    for item in created_items:
-        session.refresh(item)
-    return created_items
+    return rows
 
 
-@app.post("/fill-blank/import")
-async def import_fill_blank(
+@app.post("/fill-blank/import", response_model=ImportReport)
+def import_fill_blank(
     group_id: uuid.UUID,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -2374,30 +2620,23 @@ async def import_fill_blank(
 ):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
+    if not session.get(FillBlankGroup, group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
 
-    content = await file.read()
-    decoded_content = content.decode("utf-8")
-    csv_reader = csv.DictReader(io.StringIO(decoded_content))
-
-    expected_headers = {"sentence_with_blank", "answer"}
-    if not csv_reader.fieldnames or not expected_headers.issubset(set(csv_reader.fieldnames)):
-        raise HTTPException(status_code=400, detail=f"CSV must contain headers: {', '.join(expected_headers)}")
-
-    count = 0
-    for row in csv_reader:
-        item = FillBlank(
-            sentence_with_blank=row["sentence_with_blank"],
-            answer=row["answer"],
-            full_sentence=row.get("full_sentence"),
-            hint=row.get("hint"),
-            grammar_focus=row.get("grammar_focus"),
+    def build(row: dict) -> FillBlank:
+        return FillBlank(
+            sentence_with_blank=required(row, "sentence_with_blank"),
+            answer=required(row, "answer"),
+            full_sentence=optional(row, "full_sentence"),
+            hint=optional(row, "hint"),
+            grammar_focus=optional(row, "grammar_focus"),
             group_id=group_id,
         )
-        session.add(item)
-        count += 1
 
-    session.commit()
-    return {"message": f"Successfully imported {count} items"}
+    try:
+        return import_csv_dicts(session, file, FillBlank, [{"sentence_with_blank", "answer"}], build)
+    except CsvImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # AI Generation for Fill Blank
@@ -2470,12 +2709,9 @@ Format JSON (bez dodatkowego tekstu):
 def generate_fill_blank_ai_content(level: str, count: int, grammar_focus: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR) -> list[dict]:
     """Generuje ćwiczenia z lukami synchronicznie."""
     try:
-        client = get_openai_client()
         prompt = _build_fill_blank_prompt(level, count, grammar_focus, language)
 
-        response = client.responses.create(model="gpt-5-nano", input=prompt)
-        output_text = clean_json_response(response.output_text)
-        return json.loads(output_text)
+        return parse_json_items(create_response(prompt, "generate_fill_blank", text_format=GENERATED_FILL_BLANK_FORMAT))
     except Exception as e:
         print(f"Fill Blank Generation Error: {e}")
         return []
@@ -2485,41 +2721,31 @@ async def generate_fill_blank_ai_content_async(level: str, count: int, grammar_f
     """Generuje ćwiczenia z lukami asynchronicznie."""
     try:
         prompt = _build_fill_blank_prompt(level, count, grammar_focus, language)
-        output_text = await call_openai_async(prompt)
-        output_text = clean_json_response(output_text)
-        return json.loads(output_text)
+        output_text = await call_openai_async(prompt, text_format=GENERATED_FILL_BLANK_FORMAT)
+        return parse_json_items(output_text)
     except Exception as e:
         print(f"Async Fill Blank Generation Error: {e}")
         return []
 
 
-async def generate_fill_blank_parallel(level: str, total_count: int, grammar_focus: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10) -> list[dict]:
-    """Generuje ćwiczenia z lukami równolegle w mniejszych batchach."""
-    if total_count <= batch_size:
-        return await generate_fill_blank_ai_content_async(level, total_count, grammar_focus, language)
-
-    num_batches = (total_count + batch_size - 1) // batch_size
-    items_per_batch = total_count // num_batches
-
-    prompts = []
-    for i in range(num_batches):
-        batch_count = items_per_batch if i < num_batches - 1 else total_count - (items_per_batch * (num_batches - 1))
-        prompts.append(_build_fill_blank_prompt(level, batch_count, grammar_focus, language))
-
-    print(f"Generating {total_count} fill blank items in {num_batches} parallel batches...")
-    responses = await call_openai_batch_async(prompts)
+def _fill_blank_pipeline(level: str, grammar_focus: Optional[str], language: TargetLanguage, dedupe: Optional[DedupeIndex] = None) -> dict:
+    """Prompt, parser, walidacja i deduplikacja batchy ćwiczeń z lukami (dla generate_in_batches / stream_in_batches)."""
+    return dict(
+        kind="fill_blank",
+        dedupe=dedupe or dedupe_index("fill_blank", language),
+        build_prompt=lambda n: _build_fill_blank_prompt(level, n, grammar_focus, language),
+        parse=parse_json_items,
+        text_format=GENERATED_FILL_BLANK_FORMAT,
+        is_valid=lambda item: bool(item.get("sentence_with_blank") and item.get("answer")),
+    )
 
-    all_items = []
-    for output_text in responses:
-        if output_text:
-            try:
-                cleaned = clean_json_response(output_text)
-                batch_items = json.loads(cleaned)
-                all_items.extend(batch_items)
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error in fill blank batch: {e}")
 
-    return all_items
+async def generate_fill_blank_parallel(level: str, total_count: int, grammar_focus: Optional[str] = None, language: TargetLanguage = TargetLanguage.FR, batch_size: int = 10, dedupe: Optional[DedupeIndex] = None) -> list[dict]:
+    """Generuje ćwiczenia z lukami równolegle w mniejszych batchach, ponawiając nieudane batche."""
+    print(f"Generating {total_count} fill blank items in batches of {batch_size}...")
+    return await generate_in_batches(
+        total_count=total_count, batch_size=batch_size, **_fill_blank_pipeline(level, grammar_focus, language, dedupe)
+    )
 
 
 @app.post("/api/ai/generate-fill-blank", response_model=list[GeneratedFillBlankItem])
@@ -2528,21 +2754,20 @@ async def generate_fill_blank_endpoint(
 ):
     """
     Generuje ćwiczenia z lukami (Fill Blank).
-    Dla count > 10 używa równoległego przetwarzania (szybsze).
+    Batche po 10 idą równolegle przez scheduler; brakujące elementy są dogenerowywane.
     """
     if request.count > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 items at once")
 
-    # Użyj równoległego przetwarzania dla większych requestów
-    if request.count > 10:
-        generated_data = await generate_fill_blank_parallel(
-            request.level, request.count, request.grammar_focus, current_user.active_language, batch_size=10
-        )
-    else:
-        generated_data = await generate_fill_blank_ai_content_async(
-            request.level, request.count, request.grammar_focus, current_user.active_language
-        )
+    set_ai_user(current_user.id)
+    generated_data = await generate_fill_blank_parallel(
+        request.level, request.count, request.grammar_focus, current_user.active_language, batch_size=10
+    )
+    return _map_generated_fill_blanks(generated_data)
+
 
+def _map_generated_fill_blanks(generated_data: list[dict]) -> list[GeneratedFillBlankItem]:
+    """Mapuje surowe dane z AI na GeneratedFillBlankItem."""
     items = []
     for item in generated_data:
         if item.get("sentence_with_blank") and item.get("answer"):
@@ -2560,6 +2785,23 @@ async def generate_fill_blank_endpoint(
     return items
 
 
+@app.post("/api/ai/generate-fill-blank/stream")
+async def generate_fill_blank_stream_endpoint(
+    request: GenerateFillBlankRequest, current_user: User = Depends(get_current_superuser)
+):
+    """Strumieniowa wersja /api/ai/generate-fill-blank (Server-Sent Events)."""
+    if request.count > 50:
+        raise HTTPException(status_code=400, detail="Maximum 50 items at once")
+
+    set_ai_user(current_user.id)
+    batches = stream_in_batches(
+        total_count=request.count,
+        batch_size=10,
+        **_fill_blank_pipeline(request.level, request.grammar_focus, current_user.active_language),
+    )
+    return _sse_response(_stream_generated_items(batches, _map_generated_fill_blanks, request.count))
+
+
 # Fill Blank Study Endpoints
 @app.get("/study/fill-blank/groups", response_model=list[GroupStudyRead])
 def get_study_fill_blank_groups(
@@ -2569,24 +2811,7 @@ def get_study_fill_blank_groups(
 ):
     # Filter by language - use user's active language if not specified
     active_lang = language or current_user.active_language
-    groups = session.exec(select(FillBlankGroup).where(FillBlankGroup.language == active_lang)).all()
-    study_groups = []
-    for group in groups:
-        total = session.exec(select(func.count(FillBlank.id)).where(FillBlank.group_id == group.id)).one()
-        learned = session.exec(
-            select(func.count(FillBlankProgress.item_id))
-            .join(FillBlank)
-            .where(FillBlank.group_id == group.id)
-            .where(FillBlankProgress.user_id == current_user.id)
-            .where(FillBlankProgress.learned == True)
-        ).one()
-
-        study_groups.append(
-            GroupStudyRead(
-                id=group.id, name=group.name, description=group.description, language=group.language, total_items=total, learned_items=learned, updated_at=group.updated_at
-            )
-        )
-    return study_groups
+    return catalog_study_groups(session, "fill_blank", active_lang, current_user.id)
 
 
 @app.post("/study/fill-blank/session", response_model=list[FillBlankRead])
@@ -2595,8 +2820,7 @@ def get_study_fill_blank_session(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    statement = select(FillBlank).where(FillBlank.group_id.in_(request.group_ids))
-    items = session.exec(statement).all()
+    items = catalog_items_of_groups(session, "fill_blank", request.group_ids)
 
     if not items:
         return []
@@ -2700,31 +2924,43 @@ def calculate_score_endpoint(
     )
 
 
-class WordleStartResponse(BaseModel):
-    target_word: str
-    language: TargetLanguage
-
-
 @app.post("/minigame/wordle/start", response_model=WordleStartResponse)
 def start_wordle(
     level: Optional[str] = "A1",
     current_user: User = Depends(get_current_user),
 ):
-    # Use user's active language for Wordle
-    language = current_user.active_language
-    word = generate_wordle_word(level, language)
-    return {"target_word": word, "language": language}
+    # Use user's active language for Wordle; słowo z puli, stan gry trzymany po stronie serwera
+    game = start_game(current_user.id, current_user.active_language, level)
+    return WordleStartResponse(
+        game_id=game.id,
+        language=game.language,
+        word_length=len(game.target_word),
+        max_attempts=game.max_attempts,
+    )
 
 
 class WordleCheckRequest(BaseModel):
-    target_word: str
+    game_id: str
     guess: str
 
 
-@app.post("/minigame/wordle/check")
-def check_wordle(req: WordleCheckRequest):
-    result = check_wordle_guess(req.target_word, req.guess)
-    return {"result": result}
+@app.post("/minigame/wordle/check", response_model=WordleCheckResponse)
+def check_wordle(req: WordleCheckRequest, current_user: User = Depends(get_current_user)):
+    try:
+        played = play_guess(req.game_id, current_user.id, req.guess)
+    except WordleGuessError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if played is None:
+        raise HTTPException(status_code=404, detail="Game not found or expired")
+    game, result = played
+    return WordleCheckResponse(
+        result=result,
+        attempts_left=game.max_attempts - len(game.attempts),
+        is_solved=game.is_solved,
+        game_over=game.game_over,
+        target_word=game.target_word if game.game_over else None,
+        remaining_words=remaining_words(game),
+    )
 
 
 @app.get("/user/profile/stats")
@@ -2941,6 +3177,115 @@ def get_next_ai_group_index(session: Session, GroupModel, language: TargetLangua
     return max_index + 1
 
 
+def _ai_content_types(lang_code: str) -> list[tuple]:
+    """Tryby generowane przez 'generate-initial-content': (content_type, label, GroupModel, ItemModel)."""
+    return [
+        ("translate_pl_target", f"Tłumaczenie PL → {lang_code}", TranslatePlToTargetGroup, TranslatePlToTarget),
+        ("translate_target_pl", f"Tłumaczenie {lang_code} → PL", TranslateTargetToPlGroup, TranslateTargetToPl),
+        ("guess_object", "Zgadnij przedmiot", GuessObjectGroup, GuessObject),
+        ("fill_blank", "Uzupełnij lukę", FillBlankGroup, FillBlank),
+    ]
+
+
+def _create_ai_groups(session: Session, GroupModel, group_count: int, language: TargetLanguage) -> list:
+    """Tworzy grupy 'Ai Generated X' z kolejnymi numerami."""
+    lang_code = LANGUAGE_CONFIG[language]["code"]
+    next_index = get_next_ai_group_index(session, GroupModel, language)
+    created_groups = []
+    for i in range(group_count):
+        group_name = f"Ai Generated {next_index + i}"
+        group_desc = f"Wygenerowano automatycznie przez AI (B1, {lang_code})"
+        group = GroupModel(name=group_name, description=group_desc, language=language)
+        session.add(group)
+        session.commit()
+        session.refresh(group)
+        created_groups.append(group)
+    return created_groups
+
+
+def _content_type_pipeline(content_type: str, language: TargetLanguage) -> dict:
+    """Pipeline generowania dla danego trybu (poziom B1, jak w generate-initial-content)."""
+    if content_type == "guess_object":
+        return _guess_object_pipeline("B1", language)
+    if content_type == "fill_blank":
+        return _fill_blank_pipeline("B1", None, language)
+    return _content_pipeline("B1", "mixed", language)
+
+
+async def _generate_items_for_content_type(content_type: str, total_items: int, language: TargetLanguage) -> list[dict]:
+    """Generuje surowe elementy AI dla danego trybu."""
+    if content_type == "translate_pl_target" or content_type == "translate_target_pl":
+        return await generate_ai_content_parallel("B1", total_items, "mixed", language, batch_size=10)
+    elif content_type == "guess_object":
+        return await generate_guess_object_parallel("B1", total_items, language, batch_size=10)
+    elif content_type == "fill_blank":
+        return await generate_fill_blank_parallel("B1", total_items, None, language, batch_size=10)
+    return []
+
+
+def _build_generated_db_item(content_type: str, ItemModel, item: dict, group_id: uuid.UUID):
+    """Buduje rekord bazy z elementu wygenerowanego przez AI (None gdy brakuje wymaganych pól)."""
+    if content_type == "translate_pl_target":
+        if item.get("text_pl") and item.get("text_target"):
+            return ItemModel(
+                text_pl=item["text_pl"],
+                text_target=item["text_target"],
+                category=item.get("category") or "mixed",
+                group_id=group_id
+            )
+    elif content_type == "translate_target_pl":
+        if item.get("text_pl") and item.get("text_target"):
+            return ItemModel(
+                text_target=item["text_target"],
+                text_pl=item["text_pl"],
+                category=item.get("category") or "mixed",
+                group_id=group_id
+            )
+    elif content_type == "guess_object":
+        if item.get("description_target") and item.get("answer_target"):
+            return ItemModel(
+                description_target=item["description_target"],
+                description_pl=item.get("description_pl"),
+                answer_target=item["answer_target"],
+                answer_pl=item.get("answer_pl"),
+                category=item.get("category"),
+                group_id=group_id
+            )
+    elif content_type == "fill_blank":
+        if item.get("sentence_with_blank") and item.get("answer"):
+            return ItemModel(
+                sentence_with_blank=item["sentence_with_blank"],
+                sentence_pl=item.get("sentence_pl"),
+                answer=item["answer"],
+                full_sentence=item.get("full_sentence", ""),
+                hint=item.get("hint"),
+                grammar_focus=item.get("grammar_focus"),
+                group_id=group_id
+            )
+    return None
+
+
+def _save_generated_items(session: Session, content_type: str, ItemModel, all_items: list[dict], group_ids: list[uuid.UUID]) -> int:
+    """Rozdziela wygenerowane elementy równo między grupy i zapisuje je. Zwraca liczbę zapisanych."""
+    items_created = 0
+    items_per_group_actual = len(all_items) // len(group_ids) if group_ids else 0
+    for i, group_id in enumerate(group_ids):
+        start_idx = i * items_per_group_actual
+        end_idx = start_idx + items_per_group_actual if i < len(group_ids) - 1 else len(all_items)
+
+        for item in all_items[start_idx:end_idx]:
+            try:
+                db_item = _build_generated_db_item(content_type, ItemModel, item, group_id)
+                if db_item is not None:
+                    session.add(db_item)
+                    items_created += 1
+            except Exception as e:
+                print(f"    Error adding item: {e}")
+
+        session.commit()
+    return items_created
+
+
 @app.post("/api/admin/generate-initial-content", response_model=GenerateContentResponse)
 async def generate_initial_content_endpoint(
     request: GenerateContentRequest = GenerateContentRequest(),
@@ -2956,6 +3301,7 @@ async def generate_initial_content_endpoint(
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+    set_ai_user(current_user.id)
 
     # Użyj aktywnego języka użytkownika
     active_lang = current_user.active_language
@@ -2972,103 +3318,21 @@ async def generate_initial_content_endpoint(
     groups_created = 0
     items_created = 0
 
-    content_types = [
-        ("translate_pl_target", f"Tłumaczenie PL → {lang_code}", TranslatePlToTargetGroup, TranslatePlToTarget),
-        ("translate_target_pl", f"Tłumaczenie {lang_code} → PL", TranslateTargetToPlGroup, TranslateTargetToPl),
-        ("guess_object", "Zgadnij przedmiot", GuessObjectGroup, GuessObject),
-        ("fill_blank", "Uzupełnij lukę", FillBlankGroup, FillBlank),
-    ]
-
-    for idx, (content_type, label, GroupModel, ItemModel) in enumerate(content_types, 1):
+    for idx, (content_type, label, GroupModel, ItemModel) in enumerate(_ai_content_types(lang_code), 1):
         print(f"\n[{idx}/4] Generowanie: {label}...", flush=True)
 
-        # Znajdź następny indeks dla grup AI
-        next_index = get_next_ai_group_index(session, GroupModel, active_lang)
-
         # Twórz grupy z kolejnymi numerami
-        created_groups = []
-        for i in range(group_count):
-            group_name = f"Ai Generated {next_index + i}"
-            group_desc = f"Wygenerowano automatycznie przez AI (B1, {lang_code})"
-            group = GroupModel(name=group_name, description=group_desc, language=active_lang)
-            session.add(group)
-            session.commit()
-            session.refresh(group)
-            created_groups.append(group)
-            groups_created += 1
+        created_groups = _create_ai_groups(session, GroupModel, group_count, active_lang)
+        groups_created += len(created_groups)
 
         # Generuj zawartość równolegle (wszystkie grupy naraz)
         total_items_needed = items_per_group * len(created_groups)
 
         try:
-            if content_type == "translate_pl_target" or content_type == "translate_target_pl":
-                all_items = await generate_ai_content_parallel("B1", total_items_needed, "mixed", active_lang, batch_size=10)
-            elif content_type == "guess_object":
-                all_items = await generate_guess_object_parallel("B1", total_items_needed, active_lang, batch_size=10)
-            elif content_type == "fill_blank":
-                all_items = await generate_fill_blank_parallel("B1", total_items_needed, None, active_lang, batch_size=10)
-            else:
-                all_items = []
-
-            # Rozdziel elementy między grupy
-            items_per_group_actual = len(all_items) // len(created_groups) if created_groups else 0
-            for i, group in enumerate(created_groups):
-                start_idx = i * items_per_group_actual
-                end_idx = start_idx + items_per_group_actual if i < len(created_groups) - 1 else len(all_items)
-                group_items = all_items[start_idx:end_idx]
-
-                for item in group_items:
-                    try:
-                        if content_type == "translate_pl_target":
-                            if item.get("text_pl") and item.get("text_target"):
-                                db_item = ItemModel(
-                                    text_pl=item["text_pl"],
-                                    text_target=item["text_target"],
-                                    category=item.get("category", "mixed"),
-                                    group_id=group.id
-                                )
-                                session.add(db_item)
-                                items_created += 1
-                        elif content_type == "translate_target_pl":
-                            if item.get("text_pl") and item.get("text_target"):
-                                db_item = ItemModel(
-                                    text_target=item["text_target"],
-                                    text_pl=item["text_pl"],
-                                    category=item.get("category", "mixed"),
-                                    group_id=group.id
-                                )
-                                session.add(db_item)
-                                items_created += 1
-                        elif content_type == "guess_object":
-                            if item.get("description_target") and item.get("answer_target"):
-                                db_item = ItemModel(
-                                    description_target=item["description_target"],
-                                    description_pl=item.get("description_pl"),
-                                    answer_target=item["answer_target"],
-                                    answer_pl=item.get("answer_pl"),
-                                    category=item.get("category"),
-                                    group_id=group.id
-                                )
-                                session.add(db_item)
-                                items_created += 1
-                        elif content_type == "fill_blank":
-                            if item.get("sentence_with_blank") and item.get("answer"):
-                                db_item = ItemModel(
-                                    sentence_with_blank=item["sentence_with_blank"],
-                                    sentence_pl=item.get("sentence_pl"),
-                                    answer=item["answer"],
-                                    full_sentence=item.get("full_sentence", ""),
-                                    hint=item.get("hint"),
-                                    grammar_focus=item.get("grammar_focus"),
-                                    group_id=group.id
-                                )
-                                session.add(db_item)
-                                items_created += 1
-                    except Exception as e:
-                        print(f"    Error adding item: {e}")
-
-                session.commit()
-
+            all_items = await _generate_items_for_content_type(content_type, total_items_needed, active_lang)
+            items_created += _save_generated_items(
+                session, content_type, ItemModel, all_items, [group.id for group in created_groups]
+            )
             print(f"  ✓ {label} gotowe ({len(created_groups)} grup)", flush=True)
         except Exception as e:
             print(f"  ✗ Błąd: {e}", flush=True)
@@ -3085,3 +3349,423 @@ async def generate_initial_content_endpoint(
     )
 
 
+async def _stream_initial_content(group_count: int, items_per_group: int, language: TargetLanguage):
+    """
+    Zdarzenia SSE dla generate-initial-content: 'progress' po każdym batchu, 'saved' po każdym trybie,
+    'type_error' gdy jeden tryb się nie powiódł (generowanie idzie dalej); 'error' tylko dla błędów kończących strumień.
+    """
+    lang_code = LANGUAGE_CONFIG[language]["code"]
+    groups_created = 0
+    items_created = 0
+    for content_type, label, GroupModel, ItemModel in _ai_content_types(lang_code):
+        # Commits run in the threadpool so the stream does not block the event loop
+        group_ids = await run_in_threadpool(_create_ai_groups_job, GroupModel, group_count, language)
+        groups_created += len(group_ids)
+        total = items_per_group * len(group_ids)
+        all_items: list[dict] = []
+        try:
+            async for batch in stream_in_batches(
+                total_count=total, batch_size=10, **_content_type_pipeline(content_type, language)
+            ):
+                all_items.extend(batch)
+                yield _sse_event(
+                    "progress",
+                    {"content_type": content_type, "label": label, "count": len(all_items), "total": total},
+                )
+            saved = await run_in_threadpool(_save_generated_items_job, content_type, ItemModel, all_items, group_ids)
+            items_created += saved
+            yield _sse_event("saved", {"content_type": content_type, "label": label, "items": saved})
+        except Exception as e:
+            print(f"  ✗ Błąd: {e}", flush=True)
+            yield _sse_event("type_error", {"content_type": content_type, "label": label, "detail": str(e)})
+
+    yield _sse_event(
+        "done",
+        GenerateContentResponse(
+            success=True,
+            message=f"Wygenerowano {groups_created} grup i {items_created} elementów ({lang_code})",
+            groups_created=groups_created,
+            items_created=items_created,
+        ).model_dump(),
+    )
+
+
+@app.post("/api/admin/generate-initial-content/stream")
+async def generate_initial_content_stream_endpoint(
+    request: GenerateContentRequest = GenerateContentRequest(),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Strumieniowa wersja /api/admin/generate-initial-content (Server-Sent Events)."""
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+    set_ai_user(current_user.id)
+    return _sse_response(
+        _stream_initial_content(request.group_count, request.items_per_group, current_user.active_language)
+    )
+
+
+
+
+# ==========================================
+# Admin: Background Generation Jobs
+# ==========================================
+
+# Zadania w tle nie mają limitu 50 z endpointów synchronicznych
+JOB_MAX_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "500"))
+# Ile elementów generujemy między checkpointami
+JOB_STEP_ITEMS = int(os.getenv("JOB_STEP_ITEMS", "20"))
+
+
+def _groups_have_items(ItemModel, group_ids: list[uuid.UUID]) -> bool:
+    with Session(engine) as session:
+        return session.exec(select(func.count(ItemModel.id)).where(ItemModel.group_id.in_(group_ids))).one() > 0
+
+
+def _create_ai_groups_job(GroupModel, group_count: int, language: TargetLanguage) -> list[uuid.UUID]:
+    with Session(engine) as session:
+        return [group.id for group in _create_ai_groups(session, GroupModel, group_count, language)]
+
+
+def _save_generated_items_job(content_type: str, ItemModel, all_items: list[dict], group_ids: list[uuid.UUID]) -> int:
+    with Session(engine) as session:
+        return _save_generated_items(session, content_type, ItemModel, all_items, group_ids)
+
+
+async def run_initial_content_job(ctx: JobContext) -> dict:
+    """
+    Zadanie 'initial_content': to samo co /api/admin/generate-initial-content,
+    z checkpointem po każdym trybie (utworzone grupy i ukończone tryby są w ctx.state).
+    """
+    language = TargetLanguage(ctx.params["language"])
+    lang_code = LANGUAGE_CONFIG[language]["code"]
+    group_count = ctx.params["group_count"]
+    items_per_group = ctx.params["items_per_group"]
+    content_types = _ai_content_types(lang_code)
+    step_items = group_count * items_per_group
+
+    state = ctx.state
+    state.setdefault("groups", {})
+    state.setdefault("done", [])
+    state.setdefault("groups_created", 0)
+    state.setdefault("items_created", 0)
+    await ctx.checkpoint(progress=len(state["done"]) * step_items, total=len(content_types) * step_items)
+
+    for content_type, label, GroupModel, ItemModel in content_types:
+        if content_type in state["done"]:
+            continue
+
+        group_ids = [uuid.UUID(g) for g in state["groups"].get(content_type, [])]
+        if not group_ids:
+            group_ids = await run_in_threadpool(_create_ai_groups_job, GroupModel, group_count, language)
+            state["groups"][content_type] = [str(g) for g in group_ids]
+            state["groups_created"] += len(group_ids)
+            await ctx.checkpoint()
+
+        # Po restarcie: jeśli elementy zdążyły się zapisać przed checkpointem, nie generuj ich drugi raz
+        if not await run_in_threadpool(_groups_have_items, ItemModel, group_ids):
+            all_items = await _generate_items_for_content_type(content_type, step_items, language)
+            state["items_created"] += await run_in_threadpool(
+                _save_generated_items_job, content_type, ItemModel, all_items, group_ids
+            )
+
+        state["done"].append(content_type)
+        print(f"  ✓ Job {ctx.job_id}: {label} gotowe", flush=True)
+        await ctx.checkpoint(progress=len(state["done"]) * step_items)
+
+    return {
+        "groups_created": state["groups_created"],
+        "items_created": state["items_created"],
+        "message": f"Wygenerowano {state['groups_created']} grup i {state['items_created']} elementów ({lang_code})",
+    }
+
+
+async def _run_generate_job(ctx: JobContext, generate_step, map_items, dedupe: Optional[DedupeIndex]) -> dict:
+    """
+    Wspólna pętla zadań generowania: po JOB_STEP_ITEMS elementów, checkpoint po każdym kroku.
+    Jeden indeks deduplikacji na całe zadanie, żeby kolejne kroki nie powtarzały poprzednich.
+    """
+    count = ctx.params["count"]
+    items = ctx.state.setdefault("items", [])
+    await ctx.checkpoint(progress=len(items), total=count)
+    if dedupe is not None:
+        await dedupe.ensure_loaded()
+        dedupe.seed(items)
+
+    while len(items) < count:
+        step = min(JOB_STEP_ITEMS, count - len(items))
+        new_items = await generate_step(step, dedupe)
+        if not new_items:
+            raise RuntimeError(f"AI nie zwróciło żadnych elementów ({len(items)}/{count})")
+        items.extend(new_items[:step])
+        await ctx.checkpoint(progress=len(items))
+
+    return {"items": [item.model_dump() for item in map_items(items)]}
+
+
+async def run_generate_translate_job(ctx: JobContext) -> dict:
+    p = ctx.params
+    language = TargetLanguage(p["language"])
+    return await _run_generate_job(
+        ctx,
+        lambda n, dedupe: generate_ai_content_parallel(p["level"], n, p.get("category"), language, 10, dedupe),
+        lambda items: _map_generated_items(items, p.get("category")),
+        dedupe_index("translate", language),
+    )
+
+
+async def run_generate_guess_object_job(ctx: JobContext) -> dict:
+    p = ctx.params
+    language = TargetLanguage(p["language"])
+    return await _run_generate_job(
+        ctx,
+        lambda n, dedupe: generate_guess_object_parallel(p["level"], n, language, 10, dedupe),
+        _map_generated_guess_objects,
+        dedupe_index("guess_object", language),
+    )
+
+
+async def run_generate_fill_blank_job(ctx: JobContext) -> dict:
+    p = ctx.params
+    language = TargetLanguage(p["language"])
+    return await _run_generate_job(
+        ctx,
+        lambda n, dedupe: generate_fill_blank_parallel(p["level"], n, p.get("grammar_focus"), language, 10, dedupe),
+        _map_generated_fill_blanks,
+        dedupe_index("fill_blank", language),
+    )
+
+
+job_runner.register("initial_content", run_initial_content_job)
+job_runner.register("translate", run_generate_translate_job)
+job_runner.register("guess_object", run_generate_guess_object_job)
+job_runner.register("fill_blank", run_generate_fill_blank_job)
+
+
+def _submit_job(session: Session, current_user: User, kind: str, params: dict) -> JobSubmitResponse:
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+    params = {**params, "language": current_user.active_language.value}
+    job = job_runner.submit(session, kind, params, current_user.id, current_user.active_language)
+    return JobSubmitResponse(job_id=job.id, status=job.status)
+
+
+def _check_job_count(count: int) -> None:
+    if count < 1 or count > JOB_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {JOB_MAX_ITEMS}")
+
+
+@app.post("/api/admin/jobs/generate-initial-content", response_model=JobSubmitResponse, status_code=202)
+def submit_initial_content_job(
+    request: GenerateContentRequest = GenerateContentRequest(),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Zleca generowanie treści dla wszystkich trybów w tle. Zwraca id zadania."""
+    _check_job_count(request.group_count * request.items_per_group)
+    return _submit_job(session, current_user, "initial_content", request.model_dump())
+
+
+@app.post("/api/admin/jobs/generate", response_model=JobSubmitResponse, status_code=202)
+def submit_generate_job(
+    request: GenerateRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Zleca generowanie par zdań w tle. Wynik (lista GeneratedItem) trafia do result.items."""
+    _check_job_count(request.count)
+    return _submit_job(session, current_user, "translate", request.model_dump())
+
+
+@app.post("/api/admin/jobs/generate-guess-object", response_model=JobSubmitResponse, status_code=202)
+def submit_generate_guess_object_job(
+    request: GenerateGuessObjectRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Zleca generowanie zagadek w tle. Wynik trafia do result.items."""
+    _check_job_count(request.count)
+    return _submit_job(session, current_user, "guess_object", request.model_dump())
+
+
+@app.post("/api/admin/jobs/generate-fill-blank", response_model=JobSubmitResponse, status_code=202)
+def submit_generate_fill_blank_job(
+    request: GenerateFillBlankRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Zleca generowanie ćwiczeń z lukami w tle. Wynik trafia do result.items."""
+    _check_job_count(request.count)
+    return _submit_job(session, current_user, "fill_blank", request.model_dump())
+
+
+@app.get("/api/admin/jobs", response_model=list[GenerationJobRead])
+def list_jobs(
+    status_filter: Optional[JobStatus] = Query(default=None, alias="status"),
+    limit: int = Query(default=50, le=200),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Lista ostatnich zadań generowania (bez checkpointu)."""
+    query = select(GenerationJob).order_by(GenerationJob.created_at.desc()).limit(limit)
+    if status_filter:
+        query = query.where(GenerationJob.status == status_filter)
+    return session.exec(query).all()
+
+
+@app.get("/api/admin/jobs/{job_id}", response_model=GenerationJobRead)
+def get_job(
+    job_id: uuid.UUID,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Status, postęp i (po zakończeniu) wynik zadania."""
+    job = session.get(GenerationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/admin/jobs/{job_id}/cancel", response_model=GenerationJobRead)
+def cancel_job(
+    job_id: uuid.UUID,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """Anuluje zadanie. Oczekujące kończą się od razu, uruchomione - na najbliższym checkpoincie."""
+    job = session.get(GenerationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_runner.cancel(session, job)
+
+
+# ==========================================
+# Export (streaming CSV / JSON Lines)
+# ==========================================
+
+def _export_response(mode: str, kind: str, fmt: str, gzip: bool, **filters) -> StreamingResponse:
+    if mode not in EXPORT_SOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown mode. Must be one of: {', '.join(EXPORT_SOURCES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    query = export_query(mode, kind, **filters)
+    filename = export_filename(mode, kind, fmt, gzip)
+    return StreamingResponse(
+        export_stream(query, fmt, gzip),
+        media_type=export_media_type(fmt, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/api/admin/export/{mode}/{kind}")
+def export_content(
+    mode: str,
+    kind: str,
+    format: str = "csv",
+    gzip: bool = False,
+    language: Optional[TargetLanguage] = None,
+    group_id: Optional[uuid.UUID] = None,
+    user_id: Optional[uuid.UUID] = None,
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Eksport grup, elementów lub postępów (kind = groups / items / progress) danego trybu,
+    strumieniowany z kursora po stronie serwera - stałe zużycie pamięci niezależnie od liczby wierszy.
+    """
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=404, detail=f"kind must be one of: {', '.join(EXPORT_KINDS)}")
+    return _export_response(mode, kind, format, gzip, language=language, group_id=group_id, user_id=user_id)
+
+
+@app.get("/user/progress/export/{mode}")
+def export_my_progress(
+    mode: str,
+    format: str = "csv",
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    """Eksport własnych postępów w danym trybie."""
+    return _export_response(mode, "progress", format, gzip, user_id=current_user.id)
+
+
+# ==========================================
+# Search
+# ==========================================
+
+@app.get("/api/admin/search", response_model=list[SearchHit])
+def search_content_endpoint(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    mode: Optional[str] = None,
+    language: Optional[TargetLanguage] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Wyszukiwanie pełnotekstowe we wszystkich trybach (lub jednym: mode), od najlepiej dopasowanych.
+    Kolejna strona: parametr cursor z nagłówka X-Next-Cursor.
+    """
+    if mode is not None and mode not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(SEARCH_SOURCES)}")
+    try:
+        offset = decode_search_cursor(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    modes = [mode] if mode else list(SEARCH_SOURCES)
+    hits, next_offset = search_content(session, q, modes, language, limit, offset)
+    if next_offset is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_cursor(next_offset)
+    return hits
+
+
+# ==========================================
+# Duplicates
+# ==========================================
+
+@app.get("/api/admin/duplicates", response_model=list[DuplicateCluster])
+def get_duplicate_clusters(
+    mode: str,
+    field: Optional[str] = None,
+    language: Optional[TargetLanguage] = None,
+    threshold: float = Query(DUPLICATES_THRESHOLD, ge=0.3, le=1.0),
+    limit: int = Query(100, ge=1, le=DUPLICATES_MAX_CLUSTERS),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Skupiska prawie identycznych elementów danego trybu (w obrębie języka), od największych.
+    Porównywane jest pole `field` (domyślnie tekst w języku docelowym), indeksem trigramowym pg_trgm.
+    """
+    if mode not in DUPLICATE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(DUPLICATE_FIELDS)}")
+    fields = DUPLICATE_FIELDS[mode]
+    if field is not None and field not in fields:
+        raise HTTPException(status_code=400, detail=f"field must be one of: {', '.join(fields)}")
+    return find_duplicate_clusters(session, mode, field or fields[0], language, threshold, limit)
+
+
+@app.post("/api/admin/duplicates/resolve", response_model=DuplicateResolveReport)
+def resolve_duplicate_clusters(
+    request: DuplicateResolveRequest,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Usuwa duplikaty (remove_ids) z każdego skupiska, zostawiając keep_id. action=merge przenosi
+    postępy użytkowników na zachowany element, action=delete usuwa je razem z duplikatami.
+    """
+    if request.mode not in DUPLICATE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(DUPLICATE_FIELDS)}")
+    if request.action not in DUPLICATE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of: {', '.join(DUPLICATE_ACTIONS)}")
+    if overlapping := overlapping_items(request.clusters):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Items listed more than once across clusters: {', '.join(str(item_id) for item_id in overlapping[:20])}",
+        )
+    ids = [item_id for cluster in request.clusters for item_id in (cluster.keep_id, *cluster.remove_ids)]
+    if missing := missing_items(session, request.mode, ids):
+        raise HTTPException(status_code=404, detail=f"Items not found: {', '.join(str(item_id) for item_id in missing[:20])}")
+    removed, moved = resolve_duplicates(session, request.mode, request.action, request.clusters)
+    return DuplicateResolveReport(message=f"Removed {removed} duplicates", removed=removed, progress_moved=moved)
@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from anyio import to_thread
+from sqlalchemy.pool import QueuePool
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+# /metrics requires "Authorization: Bearer <token>"; while empty the endpoint answers 403
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# SQL statements per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Requests that did not match a route share one label, so unknown URLs cannot grow the label sets
+UNMATCHED_ROUTE = "<unmatched>"
+_STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Value:
+    """One counter or gauge of a label set."""
+
+    __slots__ = ("labels", "value")
+
+    def __init__(self, labels: str):
+        self.labels = labels
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Buckets:
+    """One histogram of a label set: per-bucket counts, made cumulative only when rendered."""
+
+    __slots__ = ("labels", "bounds", "counts", "sum")
+
+    def __init__(self, labels: str, bounds: tuple[float, ...]):
+        self.labels = labels
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """
+    A metric family with a fixed set of label names. Children are created once per label set
+    (pre-registered at startup where the sets are known) and then updated in place without locks:
+    request metrics are written from the event loop thread only, and a rare lost increment from a
+    worker thread is acceptable for monitoring.
+    """
+
+    def __init__(self, kind: str, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = ()):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: dict[tuple, _Value | _Buckets] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    labels = _label_text(self.labelnames, values)
+                    child = _Buckets(labels, self.buckets) if self.kind == "histogram" else _Value(labels)
+                    self._children[values] = child
+        return child
+
+    def samples(self) -> Iterable[str]:
+        for child in list(self._children.values()):
+            if self.kind != "histogram":
+                yield f"{self.name}{child.labels} {_number(child.value)}"
+                continue
+            prefix = child.labels[:-1] + "," if child.labels else "{"
+            cumulative = 0
+            for bound, count in zip((*child.bounds, "+Inf"), child.counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                yield f'{self.name}_bucket{prefix}le="{le}"}} {cumulative}'
+            yield f"{self.name}_sum{child.labels} {_number(child.sum)}"
+            yield f"{self.name}_count{child.labels} {cumulative}"
+
+
+class CallbackMetric:
+    """A metric read at scrape time from state kept elsewhere (pool, threadpool, caches)."""
+
+    def __init__(self, kind: str, name: str, help: str, collect: Callable[[], float]):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        value = self.collect()
+        if value is not None:
+            yield f"{self.name} {_number(value)}"
+
+
+registry: list[Metric | CallbackMetric] = []
+
+
+def _register(metric):
+    registry.append(metric)
+    return metric
+
+
+def counter(name: str, help: str, labelnames: tuple[str, ...] = ()) -> Metric:
+    return _register(Metric("counter", name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: tuple[str, ...] = ()) -> Metric:
+    return _register(Metric("gauge", name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]) -> Metric:
+    return _register(Metric("histogram", name, help, labelnames, buckets))
+
+
+def callback(kind: str, name: str, help: str, collect: Callable[[], float]) -> CallbackMetric:
+    return _register(CallbackMetric(kind, name, help, collect))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry:
+        samples = list(metric.samples())
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# ---- HTTP ----
+
+http_requests = counter("http_requests_total", "HTTP requests by route and status class", ("method", "route", "status"))
+http_latency = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"), HTTP_LATENCY_BUCKETS
+)
+http_in_flight = gauge("http_requests_in_flight", "HTTP requests being handled").labels()
+http_exceptions = counter("http_unhandled_exceptions_total", "Requests that ended in an unhandled exception", ("route",))
+
+# (method, route) -> (latency histogram, counters per status class)
+_route_children: dict[tuple[str, str], tuple[_Buckets, tuple[_Value, ...]]] = {}
+
+
+def _route_metrics(method: str, route: str) -> tuple[_Buckets, tuple[_Value, ...]]:
+    children = _route_children.get((method, route))
+    if children is None:
+        children = (
+            http_latency.labels(method, route),
+            tuple(http_requests.labels(method, route, status) for status in _STATUS_CLASSES),
+        )
+        _route_children[(method, route)] = children
+    return children
+
+
+def register_routes(app) -> None:
+    """Creates the label sets of every route up front, so they are scraped (as zero) before first use."""
+    for route in app.routes:
+        for method in getattr(route, "methods", None) or ():
+            _route_metrics(method, route.path)
+
+
+class MetricsMiddleware:
+    """
+    Request count, latency and in-flight requests per route template (not per URL).
+    Added innermost, so the route the router stored in the scope is visible here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            route = scope.get("route")
+            http_exceptions.labels(route.path if route is not None else UNMATCHED_ROUTE).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.value -= 1
+            route = scope.get("route")
+            latency, statuses = _route_metrics(scope["method"], route.path if route is not None else UNMATCHED_ROUTE)
+            latency.observe(elapsed)
+            statuses[min(max(status // 100, 1), 5) - 1].value += 1
+
+
+# ---- SQL statements per request (recorded by app/queries.py) ----
+
+http_db_queries = histogram(
+    "http_request_db_queries", "SQL statements per request by route", ("route",), QUERY_COUNT_BUCKETS
+)
+http_db_seconds = counter("http_request_db_seconds_total", "Time spent in SQL statements by route", ("route",))
+
+
+def record_request_queries(route: str | None, count: int, seconds: float) -> None:
+    route = route or UNMATCHED_ROUTE
+    http_db_queries.labels(route).observe(count)
+    http_db_seconds.labels(route).inc(seconds)
+
+
+# ---- AI calls (recorded by app/usage.py) ----
+
+ai_requests = counter("ai_requests_total", "OpenAI calls by feature and outcome", ("feature", "outcome"))
+ai_latency = histogram("ai_request_duration_seconds", "OpenAI call latency by feature", ("feature",), AI_LATENCY_BUCKETS)
+
+
+def record_ai_call(feature: str, latency: float, outcome: str) -> None:
+    ai_requests.labels(feature, outcome).inc()
+    if outcome != "rejected":
+        ai_latency.labels(feature).observe(latency)
+
+
+# ---- Resources read at scrape time ----
+
+def register_engine(engine) -> None:
+    """Connection pool gauges (QueuePool only; SQLite's pools have no fixed size)."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    callback("gauge", "db_pool_size", "Configured connection pool size", pool.size)
+    callback("gauge", "db_pool_checked_out", "Connections in use", pool.checkedout)
+    callback("gauge", "db_pool_overflow", "Connections opened above the pool size", pool.overflow)
+    callback("gauge", "db_pool_checked_in", "Idle connections in the pool", pool.checkedin)
+
+
+def _threadpool(statistic: str) -> Callable[[], float]:
+    def collect():
+        # The default limiter belongs to the running event loop (render() is called from the async endpoint)
+        try:
+            return getattr(to_thread.current_default_thread_limiter().statistics(), statistic)
+        except RuntimeError:
+            return None
+
+    return collect
+
+
+callback("gauge", "threadpool_threads_busy", "Worker threads running sync endpoints and run_in_threadpool calls",
+         _threadpool("borrowed_tokens"))
+callback("gauge", "threadpool_threads_max", "Worker thread limit", _threadpool("total_tokens"))
+callback("gauge", "threadpool_tasks_waiting", "Calls waiting for a free worker thread", _threadpool("tasks_waiting"))
+
+
+def register_cache(prefix: str, snapshot: Callable[[], dict]) -> None:
+    """Hit / miss counters and size gauges from a cache's snapshot() (see CatalogCache)."""
+    callback("counter", f"{prefix}_hits_total", "Cache hits", lambda: snapshot()["hits"])
+    callback("counter", f"{prefix}_misses_total", "Cache misses", lambda: snapshot()["misses"])
+    callback("gauge", f"{prefix}_entries", "Cached entries", lambda: snapshot()["entries"])
+    callback("gauge", f"{prefix}_bytes", "Approximate cache size in bytes", lambda: snapshot()["approx_bytes"])
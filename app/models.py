@@ -4,7 +4,7 @@ from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel as PydanticBaseModel
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -25,6 +25,8 @@ class BaseUser(SQLModel):
 
 
 class User(BaseModel, BaseUser, table=True):
+    # Keyset pagination order
+    __table_args__ = (Index("ix_user_created_at_id", "created_at", "id"),)
     password_hash: str
     is_superuser: bool = Field(default=False)
     total_points: int = Field(default=0)
@@ -88,6 +90,11 @@ class FiszkaBase(SQLModel):
 
 
 class Fiszka(BaseModel, FiszkaBase, table=True):
+    # Group lookups and keyset pagination order, within a group and over all fiszki
+    __table_args__ = (
+        Index("ix_fiszka_group_id_created_at_id", "group_id", "created_at", "id"),
+        Index("ix_fiszka_created_at_id", "created_at", "id"),
+    )
     group: Optional[FiszkiGroup] = Relationship(back_populates="fiszki")
 
 
@@ -162,6 +169,8 @@ class TranslatePlToTargetBase(SQLModel):
 
 class TranslatePlToTarget(BaseModel, TranslatePlToTargetBase, table=True):
     __tablename__ = "translate_pl_to_target"
+    # Group lookups and keyset pagination order within a group
+    __table_args__ = (Index("ix_translate_pl_to_target_group_id_created_at_id", "group_id", "created_at", "id"),)
     group: Optional[TranslatePlToTargetGroup] = Relationship(back_populates="items")
 
 
@@ -228,6 +237,8 @@ class TranslateTargetToPlBase(SQLModel):
 
 class TranslateTargetToPl(BaseModel, TranslateTargetToPlBase, table=True):
     __tablename__ = "translate_target_to_pl"
+    # Group lookups and keyset pagination order within a group
+    __table_args__ = (Index("ix_translate_target_to_pl_group_id_created_at_id", "group_id", "created_at", "id"),)
     group: Optional[TranslateTargetToPlGroup] = Relationship(back_populates="items")
 
 
@@ -343,6 +354,8 @@ class GuessObjectBase(SQLModel):
 
 class GuessObject(BaseModel, GuessObjectBase, table=True):
     __tablename__ = "guessobject"
+    # Group lookups and keyset pagination order within a group
+    __table_args__ = (Index("ix_guessobject_group_id_created_at_id", "group_id", "created_at", "id"),)
     group: Optional[GuessObjectGroup] = Relationship(back_populates="items")
 
 
@@ -438,6 +451,8 @@ class FillBlankBase(SQLModel):
 
 class FillBlank(BaseModel, FillBlankBase, table=True):
     __tablename__ = "fillblank"
+    # Group lookups and keyset pagination order within a group
+    __table_args__ = (Index("ix_fillblank_group_id_created_at_id", "group_id", "created_at", "id"),)
     group: Optional[FillBlankGroup] = Relationship(back_populates="items")
 
 
@@ -503,15 +518,205 @@ class AIVerifyResponse(PydanticBaseModel):
     answer_added: bool  # Czy dodano jako alternatywę
 
 
+# ==========================================
+# Background Jobs (AI generation)
+# ==========================================
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class GenerationJobBase(SQLModel):
+    kind: str = Field(index=True)  # initial_content, translate, guess_object, fill_blank
+    status: JobStatus = Field(default=JobStatus.PENDING, index=True)
+    language: TargetLanguage = Field(default=TargetLanguage.FR)
+    progress: int = Field(default=0)
+    total: int = Field(default=0)
+    error: Optional[str] = None
+    cancel_requested: bool = Field(default=False)
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+
+class GenerationJob(BaseModel, GenerationJobBase, table=True):
+    __tablename__ = "generation_job"
+    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id")
+    params: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    # Checkpoint written by the handler after every step, used to resume after a restart
+    state: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    worker_id: Optional[str] = None
+    heartbeat_at: Optional[datetime.datetime] = None
+
+
+class GenerationJobRead(BaseModel, GenerationJobBase):
+    id: uuid.UUID
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    params: dict = {}
+    result: Optional[dict] = None
+
+
+class JobSubmitResponse(PydanticBaseModel):
+    job_id: uuid.UUID
+    status: JobStatus
+
+
+class ImportRowError(PydanticBaseModel):
+    row: int  # line number in the CSV file
+    error: str
+
+
+class ImportReport(PydanticBaseModel):
+    message: str
+    imported: int
+    skipped: int = 0
+    errors: list[ImportRowError] = []  # first IMPORT_MAX_REPORTED_ERRORS rows that were skipped
+
+
+class SearchHit(PydanticBaseModel):
+    mode: str  # fiszki, translate_pl_fr, translate_fr_pl, guess_object, fill_blank
+    id: uuid.UUID
+    group_id: Optional[uuid.UUID] = None
+    group_name: Optional[str] = None
+    language: Optional[TargetLanguage] = None
+    title: str
+    subtitle: Optional[str] = None
+    rank: float = 0.0
+
+
+class DuplicateItem(PydanticBaseModel):
+    id: uuid.UUID
+    group_id: Optional[uuid.UUID] = None
+    group_name: Optional[str] = None
+    text: str
+    created_at: datetime.datetime
+
+
+class DuplicateCluster(PydanticBaseModel):
+    mode: str
+    field: str
+    language: TargetLanguage
+    similarity: float  # highest pair similarity in the cluster
+    items: list[DuplicateItem]  # oldest first
+
+
+class DuplicateResolution(PydanticBaseModel):
+    keep_id: uuid.UUID
+    remove_ids: list[uuid.UUID]
+
+
+class DuplicateResolveRequest(PydanticBaseModel):
+    mode: str
+    action: str = "merge"  # merge: learning progress moves to keep_id; delete: removed with the items
+    clusters: list[DuplicateResolution]
+
+
+class DuplicateResolveReport(PydanticBaseModel):
+    message: str
+    removed: int
+    progress_moved: int
+
+
+class ContentFingerprint(SQLModel, table=True):
+    """Dedupe signature of one catalog item (see app/dedupe.py)."""
+    __tablename__ = "content_fingerprint"
+    # The web process and a standalone job worker may index the same items concurrently
+    __table_args__ = (UniqueConstraint("source", "item_id", name="uq_content_fingerprint_source_item"),)
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    source: str = Field(index=True)  # tabela elementu, np. "fillblank"
+    item_id: uuid.UUID = Field(index=True)
+    content_hash: str
+    signature: list[int] = Field(default_factory=list, sa_column=Column(JSON))
+
+
+class CatalogVersion(SQLModel, table=True):
+    """Single row bumped by every commit that changes the catalog; other processes drop their cache (see app/catalog.py)."""
+    __tablename__ = "catalog_version"
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
+
+
+class AIUsage(SQLModel, table=True):
+    """One OpenAI call: who/what triggered it, tokens, cost and latency (see app/usage.py)."""
+    __tablename__ = "ai_usage"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc), index=True
+    )
+    feature: str = Field(index=True)
+    model: str
+    user_id: Optional[uuid.UUID] = Field(default=None, index=True)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_ms: int = 0
+    outcome: str = "ok"  # ok / error / timeout / rejected
+
+
+class AIUsageAggregate(PydanticBaseModel):
+    key: str
+    calls: int
+    errors: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    avg_latency_ms: float
+
+
+class AIBudgetStatus(PydanticBaseModel):
+    day: datetime.date
+    spent_usd: dict[str, float]
+    total_spent_usd: float
+    daily_budget_usd: Optional[float] = None
+    feature_budgets_usd: dict[str, float] = {}
+
+
 # ==========================================
 # Gamification Models
 # ==========================================
 
+class WordlePoolWord(SQLModel, table=True):
+    """Pre-generated Wordle word waiting to be served (see app/wordle.py)."""
+    __tablename__ = "wordle_pool_word"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    language: TargetLanguage = Field(index=True)
+    level: str = Field(index=True)
+    word: str
+    created_at: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+
 class WordleGame(PydanticBaseModel):
+    """Server-side state of one Wordle game (kept in memory, see app/wordle.py)."""
+    id: str
+    user_id: uuid.UUID
+    language: TargetLanguage
     target_word: str
     attempts: list[str] = []
+    results: list[list[str]] = []
     max_attempts: int = 6
     is_solved: bool = False
     game_over: bool = False
 
 
+class WordleStartResponse(PydanticBaseModel):
+    game_id: str
+    language: TargetLanguage
+    word_length: int
+    max_attempts: int
+
+
+class WordleCheckResponse(PydanticBaseModel):
+    result: list[str]  # 'correct', 'present', 'absent' per letter
+    attempts_left: int
+    is_solved: bool
+    game_over: bool
+    target_word: Optional[str] = None  # revealed once the game is over
+    remaining_words: Optional[int] = None  # dictionary words still consistent with all feedback so far
+
+
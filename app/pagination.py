@@ -0,0 +1,77 @@
+import base64
+import datetime
+import os
+import uuid
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class PageParams:
+    """
+    Opt-in keyset pagination parameters. Without `limit` and `cursor` an endpoint returns
+    its full list as before; with either, one page ordered by (created_at, id).
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description="Page size"),
+        cursor: Optional[str] = Query(None, description=f"Value of {NEXT_CURSOR_HEADER} from the previous page"),
+        include_total: bool = Query(False, description=f"Send the total row count in {TOTAL_COUNT_HEADER}"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+    @property
+    def requested(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+
+def encode_cursor(created_at: datetime.datetime, row_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(
+    session: Session,
+    response: Response,
+    page: PageParams,
+    model,
+    *criteria,
+    total: Optional[Callable[[], int]] = None,
+) -> list:
+    """
+    One page of `model` rows matching `criteria` after the cursor position, read with an index
+    range scan on (created_at, id), so deep pages cost the same as the first one.
+    The next cursor (absent on the last page) and the optional total go into response headers.
+    """
+    limit = page.limit or PAGE_SIZE_DEFAULT
+    query = select(model).where(*criteria)
+    if page.cursor:
+        created_at, row_id = decode_cursor(page.cursor)
+        query = query.where(tuple_(model.created_at, model.id) > tuple_(created_at, row_id))
+    rows = session.exec(query.order_by(model.created_at, model.id).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    if page.include_total and total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total())
+    return rows
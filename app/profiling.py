@@ -0,0 +1,279 @@
+import datetime
+import functools
+import inspect
+import marshal
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+from .serialization import dumps
+from .tracing import TracedRoute
+
+# Default time between stack samples and how many finished profiles are kept for download
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_PROFILES = int(os.getenv("PROFILER_MAX_PROFILES", "20"))
+PROFILE_FORMATS = ("speedscope", "pstats")
+
+_MAX_DEPTH = 200
+
+
+class RequestProfile:
+    """Stack samples of one request, taken from the threads that are running it."""
+
+    def __init__(self, method: str, path: str, loop_thread: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.status: Optional[int] = None
+        self.duration_ms = 0.0
+        # thread id -> how many parts of the request are running on it
+        self.threads: dict[int, int] = {loop_thread: 1}
+        # (stack of (file, first line, function) from the root, seconds it stands for)
+        self.samples: list[tuple[tuple, float]] = []
+        self._lock = threading.Lock()
+
+    def enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] = self.threads.get(ident, 0) + 1
+
+    def leave_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            if self.threads.get(ident, 0) <= 1:
+                self.threads.pop(ident, None)
+            else:
+                self.threads[ident] -= 1
+
+    def thread_ids(self) -> list[int]:
+        with self._lock:
+            return list(self.threads)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": len(self.samples),
+        }
+
+    # ---- Output ----
+
+    def speedscope(self) -> bytes:
+        """speedscope.app file (sampled profile, one frame table)."""
+        frames: dict[tuple, int] = {}
+        samples, weights = [], []
+        for stack, weight in self.samples:
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(weight)
+        return dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": __name__,
+            "shared": {"frames": [{"name": function, "file": file, "line": line} for file, line, function in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path} ({self.started_at.isoformat()})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        })
+
+    def pstats(self) -> bytes:
+        """
+        marshal-ed stats dict as written by cProfile's dump_stats, so pstats.Stats / snakeviz can load it.
+        Built from samples: call counts are sample counts, times are sampled time.
+        """
+        stats: dict[tuple, list] = {}
+        for stack, weight in self.samples:
+            seen = set()
+            for depth, frame in enumerate(stack):
+                entry = stats.setdefault(frame, [0, 0, 0.0, 0.0, {}])
+                if frame not in seen:  # recursion: cumulative time counted once per sample
+                    seen.add(frame)
+                    entry[0] += 1
+                    entry[1] += 1
+                    entry[3] += weight
+                if depth == len(stack) - 1:
+                    entry[2] += weight
+                if depth:
+                    caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += 1
+                    caller[1] += 1
+                    caller[3] += weight
+                    if depth == len(stack) - 1:
+                        caller[2] += weight
+        return marshal.dumps({
+            frame: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+            for frame, (cc, nc, tt, ct, callers) in stats.items()
+        })
+
+
+def _stack(frame) -> tuple:
+    """Functions on the stack, keyed like cProfile: (file, line of the def, name), not the running line."""
+    stack = []
+    while frame is not None and len(stack) < _MAX_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class RequestProfiler:
+    """
+    Profiles the next N requests whose path starts with an armed prefix. One daemon thread samples
+    the stacks of the threads running those requests every `interval` seconds, and only while one
+    is in progress; other requests pay a dict lookup. Async code of concurrent requests sharing the
+    event loop thread can show up in the samples.
+    """
+
+    def __init__(self, max_profiles: int = PROFILER_MAX_PROFILES):
+        self.profiles: deque[RequestProfile] = deque(maxlen=max_profiles)
+        self.path_prefix: Optional[str] = None
+        self.method: Optional[str] = None
+        self.remaining = 0
+        self.interval = PROFILER_INTERVAL_MS / 1000
+        self._active: list[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def arm(self, path_prefix: str, count: int, method: Optional[str] = None, interval_ms: float = PROFILER_INTERVAL_MS) -> None:
+        with self._lock:
+            self.path_prefix = path_prefix
+            self.method = method.upper() if method else None
+            self.remaining = count
+            self.interval = interval_ms / 1000
+
+    def disarm(self) -> None:
+        with self._lock:
+            self.remaining = 0
+            self.path_prefix = None
+
+    def claim(self, method: str, path: str) -> bool:
+        """True when this request is one of the armed N (counts it)."""
+        if self.remaining <= 0 or not path.startswith(self.path_prefix or "\0") or (self.method and method != self.method):
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.append(profile)
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+    def finish(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.remove(profile)
+            self.profiles.append(profile)
+
+    def _sample_loop(self) -> None:
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            weight, last = now - last, now
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for profile in active:
+                for ident in profile.thread_ids():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        profile.samples.append((_stack(frame), weight))
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def clear(self) -> None:
+        self.profiles.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "armed": self.remaining > 0,
+            "path_prefix": self.path_prefix,
+            "method": self.method,
+            "remaining": self.remaining,
+            "interval_ms": self.interval * 1000,
+            "in_progress": len(self._active),
+            "profiles": [profile.summary() for profile in reversed(self.profiles)],
+        }
+
+
+request_profiler = RequestProfiler()
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def _profiled_endpoint(endpoint):
+    """Sync endpoints run in a worker thread: sample that thread too while it runs the request."""
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.leave_thread()
+
+    return wrapper
+
+
+class ProfiledRoute(TracedRoute):
+    """Route class that also lets the profiler find the worker threads of sync endpoints."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
+
+
+class ProfilerMiddleware:
+    """Samples the requests claimed by request_profiler from start to last body chunk."""
+
+    def __init__(self, app, profiler: RequestProfiler = request_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.claim(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile(scope["method"], scope["path"], threading.get_ident())
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send(message)
+
+        self.profiler.start(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            current_profile.reset(token)
+            self.profiler.finish(profile)
@@ -0,0 +1,296 @@
+import datetime
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from .metrics import record_request_queries
+from .tracing import SPAN_KIND_CLIENT, current_trace, record_span
+
+# Statements per request above which the request is reported as a likely N+1
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "25"))
+# A fingerprint repeated this many times in one request is listed in the report
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+# Statements slower than this are kept in the slow query log (0 = off)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+# Share of slow SELECTs re-run with EXPLAIN (ANALYZE, BUFFERS) in the background (PostgreSQL only)
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000"))
+SLOW_QUERY_EXPLAIN_QUEUE = 10
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|:\w+|\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+# Statements that lock rows or write (FOR UPDATE / FOR SHARE, data-modifying CTEs) are never explained
+_NOT_EXPLAINABLE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b|\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE
+)
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals, placeholder names and expanded IN lists normalized, so repeats compare equal."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _PLACEHOLDER_LISTS.sub("(...)", statement)
+    statement = _PLACEHOLDERS.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """Statements executed while handling one request."""
+
+    __slots__ = ("scope", "count", "seconds", "statements")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        # Raw text as the key; fingerprints are only computed for the report of an over-budget request
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Fingerprints executed at least QUERY_REPEAT_THRESHOLD times, most frequent first."""
+        counts: dict[str, int] = {}
+        for statement, count in self.statements.items():
+            key = fingerprint(statement)
+            counts[key] = counts.get(key, 0) + count
+        return sorted(((key, count) for key, count in counts.items() if count >= QUERY_REPEAT_THRESHOLD), key=lambda item: -item[1])
+
+    @property
+    def route(self) -> Optional[str]:
+        """Method and route template of the request (known once the router has matched it)."""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {route.path if route is not None else self.scope['path']}"
+
+
+# Stats of the request being handled; copied into worker threads with the rest of the context
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_QUERY_START = "query_start"
+
+
+# ---- Slow query log ----
+
+# Set on the EXPLAIN thread
+_explaining: ContextVar[bool] = ContextVar("explaining", default=False)
+
+def _type_name(value) -> str:
+    return "null" if value is None else type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Bind parameter names and types without their values, e.g. {"email_1": "str"}."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _type_name(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return _type_name(parameters)
+
+
+@dataclass
+class SlowQuery:
+    at: datetime.datetime
+    duration_ms: float
+    route: Optional[str]  # None outside requests (job worker, startup)
+    fingerprint: str
+    statement: str
+    parameters: object  # parameter_shape()
+    plan: Optional[str] = None  # EXPLAIN (ANALYZE, BUFFERS) output, when sampled
+    plan_error: Optional[str] = None
+
+
+class SlowQueryLog:
+    """
+    The last SLOW_QUERY_LOG_SIZE statements over SLOW_QUERY_MS. A sample of the SELECTs is re-run
+    with EXPLAIN (ANALYZE, BUFFERS) on one background thread, in a transaction that is rolled back,
+    so the request that ran the statement does not wait for it.
+    """
+
+    def __init__(self, size: int = SLOW_QUERY_LOG_SIZE):
+        self._entries: deque[SlowQuery] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._explain_queue: queue.Queue = queue.Queue(maxsize=SLOW_QUERY_EXPLAIN_QUEUE)
+        self._explain_thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.explained = 0
+        self.explain_dropped = 0
+
+    def record(self, conn, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        stats = current_query_stats.get()
+        entry = SlowQuery(
+            at=datetime.datetime.now(datetime.timezone.utc),
+            duration_ms=round(seconds * 1000, 2),
+            route=stats.route if stats is not None else None,
+            fingerprint=fingerprint(statement),
+            statement=statement[:4000],
+            parameters=parameter_shape(parameters, executemany),
+        )
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        if (
+            SLOW_QUERY_EXPLAIN_RATE > 0
+            and not executemany
+            and conn.dialect.name == "postgresql"
+            and entry.fingerprint.lstrip("( ").upper().startswith(("SELECT", "WITH"))
+            and not _NOT_EXPLAINABLE.search(entry.fingerprint)
+            and random.random() < SLOW_QUERY_EXPLAIN_RATE
+        ):
+            self._schedule_explain(conn.engine, entry, statement, parameters)
+
+    def _schedule_explain(self, engine, entry: SlowQuery, statement: str, parameters) -> None:
+        try:
+            self._explain_queue.put_nowait((engine, entry, statement, parameters))
+        except queue.Full:
+            self.explain_dropped += 1
+            return
+        with self._lock:
+            if self._explain_thread is None or not self._explain_thread.is_alive():
+                self._explain_thread = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+                self._explain_thread.start()
+
+    def _explain_loop(self) -> None:
+        # Statements of the EXPLAIN connection are not timed into the log again
+        _explaining.set(True)
+        while True:
+            engine, entry, statement, parameters = self._explain_queue.get()
+            try:
+                with engine.connect() as conn:
+                    # EXPLAIN ANALYZE runs the statement: the transaction cannot write whatever the filter missed
+                    conn.exec_driver_sql("SET LOCAL transaction_read_only = on")
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                    rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+                    conn.rollback()
+                entry.plan = "\n".join(row[0] for row in rows)
+                self.explained += 1
+            except Exception as e:
+                entry.plan_error = f"{type(e).__name__}: {e}"[:500]
+
+    def entries(self, limit: Optional[int] = None) -> list[dict]:
+        """Newest first."""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return [asdict(entry) for entry in entries[:limit]]
+
+    def summary(self) -> list[dict]:
+        """Logged statements grouped by fingerprint, by total time."""
+        groups: dict[str, dict] = {}
+        with self._lock:
+            entries = list(self._entries)
+        for entry in entries:
+            group = groups.setdefault(entry.fingerprint, {"fingerprint": entry.fingerprint, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()})
+            group["count"] += 1
+            group["total_ms"] += entry.duration_ms
+            group["max_ms"] = max(group["max_ms"], entry.duration_ms)
+            if entry.route:
+                group["routes"].add(entry.route)
+        return [
+            {**group, "total_ms": round(group["total_ms"], 2), "routes": sorted(group["routes"])}
+            for group in sorted(groups.values(), key=lambda group: -group["total_ms"])
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "threshold_ms": SLOW_QUERY_MS,
+            "size": self._entries.maxlen,
+            "recorded": self.recorded,
+            "explain_sample_rate": SLOW_QUERY_EXPLAIN_RATE,
+            "explained": self.explained,
+            "explain_dropped": self.explain_dropped,
+        }
+
+
+slow_query_log = SlowQueryLog()
+
+
+# ---- SQLAlchemy engine events (registered in app/main.py) ----
+
+def before_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+
+def after_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info[_QUERY_START].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS and not _explaining.get():
+        slow_query_log.record(conn, statement, parameters, executemany, elapsed)
+    if current_trace.get() is not None:
+        end_ns = time.time_ns()
+        record_span("db.query", end_ns - int(elapsed * 1e9), end_ns, SPAN_KIND_CLIENT, **{"db.statement": statement[:1000]})
+
+
+def discard_query_start(exception_context) -> None:
+    """handle_error: a failed statement never reaches after_cursor_execute."""
+    starts = exception_context.connection.info.get(_QUERY_START) if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+# ---- Request middleware ----
+
+def server_timing(stats: QueryStats) -> bytes:
+    return f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'.encode()
+
+
+def report_query_budget(route: str, stats: QueryStats) -> None:
+    print(f"N+1 warning: {route} ran {stats.count} queries ({stats.seconds * 1000:.1f} ms), budget {QUERY_BUDGET}")
+    for statement, count in stats.repeated()[:5]:
+        print(f"  {count}x {statement[:300]}")
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the SQL statements and database time of every request: a Server-Timing header on the
+    response, per-route metrics, and a printed report (with the repeated statements) when a
+    request goes over QUERY_BUDGET. Statements run after the response has started (streamed
+    bodies) are counted in the metrics but not in the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and stats.count:
+                message = {**message, "headers": [*message["headers"], (b"server-timing", server_timing(stats))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            route = scope.get("route")
+            record_request_queries(route.path if route is not None else None, stats.count, stats.seconds)
+            if stats.count > QUERY_BUDGET:
+                report_query_budget(stats.route, stats)
@@ -0,0 +1,202 @@
+import base64
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import DDL, String, and_, literal, or_, text, union_all
+from sqlmodel import Session, select
+
+from .exports import EXPORT_SOURCES
+from .models import SearchHit, TargetLanguage
+
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", "100"))
+
+# Text search configurations created by SEARCH_SETUP_DDL: the language's stemmer (simple for Polish)
+# preceded by unaccent when the extension is available, so "eleve" finds "élève"
+SEARCH_CONFIGS = {TargetLanguage.FR: "app_french", TargetLanguage.EN: "app_english"}
+POLISH_CONFIG = "app_simple"
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    mode: str
+    target_fields: tuple[str, ...]  # weight A, stemmed in the group's language
+    secondary_fields: tuple[str, ...]  # weight B, same language (descriptions, hints)
+    polish_fields: tuple[str, ...]  # weight C, no stemming
+    title_field: str
+    subtitle_field: Optional[str]
+
+    @property
+    def item_model(self):
+        return EXPORT_SOURCES[self.mode].item_model
+
+    @property
+    def group_model(self):
+        return EXPORT_SOURCES[self.mode].group_model
+
+
+# Content mode (as in EXPORT_SOURCES) -> searchable columns
+SEARCH_SOURCES: dict[str, SearchSource] = {
+    "fiszki": SearchSource("fiszki", ("text_target",), (), ("text_pl",), "text_target", "text_pl"),
+    "translate_pl_fr": SearchSource("translate_pl_fr", ("text_target",), ("category",), ("text_pl",), "text_target", "text_pl"),
+    "translate_fr_pl": SearchSource("translate_fr_pl", ("text_target",), ("category",), ("text_pl",), "text_target", "text_pl"),
+    "guess_object": SearchSource(
+        "guess_object",
+        ("answer_target",),
+        ("description_target", "hint", "category"),
+        ("answer_pl", "description_pl"),
+        "answer_target",
+        "description_target",
+    ),
+    "fill_blank": SearchSource(
+        "fill_blank",
+        ("full_sentence", "answer"),
+        ("sentence_with_blank", "hint", "grammar_focus"),
+        ("sentence_pl",),
+        "sentence_with_blank",
+        "sentence_pl",
+    ),
+}
+
+
+# ---- Schema (PostgreSQL only; registered on table creation in app/main.py) ----
+
+def _config_ddl(name: str, copy: str, dictionary: str) -> str:
+    return f"""
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{name}') THEN
+        CREATE TEXT SEARCH CONFIGURATION {name} (COPY = {copy});
+        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'unaccent') THEN
+            ALTER TEXT SEARCH CONFIGURATION {name}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, {dictionary};
+        END IF;
+    END IF;"""
+
+
+# Extension and configurations, before the tables. Without the privilege to create unaccent
+# the configurations are plain copies and search is accent-sensitive.
+SEARCH_SETUP_DDL = DDL(
+    "DO $$\nBEGIN\n"
+    "    BEGIN\n"
+    "        CREATE EXTENSION IF NOT EXISTS unaccent;\n"
+    "    EXCEPTION WHEN insufficient_privilege OR undefined_file THEN\n"
+    "        RAISE NOTICE 'unaccent is not available, full-text search will be accent-sensitive';\n"
+    "    END;"
+    + _config_ddl("app_french", "french", "french_stem")
+    + _config_ddl("app_english", "english", "english_stem")
+    + _config_ddl(POLISH_CONFIG, "simple", "simple")
+    + "\nEND $$"
+)
+
+
+def _weighted(config: str, fields: tuple[str, ...], weight: str) -> str:
+    joined = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+    return f"setweight(to_tsvector('{config}'::regconfig, {joined}), '{weight}')"
+
+
+def search_column(language: TargetLanguage) -> str:
+    return f"search_{language.value}"
+
+
+def search_table_ddl(source: SearchSource) -> DDL:
+    """
+    One generated tsvector column per target language (the item's language comes from its group,
+    which a generated column cannot read) and a GIN index on each.
+    """
+    table = source.item_model.__tablename__
+    statements = []
+    for language, config in SEARCH_CONFIGS.items():
+        parts = [_weighted(config, source.target_fields, "A")]
+        if source.secondary_fields:
+            parts.append(_weighted(config, source.secondary_fields, "B"))
+        parts.append(_weighted(POLISH_CONFIG, source.polish_fields, "C"))
+        column = search_column(language)
+        statements.append(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector "
+            f"GENERATED ALWAYS AS ({' || '.join(parts)}) STORED"
+        )
+        statements.append(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} USING GIN ({column})")
+    return DDL(";\n".join(statements))
+
+
+SEARCH_TABLE_DDL = {source.item_model.__table__: search_table_ddl(source) for source in SEARCH_SOURCES.values()}
+
+
+# ---- Queries ----
+
+def encode_search_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> int:
+    """Offset encoded in a search cursor; ValueError when it is not one."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    prefix, _, offset = raw.partition(":")
+    if prefix != "offset" or not offset.isdigit():
+        raise ValueError(cursor)
+    return int(offset)
+
+
+def _postgres_query(sources: list[SearchSource], languages: list[TargetLanguage]) -> str:
+    parts = []
+    for source in sources:
+        item_table = source.item_model.__tablename__
+        group_table = source.group_model.__tablename__
+        subtitle = f"i.{source.subtitle_field}" if source.subtitle_field else "NULL"
+        for language in languages:
+            column = search_column(language)
+            parts.append(
+                f"SELECT '{source.mode}' AS mode, i.id, i.group_id, g.name AS group_name, lower(g.language::text) AS language,"
+                f" i.{source.title_field} AS title, {subtitle} AS subtitle, ts_rank_cd(i.{column}, q) AS rank"
+                f" FROM {item_table} i JOIN {group_table} g ON g.id = i.group_id,"
+                f" websearch_to_tsquery('{SEARCH_CONFIGS[language]}'::regconfig, :q) q"
+                f" WHERE g.language = '{language.name}' AND i.{column} @@ q"
+            )
+    return "\nUNION ALL\n".join(parts) + "\nORDER BY rank DESC, id LIMIT :limit OFFSET :offset"
+
+
+def _fallback_query(sources: list[SearchSource], languages: list[TargetLanguage], q: str):
+    """Substring match for databases without full-text search (SQLite in development); unranked."""
+    words = q.split()
+    selects = []
+    for source in sources:
+        Item, Group = source.item_model, source.group_model
+        columns = [getattr(Item, field) for field in source.target_fields + source.secondary_fields + source.polish_fields]
+        subtitle = getattr(Item, source.subtitle_field) if source.subtitle_field else literal(None, String)
+        selects.append(
+            select(
+                literal(source.mode).label("mode"),
+                Item.id,
+                Item.group_id,
+                Group.name.label("group_name"),
+                Group.language,
+                getattr(Item, source.title_field).label("title"),
+                subtitle.label("subtitle"),
+                literal(0.0).label("rank"),
+            )
+            .join(Group, Group.id == Item.group_id)
+            .where(Group.language.in_(languages))
+            .where(and_(*[or_(*[column.ilike(f"%{word}%") for column in columns]) for word in words]))
+        )
+    return union_all(*selects)
+
+
+def search_content(
+    session: Session,
+    q: str,
+    modes: list[str],
+    language: Optional[TargetLanguage],
+    limit: int,
+    offset: int,
+) -> tuple[list[SearchHit], Optional[int]]:
+    """Best matches first; returns (hits, offset of the next page or None on the last page)."""
+    sources = [SEARCH_SOURCES[mode] for mode in modes]
+    languages = [language] if language else list(SEARCH_CONFIGS)
+    if session.get_bind().dialect.name == "postgresql":
+        rows = session.execute(text(_postgres_query(sources, languages)), {"q": q, "limit": limit + 1, "offset": offset})
+    else:
+        query = _fallback_query(sources, languages, q).subquery()
+        rows = session.execute(select(query).order_by(query.c.mode, query.c.id).limit(limit + 1).offset(offset))
+    hits = [SearchHit.model_validate(dict(row)) for row in rows.mappings()]
+    if len(hits) > limit:
+        return hits[:limit], offset + limit
+    return hits, None
@@ -0,0 +1,100 @@
+import orjson
+from pydantic import BaseModel as PydanticBaseModel
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install ".[msgpack]"
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(value):
+    if isinstance(value, PydanticBaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def dumps(value) -> bytes:
+    """orjson encoding; handles datetimes, UUIDs, enums and pydantic models, anything else becomes str()."""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_str(value) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def wants_msgpack(accept: str) -> bool:
+    """True when the Accept header lists a MessagePack media type with a non-zero q."""
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if media_type.lower() not in MSGPACK_MEDIA_TYPES:
+            continue
+        q = next((param[2:] for param in params if param.startswith("q=")), "1")
+        try:
+            if float(q) > 0:
+                return True
+        except ValueError:
+            return True
+    return False
+
+
+class MsgpackMiddleware:
+    """
+    Content negotiation for MessagePack: JSON responses to requests that send
+    `Accept: application/msgpack` are re-encoded (orjson.loads + msgpack.packb).
+    Streaming and non-JSON responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or msgpack is None:
+            await self.app(scope, receive, send)
+            return
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), "")
+        if not wants_msgpack(accept):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body: list[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # Same Vary as the msgpack 200 the client's copy came from
+                    message = {**message, "headers": [*message["headers"], (b"vary", b"Accept")]}
+                    await send(message)
+                    return
+                content_type = next((value for name, value in message["headers"] if name.lower() == b"content-type"), b"")
+                if content_type.startswith(b"application/json"):
+                    start_message = message
+                    return
+            elif message["type"] == "http.response.body" and start_message is not None:
+                body.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                if not any(body):
+                    await send(start_message)
+                    await send(message)
+                    return
+                payload = msgpack.packb(orjson.loads(b"".join(body)))
+                headers = [
+                    (name, value)
+                    for name, value in start_message["headers"]
+                    if name.lower() not in (b"content-type", b"content-length")
+                ]
+                headers += [
+                    (b"content-type", MSGPACK_MEDIA_TYPES[0].encode()),
+                    (b"content-length", str(len(payload)).encode()),
+                    (b"vary", b"Accept"),
+                ]
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": payload})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,289 @@
+import functools
+import inspect
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from .serialization import dumps
+
+# Share of requests traced (0 = none, 1 = all)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+# When > 0 every request collects spans and those slower than this are exported even if not sampled
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+# OTLP JSON, one ExportTraceServiceRequest per line (readable by the OpenTelemetry Collector's
+# otlpjsonfile receiver); rotated to <file>.1 when it grows past TRACE_FILE_MAX_MB
+TRACE_FILE = os.getenv("TRACE_FILE", "traces/spans.jsonl")
+TRACE_FILE_MAX_MB = int(os.getenv("TRACE_FILE_MAX_MB", "100"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "french-learn-api")
+
+TRACE_ID_HEADER = "X-Trace-Id"
+TRACING_ENABLED = TRACE_SAMPLE_RATE > 0 or TRACE_SLOW_MS > 0
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+_STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+
+class Trace:
+    """Spans of one request. Shared by reference with the worker threads that run sync code for it."""
+
+    def __init__(self, sampled: bool):
+        self.trace_id = secrets.token_hex(16)
+        self.sampled = sampled
+        self.spans: list[Span] = []
+        self.handler_end_ns = 0
+
+    def add(self, span: Span) -> Span:
+        self.spans.append(span)
+        return span
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, activate: bool = True, **attributes):
+    """
+    Records a child span of the current one when the request is traced; a no-op otherwise.
+    activate=False records the span without making it the parent of spans started inside it,
+    for generator dependencies that FastAPI enters and exits in different worker threads.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.add(Span(name, _current_span.get(), kind, attributes))
+    token = _current_span.set(current.span_id) if activate else None
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        if token is not None:
+            _current_span.reset(token)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, kind: int = SPAN_KIND_INTERNAL, **attributes) -> None:
+    """A finished span timed elsewhere (SQL statements, response rendering)."""
+    trace = current_trace.get()
+    if trace is None:
+        return
+    finished = trace.add(Span(name, _current_span.get(), kind, attributes))
+    finished.start_ns, finished.end_ns = start_ns, end_ns
+
+
+def traced(name: str, kind: int = SPAN_KIND_INTERNAL):
+    """Decorator: the call of a sync or async function as a span."""
+
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if current_trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name, kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name, kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def _traced_endpoint(route_path: str, endpoint):
+    """The endpoint as a "handler" span; its end marks where response rendering starts."""
+    name = f"handler {endpoint.__name__}"
+
+    def finish(trace: Trace) -> None:
+        trace.handler_end_ns = time.time_ns()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            trace = current_trace.get()
+            if trace is None:
+                return await endpoint(*args, **kwargs)
+            try:
+                with span(name, route=route_path):
+                    return await endpoint(*args, **kwargs)
+            finally:
+                finish(trace)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return endpoint(*args, **kwargs)
+        try:
+            with span(name, route=route_path):
+                return endpoint(*args, **kwargs)
+        finally:
+            finish(trace)
+
+    return wrapper
+
+
+class TracedRoute(APIRoute):
+    """Route class (app.router.route_class) that wraps every endpoint in a handler span."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _traced_endpoint(path, endpoint) if TRACING_ENABLED else endpoint, **kwargs)
+
+
+# ---- Export ----
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def otlp_json(trace: Trace) -> dict:
+    """The trace as an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for item in trace.spans:
+        span_json = {
+            "traceId": trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": item.kind,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns or item.start_ns),
+            "attributes": [_attribute(key, value) for key, value in item.attributes.items()],
+        }
+        if item.parent_id:
+            span_json["parentSpanId"] = item.parent_id
+        if item.error:
+            span_json["status"] = {"code": _STATUS_ERROR, "message": item.error}
+        spans.append(span_json)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class TraceFileExporter:
+    """Appends traces to TRACE_FILE, keeping one rotated file next to it."""
+
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_FILE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.exported = 0
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = dumps(otlp_json(trace)) + b"\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "ab") as file:
+                file.write(line)
+            self.exported += 1
+
+
+trace_exporter = TraceFileExporter()
+
+
+class TracingMiddleware:
+    """
+    Root span of a traced request, plus "render" (from the end of the handler to the response start:
+    validation and serialization) and "send" (response body through the outer middleware).
+    Added outermost so compression is part of the request span.
+    """
+
+    def __init__(self, app, exporter: TraceFileExporter = trace_exporter):
+        self.app = app
+        self.exporter = exporter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        sampled = random.random() < TRACE_SAMPLE_RATE
+        if not sampled and TRACE_SLOW_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(sampled)
+        root = trace.add(Span(f"{scope['method']} {scope['path']}", None, SPAN_KIND_SERVER, {
+            "http.method": scope["method"], "http.target": scope["path"],
+        }))
+        trace_token = current_trace.set(trace)
+        span_token = _current_span.set(root.span_id)
+        response_start_ns = 0
+
+        async def send_wrapper(message):
+            nonlocal response_start_ns
+            if message["type"] == "http.response.start":
+                response_start_ns = time.time_ns()
+                root.attributes["http.status_code"] = message["status"]
+                if trace.handler_end_ns:
+                    record_span("render", trace.handler_end_ns, response_start_ns)
+                message = {**message, "headers": [*message["headers"], (TRACE_ID_HEADER.lower().encode(), trace.trace_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.end_ns = time.time_ns()
+            if response_start_ns:
+                record_span("send", response_start_ns, root.end_ns)
+            current_trace.reset(trace_token)
+            _current_span.reset(span_token)
+            if sampled or (root.end_ns - root.start_ns) / 1e6 >= TRACE_SLOW_MS:
+                handler = next((item for item in trace.spans if item.name.startswith("handler ")), None)
+                if handler is not None:
+                    root.name = f"{scope['method']} {handler.attributes['route']}"
+                try:
+                    await run_in_threadpool(self.exporter.export, trace)
+                except OSError as e:
+                    print(f"Trace export error: {e}")
@@ -0,0 +1,258 @@
+import asyncio
+import datetime
+import os
+import threading
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine
+from .metrics import record_ai_call
+from .models import AIBudgetStatus, AIUsage, AIUsageAggregate, User
+
+# Usage rows are buffered in memory and written in one transaction every few seconds
+AI_USAGE_FLUSH_INTERVAL = float(os.getenv("AI_USAGE_FLUSH_INTERVAL", "5"))
+# Rows kept for the next flush while the database is unavailable; the oldest are dropped beyond this
+AI_USAGE_MAX_PENDING = int(os.getenv("AI_USAGE_MAX_PENDING", "10000"))
+# Daily spend limits in USD (UTC day). 0 / unset = no limit. Per feature: "verify=0.5,translate=0.2"
+AI_DAILY_BUDGET_USD = float(os.getenv("AI_DAILY_BUDGET_USD", "0"))
+AI_FEATURE_DAILY_BUDGETS_USD = os.getenv("AI_FEATURE_DAILY_BUDGETS_USD", "")
+# Prices in USD per 1M tokens, "model=input/output,...", on top of the defaults below
+AI_MODEL_PRICES = os.getenv("AI_MODEL_PRICES", "")
+
+DEFAULT_MODEL_PRICES = {
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+}
+
+# User on whose behalf AI calls are made; set by endpoints and job handlers, inherited by tasks and threads
+ai_user: ContextVar[Optional[uuid.UUID]] = ContextVar("ai_user", default=None)
+
+
+def set_ai_user(user_id: Optional[uuid.UUID]) -> None:
+    ai_user.set(user_id)
+
+
+def _parse_budgets(spec: str) -> dict[str, float]:
+    budgets = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        try:
+            if name.strip():
+                budgets[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return budgets
+
+
+def _parse_prices(spec: str) -> dict[str, tuple[float, float]]:
+    prices = dict(DEFAULT_MODEL_PRICES)
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        prompt_price, _, completion_price = value.partition("/")
+        try:
+            if name.strip():
+                prices[name.strip()] = (float(prompt_price), float(completion_price))
+        except ValueError:
+            continue
+    return prices
+
+
+def _today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+
+class AIBudgetExceeded(Exception):
+    def __init__(self, feature: str, spent: float, limit: float):
+        self.feature = feature
+        self.spent = spent
+        self.limit = limit
+        super().__init__(f"Daily AI budget exceeded for '{feature}': ${spent:.4f} of ${limit:.4f}")
+
+
+class UsageRecorder:
+    """
+    Collects one AIUsage row per OpenAI call and enforces the daily budgets.
+    Spend counters are kept in memory and re-read from the table on every flush,
+    so budgets hold across restarts and across processes sharing the database.
+    """
+
+    def __init__(self, daily_budget: float = AI_DAILY_BUDGET_USD, feature_budgets: dict[str, float] | None = None):
+        self.daily_budget = daily_budget
+        self.feature_budgets = feature_budgets if feature_budgets is not None else _parse_budgets(AI_FEATURE_DAILY_BUDGETS_USD)
+        self.prices = _parse_prices(AI_MODEL_PRICES)
+        self._lock = threading.Lock()
+        self._pending: list[AIUsage] = []
+        self._day = _today()
+        self._spent: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def _roll_day(self) -> None:
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._spent = {}
+
+    def check_budget(self, feature: str) -> None:
+        """Raises AIBudgetExceeded when today's global or per-feature budget is used up."""
+        with self._lock:
+            self._roll_day()
+            feature_limit = self.feature_budgets.get(feature)
+            if feature_limit and self._spent.get(feature, 0.0) >= feature_limit:
+                raise AIBudgetExceeded(feature, self._spent.get(feature, 0.0), feature_limit)
+            total = sum(self._spent.values())
+            if self.daily_budget and total >= self.daily_budget:
+                raise AIBudgetExceeded("all", total, self.daily_budget)
+
+    def record(
+        self,
+        feature: str,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency: float = 0.0,
+        outcome: str = "ok",
+    ) -> None:
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        row = AIUsage(
+            feature=feature,
+            model=model,
+            user_id=ai_user.get(),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=cost,
+            latency_ms=int(latency * 1000),
+            outcome=outcome,
+        )
+        with self._lock:
+            self._roll_day()
+            self._pending.append(row)
+            self._spent[feature] = self._spent.get(feature, 0.0) + cost
+        record_ai_call(feature, latency, outcome)
+
+    def flush(self) -> int:
+        """Writes buffered rows and refreshes today's spend from the table. Returns rows written."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        with Session(engine) as session:
+            if rows:
+                try:
+                    # Core insert: the row objects stay untouched if it fails and can be written again
+                    session.execute(insert(AIUsage), [row.model_dump(exclude={"id"}) for row in rows])
+                    session.commit()
+                except Exception:
+                    self._requeue(rows)
+                    raise
+            day = _today()
+            spent = dict(
+                session.exec(
+                    select(AIUsage.feature, func.sum(AIUsage.cost_usd))
+                    .where(AIUsage.created_at >= _day_start(day))
+                    .group_by(AIUsage.feature)
+                ).all()
+            )
+        with self._lock:
+            self._day = day
+            # Rows recorded while we were querying are not in `spent` yet
+            for row in self._pending:
+                spent[row.feature] = spent.get(row.feature, 0.0) + row.cost_usd
+            self._spent = {feature: float(value or 0.0) for feature, value in spent.items()}
+        return len(rows)
+
+    def _requeue(self, rows: list[AIUsage]) -> None:
+        """Puts a batch that failed to write back in front of the buffer, capped at AI_USAGE_MAX_PENDING."""
+        with self._lock:
+            pending = rows + self._pending
+            dropped = max(len(pending) - AI_USAGE_MAX_PENDING, 0)
+            self._pending = pending[dropped:]
+        if dropped:
+            print(f"AI usage buffer full, dropped {dropped} oldest rows")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(AI_USAGE_FLUSH_INTERVAL)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"AI usage flush error: {e}")
+
+    async def start(self) -> None:
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception as e:
+            print(f"AI usage flush error: {e}")
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+    def budget_status(self) -> AIBudgetStatus:
+        with self._lock:
+            self._roll_day()
+            spent = {feature: round(value, 6) for feature, value in self._spent.items()}
+        return AIBudgetStatus(
+            day=self._day,
+            spent_usd=spent,
+            total_spent_usd=round(sum(spent.values()), 6),
+            daily_budget_usd=self.daily_budget or None,
+            feature_budgets_usd=self.feature_budgets,
+        )
+
+
+usage_recorder = UsageRecorder()
+
+
+USAGE_GROUPINGS = ("feature", "day", "user", "model")
+
+
+def usage_aggregates(session: Session, group_by: str, days: int) -> list[AIUsageAggregate]:
+    """Per-feature / per-day / per-user / per-model totals over the last `days` days."""
+    if group_by == "day":
+        key = func.date(AIUsage.created_at)
+    elif group_by == "user":
+        key = func.coalesce(User.email, "system")
+    else:
+        key = getattr(AIUsage, group_by)
+
+    query = select(
+        key,
+        func.count(AIUsage.id),
+        func.count(AIUsage.id).filter(AIUsage.outcome != "ok"),
+        func.coalesce(func.sum(AIUsage.prompt_tokens), 0),
+        func.coalesce(func.sum(AIUsage.completion_tokens), 0),
+        func.coalesce(func.sum(AIUsage.cost_usd), 0.0),
+        func.coalesce(func.avg(AIUsage.latency_ms), 0.0),
+    ).where(AIUsage.created_at >= _day_start(_today() - datetime.timedelta(days=days - 1)))
+    if group_by == "user":
+        query = query.outerjoin(User, User.id == AIUsage.user_id)
+    rows = session.exec(query.group_by(key).order_by(key)).all()
+
+    return [
+        AIUsageAggregate(
+            key=str(row_key),
+            calls=calls,
+            errors=errors,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=round(float(cost), 6),
+            avg_latency_ms=round(float(latency), 1),
+        )
+        for row_key, calls, errors, prompt_tokens, completion_tokens, cost, latency in rows
+    ]
@@ -0,0 +1,420 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Generic, Iterable, TypeVar
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine
+from .dedupe import normalize_text
+from .gamification import (
+    WORDLE_FALLBACK_WORDS,
+    apply_wordle_guess,
+    generate_wordle_words,
+    is_valid_wordle_word,
+    random_fallback_word,
+)
+from .models import (
+    FillBlank,
+    FillBlankGroup,
+    Fiszka,
+    FiszkiGroup,
+    GuessObject,
+    GuessObjectGroup,
+    TargetLanguage,
+    TranslatePlToTarget,
+    TranslatePlToTargetGroup,
+    TranslateTargetToPl,
+    TranslateTargetToPlGroup,
+    WordleGame,
+    WordlePoolWord,
+)
+
+DEFAULT_WORDLE_POOL_LEVELS = ["A1", "A2", "B1", "B2"]
+
+
+def _parse_levels(spec: str) -> list[str]:
+    """Comma-separated levels; an empty or blank setting falls back to the defaults."""
+    levels = list(dict.fromkeys(level.strip() for level in spec.split(",") if level.strip()))
+    if not levels:
+        print(f"WORDLE_POOL_LEVELS is empty, using {','.join(DEFAULT_WORDLE_POOL_LEVELS)}")
+        return list(DEFAULT_WORDLE_POOL_LEVELS)
+    return levels
+
+
+WORDLE_POOL_LEVELS = _parse_levels(os.getenv("WORDLE_POOL_LEVELS", ",".join(DEFAULT_WORDLE_POOL_LEVELS)))
+# Refill a pool when it drops below the low-water mark, up to the target size
+WORDLE_POOL_LOW_WATER = int(os.getenv("WORDLE_POOL_LOW_WATER", "10"))
+WORDLE_POOL_TARGET = int(os.getenv("WORDLE_POOL_TARGET", "40"))
+WORDLE_POOL_REFILL_INTERVAL = float(os.getenv("WORDLE_POOL_REFILL_INTERVAL", "60"))
+# Games are kept in memory and dropped after this many seconds without a guess
+WORDLE_GAME_TTL = float(os.getenv("WORDLE_GAME_TTL", "1800"))
+WORDLE_MAX_GAMES = int(os.getenv("WORDLE_MAX_GAMES", "10000"))
+WORDLE_MAX_ATTEMPTS = int(os.getenv("WORDLE_MAX_ATTEMPTS", "6"))
+# Optional extra word lists, one word per line: <dir>/fr.txt, <dir>/en.txt
+WORDLE_DICTIONARY_DIR = os.getenv("WORDLE_DICTIONARY_DIR", "")
+# Guesses are only checked against the dictionary once it has this many 5-letter words,
+# so a fresh install with a small catalog does not reject ordinary words
+WORDLE_DICTIONARY_MIN_WORDS = int(os.getenv("WORDLE_DICTIONARY_MIN_WORDS", "200"))
+WORDLE_WORD_LENGTH = 5
+
+
+class WordlePool:
+    """
+    Validated 5-letter words per (language, level), kept in memory for O(1) game starts
+    and persisted in wordle_pool_word so they survive restarts. A background task refills
+    pools that fall below the low-water mark; served words are deleted in the same pass.
+    """
+
+    def __init__(self, levels: list[str] = WORDLE_POOL_LEVELS):
+        self.levels = levels or list(DEFAULT_WORDLE_POOL_LEVELS)
+        self._words: dict[tuple[TargetLanguage, str], deque[tuple[int, str]]] = {
+            (language, level): deque() for language in TargetLanguage for level in self.levels
+        }
+        self._served: list[int] = []
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._dictionary_task: asyncio.Task | None = None
+        self.fallbacks = 0
+
+    def _key(self, language: TargetLanguage, level: str | None) -> tuple[TargetLanguage, str]:
+        return language, level if level in self.levels else self.levels[0]
+
+    def pop(self, language: TargetLanguage, level: str | None = None) -> str:
+        """Next word for a new game; a fallback word when the pool is empty."""
+        key = self._key(language, level)
+        with self._lock:
+            pool = self._words[key]
+            entry = pool.popleft() if pool else None
+            if entry:
+                self._served.append(entry[0])
+            remaining = len(pool)
+        if remaining < WORDLE_POOL_LOW_WATER:
+            self._wake()
+        if entry is None:
+            self.fallbacks += 1
+            return random_fallback_word(language)
+        return entry[1]
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _load(self) -> None:
+        with Session(engine) as session:
+            rows = session.exec(select(WordlePoolWord).order_by(WordlePoolWord.id)).all()
+        with self._lock:
+            for row in rows:
+                key = (row.language, row.level)
+                if key in self._words:
+                    self._words[key].append((row.id, row.word))
+
+    def _store(self, language: TargetLanguage, level: str, words: list[str]) -> list[tuple[int, str]]:
+        with Session(engine) as session:
+            rows = [WordlePoolWord(language=language, level=level, word=word) for word in words]
+            session.add_all(rows)
+            session.commit()
+            return [(row.id, row.word) for row in rows]
+
+    def _delete_served(self) -> None:
+        with self._lock:
+            served, self._served = self._served, []
+        if served:
+            with Session(engine) as session:
+                session.exec(delete(WordlePoolWord).where(WordlePoolWord.id.in_(served)))
+                session.commit()
+
+    async def refill(self) -> int:
+        """Tops up every pool below the low-water mark. Returns the number of words added."""
+        await run_in_threadpool(self._delete_served)
+        added = 0
+        for (language, level), pool in self._words.items():
+            if len(pool) >= WORDLE_POOL_LOW_WATER:
+                continue
+            with self._lock:
+                current = {word for _, word in pool}
+            words = await generate_wordle_words(WORDLE_POOL_TARGET - len(pool), level, language)
+            words = [word for word in words if word not in current]
+            if not words:
+                continue
+            entries = await run_in_threadpool(self._store, language, level, words)
+            with self._lock:
+                pool.extend(entries)
+            added += len(entries)
+        return added
+
+    async def _refill_loop(self) -> None:
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                print(f"Wordle pool refill error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=WORDLE_POOL_REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await run_in_threadpool(self._load)
+        self._task = asyncio.create_task(self._refill_loop())
+        # Build the guess dictionaries off the request path
+        self._dictionary_task = asyncio.create_task(run_in_threadpool(wordle_dictionaries.load_all))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await run_in_threadpool(self._delete_served)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            sizes = {f"{language.value}/{level}": len(pool) for (language, level), pool in self._words.items()}
+        return {"sizes": sizes, "low_water": WORDLE_POOL_LOW_WATER, "target": WORDLE_POOL_TARGET, "fallbacks": self.fallbacks}
+
+
+wordle_pool = WordlePool()
+
+
+# Catalog text in the target language that guesses are collected from: (item, group, columns)
+WORDLE_DICTIONARY_SOURCES = (
+    (Fiszka, FiszkiGroup, ("text_target",)),
+    (TranslatePlToTarget, TranslatePlToTargetGroup, ("text_target",)),
+    (TranslateTargetToPl, TranslateTargetToPlGroup, ("text_target",)),
+    (GuessObject, GuessObjectGroup, ("answer_target", "description_target")),
+    (FillBlank, FillBlankGroup, ("full_sentence", "answer")),
+)
+
+
+class WordleDictionary:
+    """
+    Immutable word list of one language. Membership is a frozenset lookup; words are also
+    indexed by length and by letter (anywhere / at each position) as integer bitmasks over
+    word numbers, so the words consistent with a game's feedback are counted with a few ANDs.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words: tuple[str, ...] = tuple(sorted(set(words)))
+        self.word_set: frozenset[str] = frozenset(self.words)
+        self._all = (1 << len(self.words)) - 1
+        by_length: dict[int, int] = {}
+        by_letter: dict[str, int] = {}
+        by_position: dict[tuple[int, str], int] = {}
+        for number, word in enumerate(self.words):
+            bit = 1 << number
+            by_length[len(word)] = by_length.get(len(word), 0) | bit
+            for position, letter in enumerate(word):
+                by_letter[letter] = by_letter.get(letter, 0) | bit
+                by_position[(position, letter)] = by_position.get((position, letter), 0) | bit
+        self._by_length = by_length
+        self._by_letter = by_letter
+        self._by_position = by_position
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_set
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def count(self, length: int) -> int:
+        return self._by_length.get(length, 0).bit_count()
+
+    def candidates(self, attempts: list[str], results: list[list[str]], length: int = WORDLE_WORD_LENGTH) -> int:
+        """Number of words of `length` consistent with every (guess, result) pair so far."""
+        mask = self._by_length.get(length, 0)
+        for guess, result in zip(attempts, results):
+            found = {letter for letter, status in zip(guess, result) if status != "absent"}
+            for position, (letter, status) in enumerate(zip(guess, result)):
+                at_position = self._by_position.get((position, letter), 0)
+                if status == "correct":
+                    mask &= at_position
+                elif status == "present":
+                    mask &= self._by_letter.get(letter, 0) & ~at_position
+                elif letter in found:
+                    mask &= ~at_position
+                else:
+                    mask &= self._all & ~self._by_letter.get(letter, 0)
+            if not mask:
+                break
+        return mask.bit_count()
+
+
+def _tokens(text: str | None) -> list[str]:
+    return [token for token in normalize_text(text or "").upper().split() if token.isascii() and token.isalpha()]
+
+
+def _read_word_list(language: TargetLanguage) -> list[str]:
+    if not WORDLE_DICTIONARY_DIR:
+        return []
+    path = os.path.join(WORDLE_DICTIONARY_DIR, f"{language.value}.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [token for line in f for token in _tokens(line)]
+
+
+def build_wordle_dictionary(language: TargetLanguage) -> WordleDictionary:
+    """Collects the words of the catalog, the word pool, the fallback list and the optional word list file."""
+    words: set[str] = set(_read_word_list(language))
+    words.update(word for word in WORDLE_FALLBACK_WORDS.get(language, []) if is_valid_wordle_word(word))
+    with Session(engine) as session:
+        for Item, Group, fields in WORDLE_DICTIONARY_SOURCES:
+            rows = session.exec(
+                select(*[getattr(Item, field) for field in fields])
+                .join(Group, Item.group_id == Group.id)
+                .where(Group.language == language)
+            )
+            for values in rows:
+                for value in values:
+                    words.update(_tokens(value))
+        words.update(
+            session.exec(select(WordlePoolWord.word).where(WordlePoolWord.language == language)).all()
+        )
+    dictionary = WordleDictionary(words)
+    print(f"Wordle dictionary [{language.value}]: {len(dictionary)} words, {dictionary.count(WORDLE_WORD_LENGTH)} of length {WORDLE_WORD_LENGTH}")
+    return dictionary
+
+
+class WordleDictionaries:
+    """One dictionary per language, built once on first use (or at startup) and then read-only."""
+
+    def __init__(self):
+        self._dictionaries: dict[TargetLanguage, WordleDictionary] = {}
+        self._lock = threading.Lock()
+
+    def get(self, language: TargetLanguage) -> WordleDictionary:
+        dictionary = self._dictionaries.get(language)
+        if dictionary is None:
+            with self._lock:
+                dictionary = self._dictionaries.get(language)
+                if dictionary is None:
+                    dictionary = self._dictionaries[language] = build_wordle_dictionary(language)
+        return dictionary
+
+    def load_all(self) -> None:
+        for language in TargetLanguage:
+            try:
+                self.get(language)
+            except Exception as e:
+                print(f"Wordle dictionary [{language.value}] load error: {e}")
+
+    def is_strict(self, language: TargetLanguage) -> bool:
+        return self.get(language).count(WORDLE_WORD_LENGTH) >= WORDLE_DICTIONARY_MIN_WORDS
+
+    def snapshot(self) -> dict:
+        return {
+            language.value: {"words": len(dictionary), "playable": dictionary.count(WORDLE_WORD_LENGTH)}
+            for language, dictionary in list(self._dictionaries.items())
+        }
+
+
+wordle_dictionaries = WordleDictionaries()
+
+
+T = TypeVar("T")
+
+
+class TTLStore(Generic[T]):
+    """
+    In-memory key/value store whose entries expire `ttl` seconds after their last access,
+    capped at `max_entries` (least recently used entries are evicted first). Entries are kept
+    in access order, so expired ones are always at the front and eviction is O(1) per entry.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, T]] = OrderedDict()
+        self.lock = threading.RLock()
+        self.evicted = 0
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            self.evicted += 1
+
+    def put(self, key: str, value: T) -> None:
+        now = time.monotonic()
+        with self.lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._evict(now)
+
+    def get(self, key: str) -> T | None:
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = (now + self.ttl, entry[1])
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def pop(self, key: str) -> T | None:
+        with self.lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+wordle_games: TTLStore[WordleGame] = TTLStore(WORDLE_GAME_TTL, WORDLE_MAX_GAMES)
+
+
+class WordleGuessError(Exception):
+    pass
+
+
+def start_game(user_id: uuid.UUID, language: TargetLanguage, level: str | None) -> WordleGame:
+    game = WordleGame(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        language=language,
+        target_word=wordle_pool.pop(language, level),
+        max_attempts=WORDLE_MAX_ATTEMPTS,
+    )
+    wordle_games.put(game.id, game)
+    return game
+
+
+def play_guess(game_id: str, user_id: uuid.UUID, guess: str) -> tuple[WordleGame, list[str]] | None:
+    """
+    Scores a guess against the stored game. None when the game does not exist (or expired / belongs
+    to someone else); WordleGuessError when the game is over or the guess is not a dictionary word.
+    A rejected guess does not use up an attempt.
+    """
+    guess = guess.strip().upper()
+    game = wordle_games.get(game_id)
+    if game is None or game.user_id != user_id:
+        return None
+    if len(guess) != len(game.target_word) or not guess.isascii() or not guess.isalpha():
+        raise WordleGuessError(f"Słowo musi mieć {len(game.target_word)} liter")
+    if guess != game.target_word and wordle_dictionaries.is_strict(game.language) and guess not in wordle_dictionaries.get(game.language):
+        raise WordleGuessError("Nie ma takiego słowa w słowniku")
+    with wordle_games.lock:
+        if game.game_over:
+            raise WordleGuessError("Gra została już zakończona")
+        result = apply_wordle_guess(game, guess)
+    return game, result
+
+
+def remaining_words(game: WordleGame) -> int | None:
+    """Dictionary words still possible after the game's feedback; None when the dictionary is not in strict use."""
+    if game.game_over or not wordle_dictionaries.is_strict(game.language):
+        return None
+    return wordle_dictionaries.get(game.language).candidates(game.attempts, game.results, len(game.target_word))
@@ -2,12 +2,13 @@ import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { X, Trophy } from 'lucide-react';
 import { cn } from '../lib/utils';
+import type { WordleCheckResponse } from '../lib/api';
 
 interface WordleModalProps {
     isOpen: boolean;
     onClose: () => void;
     onComplete: (success: boolean) => void;
-    checkWord: (guess: string) => Promise<string[]>; // Returns array of statuses: 'correct', 'present', 'absent'
+    checkWord: (guess: string) => Promise<WordleCheckResponse>; // result: array of statuses 'correct', 'present', 'absent'
     targetWordLength?: number;
 }
 
@@ -24,6 +25,8 @@ export const WordleModal: React.FC<WordleModalProps> = ({
     const [gameOver, setGameOver] = useState(false);
     const [won, setWon] = useState(false);
     const [loading, setLoading] = useState(false);
+    const [message, setMessage] = useState("");
+    const [revealedWord, setRevealedWord] = useState("");
 
     useEffect(() => {
         if (isOpen) {
@@ -34,11 +37,14 @@ export const WordleModal: React.FC<WordleModalProps> = ({
             setGameOver(false);
             setWon(false);
             setLoading(false);
+            setMessage("");
+            setRevealedWord("");
         }
     }, [isOpen]);
 
     const handleType = (char: string) => {
         if (gameOver || loading) return;
+        setMessage("");
         if (char === 'BACKSPACE') {
             setCurrentGuess(prev => prev.slice(0, -1));
         } else if (char === 'ENTER') {
@@ -68,23 +74,24 @@ export const WordleModal: React.FC<WordleModalProps> = ({
         setLoading(true);
         try {
             const res = await checkWord(currentGuess);
-            setResults(prev => [...prev, res]);
+            setResults(prev => [...prev, res.result]);
             setAttempts(prev => [...prev, currentGuess]);
 
-            const isCorrect = res.every(r => r === 'correct');
-
-            if (isCorrect) {
+            if (res.is_solved) {
                 setWon(true);
                 setGameOver(true);
                 setTimeout(() => onComplete(true), 2000);
-            } else if (attempts.length + 1 >= 6) {
+            } else if (res.game_over) {
                 setGameOver(true);
+                setRevealedWord(res.target_word || "");
                 setTimeout(() => onComplete(false), 2000);
             } else {
                 setCurrentGuess("");
             }
-        } catch (e) {
+        } catch (e: any) {
+            // Rejected guesses (e.g. not in the dictionary) do not use up an attempt
             console.error("Wordle check failed", e);
+            setMessage(e.response?.data?.detail || "Nie udało się sprawdzić słowa");
         } finally {
             setLoading(false);
         }
@@ -152,7 +159,8 @@ export const WordleModal: React.FC<WordleModalProps> = ({
                 {/* Status Message */}
                 <div className="h-8 text-center">
                     {won && <span className="text-green-600 font-bold flex items-center justify-center gap-2"><Trophy className="w-4 h-4" /> Wygrana! +100 pkt</span>}
-                    {gameOver && !won && <span className="text-red-500 font-bold">Koniec gry! Spróbuj następnym razem.</span>}
+                    {gameOver && !won && <span className="text-red-500 font-bold">Koniec gry! {revealedWord && `Słowo: ${revealedWord}. `}Spróbuj następnym razem.</span>}
+                    {!gameOver && message && <span className="text-orange-500 font-semibold">{message}</span>}
                 </div>
 
                 {/* Keyboard (Visual helper - optional, simplified here) */}
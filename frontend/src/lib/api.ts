@@ -45,6 +45,75 @@ api.interceptors.response.use(
     }
 )
 
+// Server-Sent Events przez POST (EventSource obsługuje tylko GET bez nagłówków)
+export interface StreamEvent<T = unknown> {
+    event: string
+    data: T
+}
+
+export async function postEventStream(
+    path: string,
+    body: unknown,
+    onEvent: (event: StreamEvent<any>) => void
+): Promise<void> {
+    const token = localStorage.getItem('auth_token')
+    const response = await fetch(`${API_BASE_URL}${path}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify(body),
+    })
+    if (response.status === 401) {
+        localStorage.removeItem('auth_token')
+        localStorage.removeItem('user')
+        window.location.href = '/login'
+    }
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    for (;;) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+            const chunk = buffer.slice(0, boundary)
+            buffer = buffer.slice(boundary + 2)
+            let event = 'message'
+            const dataLines: string[] = []
+            for (const line of chunk.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim()
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim())
+            }
+            if (dataLines.length > 0) {
+                const data = JSON.parse(dataLines.join('\n'))
+                if (event === 'error') throw new Error(data.detail || 'Stream error')
+                onEvent({ event, data })
+            }
+            boundary = buffer.indexOf('\n\n')
+        }
+    }
+}
+
+// Zbiera zdarzenia 'items' strumienia generowania, wywołując onItems dla każdego batcha
+async function streamGeneratedItems<T>(path: string, body: unknown, onItems: (items: T[]) => void): Promise<T[]> {
+    const all: T[] = []
+    await postEventStream(path, body, ({ event, data }) => {
+        if (event === 'items') {
+            all.push(...data.items)
+            onItems(data.items)
+        }
+    })
+    return all
+}
+
 // Language Types
 export type TargetLanguage = 'fr' | 'en'
 
@@ -199,6 +268,9 @@ export const aiApi = {
         return response.data
     },
 
+    generateStream: (level: string, count: number, onItems: (items: GeneratedItem[]) => void, category?: string): Promise<GeneratedItem[]> =>
+        streamGeneratedItems<GeneratedItem>('/api/ai/generate/stream', { level, count, category }, onItems),
+
     verifyAnswer: async (data: AIVerifyRequest): Promise<AIVerifyResponse> => {
         const response = await api.post<AIVerifyResponse>('/api/ai/verify-answer', data)
         return response.data
@@ -260,6 +332,14 @@ export const groupsApi = {
 }
 
 // Fiszki API
+// CSV import result: row counts plus the first rows that were skipped
+export interface ImportReport {
+    message: string
+    imported: number
+    skipped: number
+    errors: { row: number; error: string }[]
+}
+
 export const fiszkiApi = {
     getAll: async (groupId?: string): Promise<Fiszka[]> => {
         const params = groupId ? { group_id: groupId } : undefined
@@ -286,11 +366,11 @@ export const fiszkiApi = {
         await api.delete(`/fiszki/${id}`)
     },
 
-    importFromCsv: async (groupId: string, file: File): Promise<{ message: string }> => {
+    importFromCsv: async (groupId: string, file: File): Promise<ImportReport> => {
         const formData = new FormData()
         formData.append('file', file)
 
-        const response = await api.post<{ message: string }>(`/fiszki/import?group_id=${groupId}`, formData, {
+        const response = await api.post<ImportReport>(`/fiszki/import?group_id=${groupId}`, formData, {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
@@ -340,10 +420,10 @@ export const translatePlFrApi = {
         await api.delete(`/translate-pl-fr/items/${id}`)
     },
 
-    importFromCsv: async (groupId: string, file: File): Promise<{ message: string }> => {
+    importFromCsv: async (groupId: string, file: File): Promise<ImportReport> => {
         const formData = new FormData()
         formData.append('file', file)
-        const response = await api.post<{ message: string }>(`/translate-pl-fr/import?group_id=${groupId}`, formData, {
+        const response = await api.post<ImportReport>(`/translate-pl-fr/import?group_id=${groupId}`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' },
         })
         return response.data
@@ -396,10 +476,10 @@ export const translateFrPlApi = {
         await api.delete(`/translate-fr-pl/items/${id}`)
     },
 
-    importFromCsv: async (groupId: string, file: File): Promise<{ message: string }> => {
+    importFromCsv: async (groupId: string, file: File): Promise<ImportReport> => {
         const formData = new FormData()
         formData.append('file', file)
-        const response = await api.post<{ message: string }>(`/translate-fr-pl/import?group_id=${groupId}`, formData, {
+        const response = await api.post<ImportReport>(`/translate-fr-pl/import?group_id=${groupId}`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' },
         })
         return response.data
@@ -503,10 +583,10 @@ export const guessObjectApi = {
         await api.delete(`/guess-object/items/${id}`)
     },
 
-    importFromCsv: async (groupId: string, file: File): Promise<{ message: string }> => {
+    importFromCsv: async (groupId: string, file: File): Promise<ImportReport> => {
         const formData = new FormData()
         formData.append('file', file)
-        const response = await api.post<{ message: string }>(`/guess-object/import?group_id=${groupId}`, formData, {
+        const response = await api.post<ImportReport>(`/guess-object/import?group_id=${groupId}`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' },
         })
         return response.data
@@ -520,7 +600,10 @@ export const guessObjectApi = {
     generateAI: async (level: string, count: number): Promise<GeneratedGuessObjectItem[]> => {
         const response = await api.post<GeneratedGuessObjectItem[]>('/api/ai/generate-guess-object', { level, count })
         return response.data
-    }
+    },
+
+    generateAIStream: (level: string, count: number, onItems: (items: GeneratedGuessObjectItem[]) => void): Promise<GeneratedGuessObjectItem[]> =>
+        streamGeneratedItems<GeneratedGuessObjectItem>('/api/ai/generate-guess-object/stream', { level, count }, onItems)
 }
 
 
@@ -615,10 +698,10 @@ export const fillBlankApi = {
         await api.delete(`/fill-blank/items/${id}`)
     },
 
-    importFromCsv: async (groupId: string, file: File): Promise<{ message: string }> => {
+    importFromCsv: async (groupId: string, file: File): Promise<ImportReport> => {
         const formData = new FormData()
         formData.append('file', file)
-        const response = await api.post<{ message: string }>(`/fill-blank/import?group_id=${groupId}`, formData, {
+        const response = await api.post<ImportReport>(`/fill-blank/import?group_id=${groupId}`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' },
         })
         return response.data
@@ -636,7 +719,14 @@ export const fillBlankApi = {
             grammar_focus: grammarFocus
         })
         return response.data
-    }
+    },
+
+    generateAIStream: (level: string, count: number, onItems: (items: GeneratedFillBlankItem[]) => void, grammarFocus?: string): Promise<GeneratedFillBlankItem[]> =>
+        streamGeneratedItems<GeneratedFillBlankItem>('/api/ai/generate-fill-blank/stream', {
+            level,
+            count,
+            grammar_focus: grammarFocus
+        }, onItems)
 }
 
 
@@ -661,8 +751,20 @@ export interface ScoreResponse {
     message?: string | null
 }
 
+export interface WordleStartResponse {
+    game_id: string
+    language: string
+    word_length: number
+    max_attempts: number
+}
+
 export interface WordleCheckResponse {
     result: string[] // 'correct', 'present', 'absent'
+    attempts_left: number
+    is_solved: boolean
+    game_over: boolean
+    target_word?: string | null // revealed once the game is over
+    remaining_words?: number | null
 }
 
 export const gamificationApi = {
@@ -706,13 +808,13 @@ export const dashboardApi = {
 }
 
 export const wordleApi = {
-    start: async (level: string = 'A1'): Promise<{ target_word: string }> => {
-        const response = await api.post<{ target_word: string }>('/minigame/wordle/start', { level })
+    start: async (level: string = 'A1'): Promise<WordleStartResponse> => {
+        const response = await api.post<WordleStartResponse>('/minigame/wordle/start', null, { params: { level } })
         return response.data
     },
 
-    check: async (target_word: string, guess: string): Promise<WordleCheckResponse> => {
-        const response = await api.post<WordleCheckResponse>('/minigame/wordle/check', { target_word, guess })
+    check: async (game_id: string, guess: string): Promise<WordleCheckResponse> => {
+        const response = await api.post<WordleCheckResponse>('/minigame/wordle/check', { game_id, guess })
         return response.data
     }
 }
@@ -731,6 +833,26 @@ export const adminApi = {
             items_per_group: itemsPerGroup
         })
         return response.data
+    },
+
+    generateInitialContentStream: async (
+        groupCount: number,
+        itemsPerGroup: number,
+        onProgress: (progress: { label: string; count: number; total: number }) => void,
+        // Jeden tryb się nie powiódł; serwer generuje dalej kolejne tryby
+        onTypeError?: (error: { content_type: string; label: string; detail: string }) => void
+    ): Promise<GenerateContentResponse> => {
+        let result = null as GenerateContentResponse | null
+        await postEventStream('/api/admin/generate-initial-content/stream', {
+            group_count: groupCount,
+            items_per_group: itemsPerGroup
+        }, ({ event, data }) => {
+            if (event === 'progress') onProgress(data)
+            else if (event === 'type_error') onTypeError?.(data)
+            else if (event === 'done') result = data
+        })
+        if (!result) throw new Error('Stream ended without result')
+        return result
     }
 }
 
@@ -10,14 +10,14 @@ import {
 } from 'lucide-react';
 import { WordleModal } from '@/components/WordleModal';
 import GenerateContentDialog from '@/components/admin/GenerateContentDialog';
-import { wordleApi, adminApi, dashboardApi, type DashboardStats } from '@/lib/api';
+import { wordleApi, adminApi, dashboardApi, type DashboardStats, type WordleCheckResponse } from '@/lib/api';
 
 export default function AdminDashboard() {
     const navigate = useNavigate();
     const user = useAuthStore((state) => state.user);
     const { activeLanguage } = useLanguageStore();
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
     const [generating, setGenerating] = useState(false);
     const [generateMessage, setGenerateMessage] = useState<string | null>(null);
     const [stats, setStats] = useState<DashboardStats | null>(null);
@@ -101,8 +101,11 @@ export default function AdminDashboard() {
         setGenerating(true);
         setGenerateMessage("Generowanie treści... (może potrwać 1-2 minuty)");
         try {
-            const res = await adminApi.generateInitialContent(groupCount, itemsPerGroup);
-            setGenerateMessage(`✓ ${res.message}`);
+            const failed: string[] = [];
+            const res = await adminApi.generateInitialContentStream(groupCount, itemsPerGroup, (progress) => {
+                setGenerateMessage(`Generowanie: ${progress.label} (${progress.count}/${progress.total})`);
+            }, (error) => failed.push(error.label));
+            setGenerateMessage(failed.length ? `✓ ${res.message} (błędy: ${failed.join(', ')})` : `✓ ${res.message}`);
             setTimeout(() => setGenerateMessage(null), 5000);
             // Odśwież statystyki po wygenerowaniu
             const data = await dashboardApi.getStats();
@@ -118,17 +121,14 @@ export default function AdminDashboard() {
     const handleStartWordle = async () => {
         try {
             const res = await wordleApi.start('B1');
-            setWordleTarget(res.target_word);
+            setWordleGameId(res.game_id);
             setShowWordle(true);
         } catch (e) {
             console.error("Failed to start Wordle", e);
         }
     };
 
-    const handleWordleCheck = async (guess: string): Promise<string[]> => {
-        const res = await wordleApi.check(wordleTarget, guess);
-        return res.result;
-    };
+    const handleWordleCheck = (guess: string): Promise<WordleCheckResponse> => wordleApi.check(wordleGameId, guess);
 
     return (
         <div className="space-y-8 animate-fade-in">
@@ -130,8 +130,8 @@ export default function FillBlankDetailsPage() {
         setGeneratedItems([])
         try {
             const grammarFocus = genGrammarFocus === 'mixed' ? undefined : genGrammarFocus
-            const items = await fillBlankApi.generateAI(genLevel, genCount, grammarFocus)
-            setGeneratedItems(items)
+            // Elementy pojawiają się batch po batchu, zanim skończy się cała generacja
+            await fillBlankApi.generateAIStream(genLevel, genCount, (batch) => setGeneratedItems(prev => [...prev, ...batch]), grammarFocus)
         } catch (e) {
             console.error(e)
             alert("Blad generowania AI")
@@ -128,8 +128,8 @@ export default function GuessObjectDetailsPage() {
         setGenerating(true)
         setGeneratedItems([])
         try {
-            const items = await guessObjectApi.generateAI(genLevel, genCount)
-            setGeneratedItems(items)
+            // Elementy pojawiają się batch po batchu, zanim skończy się cała generacja
+            await guessObjectApi.generateAIStream(genLevel, genCount, (batch) => setGeneratedItems(prev => [...prev, ...batch]))
         } catch (e) {
             console.error(e)
             alert("Blad generowania AI")
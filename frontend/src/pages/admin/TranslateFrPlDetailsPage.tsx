@@ -135,8 +135,8 @@ export default function TranslateFrPlDetailsPage() {
         setGeneratedItems([])
         try {
             const category = genCategory === 'mixed' ? undefined : genCategory
-            const items = await aiApi.generate(genLevel, genCount, category)
-            setGeneratedItems(items)
+            // Elementy pojawiają się batch po batchu, zanim skończy się cała generacja
+            await aiApi.generateStream(genLevel, genCount, (batch) => setGeneratedItems(prev => [...prev, ...batch]), category)
         } catch (e) {
             console.error(e)
             alert("Błąd generowania AI")
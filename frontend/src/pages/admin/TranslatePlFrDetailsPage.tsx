@@ -139,8 +139,8 @@ export default function TranslatePlFrDetailsPage() {
         setGeneratedItems([])
         try {
             const category = genCategory === 'mixed' ? undefined : genCategory
-            const items = await aiApi.generate(genLevel, genCount, category)
-            setGeneratedItems(items)
+            // Elementy pojawiają się batch po batchu, zanim skończy się cała generacja
+            await aiApi.generateStream(genLevel, genCount, (batch) => setGeneratedItems(prev => [...prev, ...batch]), category)
         } catch (e) {
             console.error(e)
             alert("Blad generowania AI")
@@ -50,7 +50,7 @@ export default function FillBlankEnStudyPage() {
     const [pointsDetails, setPointsDetails] = useState({ gained: 0, lost: 0, wordle: 0, aiCorrected: 0 });
     const [maxSessionCombo, setMaxSessionCombo] = useState(0);
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
 
     // Theme-aware colors
     const colors = {
@@ -132,7 +132,7 @@ export default function FillBlankEnStudyPage() {
 
             if (scoreRes.trigger_mini_game) {
                 const wordleData = await wordleApi.start();
-                setWordleTarget(wordleData.target_word);
+                setWordleGameId(wordleData.game_id);
                 setShowWordle(true);
             }
         } catch (e) {
@@ -410,10 +410,7 @@ export default function FillBlankEnStudyPage() {
                 isOpen={showWordle}
                 onClose={() => setShowWordle(false)}
                 onComplete={handleWordleComplete}
-                checkWord={async (guess) => {
-                    const res = await wordleApi.check(wordleTarget, guess);
-                    return res.result;
-                }}
+                checkWord={(guess) => wordleApi.check(wordleGameId, guess)}
             />
         </div>
     );
@@ -53,7 +53,7 @@ export default function FillBlankStudyPage() {
     const [pointsDetails, setPointsDetails] = useState({ gained: 0, lost: 0, wordle: 0, aiCorrected: 0 });
     const [maxSessionCombo, setMaxSessionCombo] = useState(0);
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
 
     // Theme-aware colors
     // ... reused colors from before
@@ -138,7 +138,7 @@ export default function FillBlankStudyPage() {
 
             if (scoreRes.trigger_mini_game) {
                 const wordleData = await wordleApi.start();
-                setWordleTarget(wordleData.target_word);
+                setWordleGameId(wordleData.game_id);
                 setShowWordle(true);
             }
         } catch (e) {
@@ -469,10 +469,7 @@ export default function FillBlankStudyPage() {
                 isOpen={showWordle}
                 onClose={() => setShowWordle(false)}
                 onComplete={handleWordleComplete}
-                checkWord={async (guess) => {
-                    const res = await wordleApi.check(wordleTarget, guess);
-                    return res.result;
-                }}
+                checkWord={(guess) => wordleApi.check(wordleGameId, guess)}
             />
         </div>
     );
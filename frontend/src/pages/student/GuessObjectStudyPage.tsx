@@ -58,7 +58,7 @@ export default function GuessObjectStudyPage() {
     const [pointsDetails, setPointsDetails] = useState({ gained: 0, lost: 0, wordle: 0 });
     const [maxSessionCombo, setMaxSessionCombo] = useState(0);
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
 
     // Theme-aware colors
     const colors = {
@@ -136,7 +136,7 @@ export default function GuessObjectStudyPage() {
 
             if (scoreRes.trigger_mini_game) {
                 const wordleData = await wordleApi.start();
-                setWordleTarget(wordleData.target_word);
+                setWordleGameId(wordleData.game_id);
                 setShowWordle(true);
             }
         } catch (e) {
@@ -373,10 +373,7 @@ export default function GuessObjectStudyPage() {
                 isOpen={showWordle}
                 onClose={() => setShowWordle(false)}
                 onComplete={handleWordleComplete}
-                checkWord={async (guess) => {
-                    const res = await wordleApi.check(wordleTarget, guess);
-                    return res.result;
-                }}
+                checkWord={(guess) => wordleApi.check(wordleGameId, guess)}
             />
         </div>
     );
@@ -36,7 +36,7 @@ const StudyPage: React.FC = () => {
     const [maxSessionCombo, setMaxSessionCombo] = useState(0);
 
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
 
     // Theme-aware colors
     const colors = {
@@ -134,7 +134,7 @@ const StudyPage: React.FC = () => {
 
             if (scoreRes.trigger_mini_game) {
                 const wordleData = await wordleApi.start();
-                setWordleTarget(wordleData.target_word);
+                setWordleGameId(wordleData.game_id);
                 setShowWordle(true);
                 return; // Pausing flow to show modal
             }
@@ -259,10 +259,7 @@ const StudyPage: React.FC = () => {
                 isOpen={showWordle}
                 onClose={() => setShowWordle(false)}
                 onComplete={handleWordleComplete}
-                checkWord={async (guess) => {
-                    const res = await wordleApi.check(wordleTarget, guess);
-                    return res.result;
-                }}
+                checkWord={(guess) => wordleApi.check(wordleGameId, guess)}
             />
         </div>
     );
@@ -69,7 +69,7 @@ export default function TranslateStudyPage({ mode, endpoints, titles, adminEditR
     const [pointsDetails, setPointsDetails] = useState({ gained: 0, lost: 0, wordle: 0, aiCorrected: 0 });
     const [maxSessionCombo, setMaxSessionCombo] = useState(0);
     const [showWordle, setShowWordle] = useState(false);
-    const [wordleTarget, setWordleTarget] = useState("");
+    const [wordleGameId, setWordleGameId] = useState("");
 
     useEffect(() => {
         if (stateMode === 'selection') fetchGroups();
@@ -149,7 +149,7 @@ export default function TranslateStudyPage({ mode, endpoints, titles, adminEditR
 
             if (scoreRes.trigger_mini_game) {
                 const wordleData = await wordleApi.start();
-                setWordleTarget(wordleData.target_word);
+                setWordleGameId(wordleData.game_id);
                 setShowWordle(true);
             }
         } catch (e) {
@@ -457,10 +457,7 @@ export default function TranslateStudyPage({ mode, endpoints, titles, adminEditR
                 isOpen={showWordle}
                 onClose={() => setShowWordle(false)}
                 onComplete={handleWordleComplete}
-                checkWord={async (guess) => {
-                    const res = await wordleApi.check(wordleTarget, guess);
-                    return res.result;
-                }}
+                checkWord={(guess) => wordleApi.check(wordleGameId, guess)}
             />
         </div>
     );
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Response size and time-to-last-byte with and without compression, on payloads shaped like
+the app's listings and study sessions.
+Run this from the project root with: python -m scripts.bench_compression
+
+Time-to-last-byte is estimated as compression time + transfer time on the listed links
+(server time before the first byte is the same in every row and is left out).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+from app.compression import brotli, compress
+from app.models import Fiszka, FiszkaRead, GuessObject, GuessObjectRead
+from scripts.fake_openai import _fill_blank_item, _guess_object_item, _translate_item
+
+# name -> bits per second
+LINKS = {"3G (1.6 Mbit/s)": 1.6e6, "4G (12 Mbit/s)": 12e6, "broadband (100 Mbit/s)": 100e6}
+
+
+def _payloads(items: int) -> dict[str, bytes]:
+    group_id = uuid.uuid4()
+    fiszki = [Fiszka(group_id=group_id, **_translate_item(random.choice(("fr", "en")))) for _ in range(items)]
+    riddles = [GuessObject(group_id=group_id, **_guess_object_item("fr")) for _ in range(50)]
+    return {
+        f"fiszki listing ({items} items)": TypeAdapter(list[FiszkaRead]).dump_json(
+            TypeAdapter(list[FiszkaRead]).validate_python(fiszki, from_attributes=True)
+        ),
+        "guess-object session (50 items)": TypeAdapter(list[GuessObjectRead]).dump_json(
+            TypeAdapter(list[GuessObjectRead]).validate_python(riddles, from_attributes=True)
+        ),
+        "single fill-blank item": TypeAdapter(dict).dump_json(_fill_blank_item("fr")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    codings = [("identity", None)] + [("gzip", level) for level in (1, 6, 9)]
+    if brotli is not None:
+        codings += [("br", quality) for quality in (4, 5, 6, 11)]
+    else:
+        print("(brotli not installed: pip install \".[brotli]\" to include it)\n")
+
+    for name, body in _payloads(args.items).items():
+        print(f"{name}: {len(body) / 1024:.1f} KiB")
+        print(f"  {'coding':<10} {'bytes':>9} {'ratio':>6} {'cpu ms':>7}  " + "  ".join(f"{link:>22}" for link in LINKS))
+        for coding, level in codings:
+            started = time.perf_counter()
+            data = body if coding == "identity" else compress(body, coding, level)
+            cpu = time.perf_counter() - started
+            label = coding if level is None else f"{coding}-{level}"
+            ttlb = "  ".join(f"{(cpu + len(data) * 8 / bps) * 1000:>19.1f} ms" for bps in LINKS.values())
+            print(f"  {label:<10} {len(data):>9} {len(body) / len(data):>6.1f} {cpu * 1000:>7.2f}  {ttlb}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of MetricsMiddleware: the same minimal ASGI app called directly with and
+without the middleware, so the difference is the time spent recording the request.
+Run this from the project root with: python -m scripts.bench_metrics
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import MetricsMiddleware, render
+
+
+class _Route:
+    path = "/fiszki/groups/{group_id}"
+
+
+_ROUTE = _Route()
+_START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+_BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def _endpoint(scope, receive, send):
+    # What the router leaves in the scope for a matched route
+    scope["route"] = _ROUTE
+    await send(_START)
+    await send(_BODY)
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+async def _run(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/fiszki/groups/1", "headers": []}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), _receive, _send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    instrumented = MetricsMiddleware(_endpoint)
+    bare, measured = [], []
+    for _ in range(args.rounds):
+        bare.append(asyncio.run(_run(_endpoint, args.requests)))
+        measured.append(asyncio.run(_run(instrumented, args.requests)))
+
+    per_request = lambda seconds: min(seconds) / args.requests * 1e6
+    print(f"{args.requests} requests, best of {args.rounds} rounds")
+    print(f"  without middleware: {per_request(bare):6.2f} µs/request")
+    print(f"  with middleware:    {per_request(measured):6.2f} µs/request")
+    print(f"  overhead:           {per_request(measured) - per_request(bare):6.2f} µs/request (budget: 50 µs)")
+    started = time.perf_counter()
+    body = render()
+    print(f"  render():           {(time.perf_counter() - started) * 1000:6.2f} ms for {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of response serialization for a study-session sized listing.
+Run this from the project root with: python -m scripts.bench_serialization [--items 5000]
+
+Compares FastAPI's paths (response_model fast path, and jsonable_encoder + json.dumps used
+without a response_model or with a custom response class) with orjson and MessagePack.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Fiszka, FiszkaRead
+from app.serialization import dumps, msgpack
+
+
+def measure(func, repeat: int) -> float:
+    """Best of `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization micro-benchmark")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    group_id = uuid.uuid4()
+    rows = [Fiszka(text_pl=f"Zdanie numer {i}", text_target=f"Phrase numéro {i}", group_id=group_id) for i in range(args.items)]
+    adapter = TypeAdapter(list[FiszkaRead])
+    models = adapter.validate_python(rows, from_attributes=True)
+    body = adapter.dump_json(models)
+
+    cases = [
+        # What FastAPI does for response_model=list[FiszkaRead] and ORM rows (the current path)
+        ("response_model: validate ORM rows + dump_json", lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True))),
+        ("response_model: revalidate ready models", lambda: adapter.validate_python(models)),
+        ("response_model: dump_json only", lambda: adapter.dump_json(models)),
+        ("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(models)).encode()),
+        ("jsonable_encoder + orjson", lambda: orjson.dumps(jsonable_encoder(models))),
+        ("dump_python + orjson (serialization.dumps)", lambda: dumps(adapter.dump_python(models))),
+    ]
+    if msgpack is not None:
+        cases.append(("JSON body -> msgpack (MsgpackMiddleware)", lambda: msgpack.packb(orjson.loads(body))))
+
+    print(f"{args.items} items, JSON body {len(body) / 1024:.0f} KiB", end="")
+    if msgpack is not None:
+        print(f", msgpack body {len(msgpack.packb(orjson.loads(body))) / 1024:.0f} KiB")
+    else:
+        print(" (msgpack not installed)")
+    for name, func in cases:
+        print(f"{name:<48} {measure(func, args.repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
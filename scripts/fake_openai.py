@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI Responses API, for offline development and load testing.
+Answers every prompt family used by the app (sentence pairs, riddles, fill-in-the-blank,
+answer verification, Wordle words, translation) with payloads matching the app's schemas,
+after a configurable latency and with configurable error and truncation rates.
+
+Run it from the project root:
+    python -m scripts.fake_openai --port 8100 --latency lognormal:800:0.5 --error-rate 0.02
+and point the backend at it:
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+Latency specs (milliseconds): fixed:MS, uniform:MIN:MAX, normal:MEAN:STD, lognormal:MEDIAN:SIGMA
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+WORDS = {
+    "fr": [
+        "maison", "jardin", "soleil", "voiture", "ami", "livre", "table", "fenêtre", "rivière", "montagne",
+        "ville", "marché", "pain", "fromage", "train", "école", "musique", "chanson", "plage", "forêt",
+        "matin", "soir", "hiver", "été", "chat", "chien", "oiseau", "fleur", "arbre", "route",
+        "mange", "regarde", "aime", "cherche", "trouve", "prend", "donne", "ouvre", "ferme", "écoute",
+        "petit", "grand", "rouge", "vieux", "nouveau", "belle", "calme", "rapide", "froid", "chaud",
+    ],
+    "en": [
+        "house", "garden", "sun", "car", "friend", "book", "table", "window", "river", "mountain",
+        "city", "market", "bread", "cheese", "train", "school", "music", "song", "beach", "forest",
+        "morning", "evening", "winter", "summer", "cat", "dog", "bird", "flower", "tree", "road",
+        "eats", "watches", "loves", "looks", "finds", "takes", "gives", "opens", "closes", "hears",
+        "small", "big", "red", "old", "new", "pretty", "quiet", "fast", "cold", "warm",
+    ],
+}
+POLISH_WORDS = [
+    "dom", "ogród", "słońce", "samochód", "przyjaciel", "książka", "stół", "okno", "rzeka", "góra",
+    "miasto", "rynek", "chleb", "ser", "pociąg", "szkoła", "muzyka", "piosenka", "plaża", "las",
+]
+WORDLE_WORDS = {
+    "fr": ["POMME", "LIVRE", "CHIEN", "TABLE", "ROUGE", "VERTE", "FLEUR", "MONDE", "TEMPS", "PORTE",
+           "ROUTE", "NUAGE", "PLAGE", "SUCRE", "ARBRE", "SALLE", "HERBE", "TERRE", "VILLE", "JOUER"],
+    "en": ["APPLE", "HOUSE", "WATER", "LIGHT", "HORSE", "CLOUD", "BREAD", "STONE", "GREEN", "WHITE",
+           "DREAM", "HAPPY", "SMILE", "PLANT", "RIVER", "BEACH", "MUSIC", "HEART", "EARTH", "SPACE"],
+}
+
+
+class LatencyModel:
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Latency in seconds."""
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = random.gauss(p[0], p[1])
+        else:
+            ms = random.lognormvariate(math.log(p[0]), p[1])
+        return max(ms, 0.0) / 1000
+
+
+def _language(prompt: str) -> str:
+    return "en" if re.search(r"angielsk|\bEN\b", prompt) else "fr"
+
+
+def _count(prompt: str, default: int = 10) -> int:
+    match = re.search(r"(?:Wygeneruj|Podaj)\s+(\d+)", prompt)
+    return int(match.group(1)) if match else default
+
+
+def _sentence(lang: str, length: int = 6) -> str:
+    words = random.sample(WORDS[lang], length)
+    return f"{' '.join(words).capitalize()}."
+
+
+def _translate_item(lang: str) -> dict:
+    return {
+        "text_pl": f"{' '.join(random.sample(POLISH_WORDS, 5)).capitalize()}.",
+        "text_target": _sentence(lang),
+        "category": "mixed",
+    }
+
+
+def _guess_object_item(lang: str) -> dict:
+    answer = random.choice(WORDS[lang][:30])
+    return {
+        "description_target": _sentence(lang, 8),
+        "description_pl": f"{' '.join(random.sample(POLISH_WORDS, 7)).capitalize()}.",
+        "answer_target": answer,
+        "answer_pl": random.choice(POLISH_WORDS),
+        "category": "objects",
+        "hint": None,
+    }
+
+
+def _fill_blank_item(lang: str) -> dict:
+    words = random.sample(WORDS[lang], 6)
+    answer = words[2]
+    return {
+        "sentence_with_blank": " ".join(words[:2] + ["___"] + words[3:]).capitalize() + ".",
+        "sentence_pl": f"{' '.join(random.sample(POLISH_WORDS, 6)).capitalize()}.",
+        "answer": answer,
+        "full_sentence": " ".join(words).capitalize() + ".",
+        "hint": None,
+        "grammar_focus": "mixed",
+    }
+
+
+ITEM_BUILDERS = {
+    "generated_items": _translate_item,
+    "generated_guess_objects": _guess_object_item,
+    "generated_fill_blanks": _fill_blank_item,
+}
+
+
+def answer_for(prompt: str, text_format: dict | None) -> tuple[str, str]:
+    """Returns (prompt family, output text) for a request."""
+    lang = _language(prompt)
+    schema_name = (text_format or {}).get("name")
+    if schema_name in ITEM_BUILDERS:
+        items = [ITEM_BUILDERS[schema_name](lang) for _ in range(_count(prompt))]
+        return schema_name, json.dumps({"items": items}, ensure_ascii=False)
+    if "par zdań" in prompt:
+        return "generated_items", json.dumps([_translate_item(lang) for _ in range(_count(prompt))], ensure_ascii=False)
+    if "zagadek" in prompt:
+        items = [_guess_object_item(lang) for _ in range(_count(prompt))]
+        return "generated_guess_objects", json.dumps(items, ensure_ascii=False)
+    if "sentence_with_blank" in prompt:
+        items = [_fill_blank_item(lang) for _ in range(_count(prompt))]
+        return "generated_fill_blanks", json.dumps(items, ensure_ascii=False)
+    if "is_correct" in prompt:
+        correct = random.random() < 0.5
+        explanation = "Odpowiedź poprawna." if correct else "Odpowiedź zawiera błąd."
+        return "verify", json.dumps({"is_correct": correct, "explanation": explanation}, ensure_ascii=False)
+    if "5 liter" in prompt:
+        words = random.sample(WORDLE_WORDS[lang], min(_count(prompt), len(WORDLE_WORDS[lang])))
+        return "wordle", "\n".join(words)
+    if "→" in prompt:
+        text = prompt.split(":", 1)[-1].strip()
+        return "translate", f"[FAKE] {text}"
+    return "other", "OK"
+
+
+def create_app(latency: LatencyModel, error_rate: float, rate_limit_rate: float, truncate_rate: float, hang_rate: float, hang_seconds: float) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI Responses API")
+    stats: Counter = Counter()
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request):
+        body = await request.json()
+        prompt = body.get("input") if isinstance(body.get("input"), str) else json.dumps(body.get("input"))
+        text_format = (body.get("text") or {}).get("format")
+        stats["requests"] += 1
+
+        await asyncio.sleep(latency.sample())
+        roll = random.random()
+        if roll < hang_rate:
+            stats["hangs"] += 1
+            await asyncio.sleep(hang_seconds)
+        elif roll < hang_rate + rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(random.randint(200, 2000))},
+                content={"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        elif roll < hang_rate + rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal server error (fake)", "type": "server_error", "code": None}},
+            )
+
+        family, text = answer_for(prompt, text_format)
+        stats[family] += 1
+        status = "completed"
+        incomplete_details = None
+        if random.random() < truncate_rate:
+            stats["truncated"] += 1
+            text = text[: int(len(text) * random.uniform(0.3, 0.9))]
+            status = "incomplete"
+            incomplete_details = {"reason": "max_output_tokens"}
+
+        input_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4)
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "gpt-5-nano"),
+            "status": status,
+            "incomplete_details": incomplete_details,
+            "error": None,
+            "output": [
+                {
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "type": "message",
+                    "role": "assistant",
+                    "status": status,
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("FAKE_OPENAI_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_OPENAI_PORT", "8100")))
+    parser.add_argument("--latency", default=os.getenv("FAKE_OPENAI_LATENCY", "lognormal:800:0.5"))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0")))
+    parser.add_argument("--rate-limit-rate", type=float, default=float(os.getenv("FAKE_OPENAI_RATE_LIMIT_RATE", "0")))
+    parser.add_argument("--truncate-rate", type=float, default=float(os.getenv("FAKE_OPENAI_TRUNCATE_RATE", "0")))
+    parser.add_argument("--hang-rate", type=float, default=float(os.getenv("FAKE_OPENAI_HANG_RATE", "0")),
+                        help="share of requests that hang (to exercise client timeouts)")
+    parser.add_argument("--hang-seconds", type=float, default=float(os.getenv("FAKE_OPENAI_HANG_SECONDS", "120")))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    app = create_app(
+        LatencyModel(args.latency), args.error_rate, args.rate_limit_rate, args.truncate_rate, args.hang_rate, args.hang_seconds
+    )
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
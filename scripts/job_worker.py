@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Standalone worker for background AI generation jobs.
+Run this from the project root with: python -m scripts.job_worker
+Set JOB_WORKERS=0 on the web service so that only this process executes jobs.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import init_db
+from app.jobs import job_runner
+from app.usage import usage_recorder
+import app.main  # noqa: F401  (registers job handlers)
+
+
+async def run(workers: int):
+    job_runner.workers = workers
+    await usage_recorder.start()
+    job_runner.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_runner.stop()
+        await usage_recorder.stop()
+
+
+def main():
+    workers = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+    init_db()
+    print(f"Job worker starting with {workers} workers...")
+    try:
+        asyncio.run(run(workers))
+    except KeyboardInterrupt:
+        print("Job worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Creates the pg_trgm extension and the trigram GIN indexes used by near-duplicate detection on an
+existing PostgreSQL database (new databases get them from create_all).
+Run this from the project root with: python -m scripts.setup_duplicates
+"""
+
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.duplicates import TRIGRAM_SETUP_DDL, TRIGRAM_TABLE_DDL
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print(f"Trigram indexes need PostgreSQL (database is {engine.dialect.name}); nothing to do.")
+        return
+    with engine.begin() as connection:
+        connection.execute(TRIGRAM_SETUP_DDL)
+        for table, ddl in TRIGRAM_TABLE_DDL.items():
+            print(f"Trigram indexes on {table.name}...")
+            connection.execute(ddl)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
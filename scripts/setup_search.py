@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Adds the full-text search configurations, generated tsvector columns and GIN indexes to an
+existing PostgreSQL database (new databases get them from create_all).
+Run this from the project root with: python -m scripts.setup_search
+
+Adding a generated column rewrites the table, so run it outside busy hours on large catalogs.
+"""
+
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.search import SEARCH_SETUP_DDL, SEARCH_TABLE_DDL
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print(f"Full-text search needs PostgreSQL (database is {engine.dialect.name}); nothing to do.")
+        return
+    with engine.begin() as connection:
+        connection.execute(SEARCH_SETUP_DDL)
+        for table, ddl in SEARCH_TABLE_DDL.items():
+            print(f"Search columns and indexes on {table.name}...")
+            connection.execute(ddl)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()